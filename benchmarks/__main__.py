@@ -0,0 +1,442 @@
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from contextlib import ExitStack
+from os.path import dirname, exists, join
+from threading import Event
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+import triac.__main__ as triac_main
+from benchmarks.fake_docker import FakeContainer, FakeDockerClient, fake_tool
+from triac.lib.coverage import Coverage
+from triac.lib.docker.types.base_images import BaseImages
+from triac.lib.encoding import loads
+from triac.lib.generator.ansible import Ansible
+from triac.lib.generator.connections import connections
+from triac.lib.generator.pyinfra import PyInfra
+from triac.lib.random import Fuzzer
+from triac.lib.tracing import tracer
+from triac.types.execution import Execution
+from triac.types.target import Target
+from triac.types.wrapper import State, Wrapper
+from triac.types.wrappers import Wrappers
+
+# Measures the orchestration overhead of TRIaC and compares it to a
+# stored baseline. With the fake backend, docker and the tools are
+# replaced by in-process fakes, so only the overhead of TRIaC remains.
+# Invoke from the root of the repository via: python3 -m benchmarks
+
+BASELINES = join(dirname(__file__), "baselines")
+
+# Every micro benchmark is repeated and every repetition
+# runs at least this long. The fastest repetition counts,
+# as the slower ones were disturbed by other processes
+REPEATS = 5
+MIN_DURATION = 0.3
+
+GENERATORS = {Target.ANSIBLE: Ansible, Target.PYINFRA: PyInfra}
+
+# Value, unit and whether higher values are better.
+# Metrics that are too noisy to compare are only reported (None)
+Metric = Tuple[float, str, Optional[bool]]
+
+# Phases that take less than this many milliseconds in the baseline
+# are dominated by noise and only reported
+MIN_COMPARED_MS = 1.0
+
+# Parameters of the run that the baseline has to match to be compared
+RUN_PARAMETERS = [
+    "backend",
+    "rounds",
+    "wrappers_per_round",
+    "wrappers",
+    "latency",
+    "states",
+]
+
+
+def measure(run: Callable[[], Any]) -> float:
+    """
+    Calls run repeatedly and returns the calls per second
+    """
+    run()
+    rates = []
+    for _ in range(REPEATS):
+        calls = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < MIN_DURATION:
+            run()
+            calls += 1
+        rates.append(calls / elapsed)
+    return max(rates)
+
+
+def get_wrapper(execution: Execution, name: str) -> type[Wrapper]:
+    wrapper = execution.get_wrapper_by_name(name)
+    if wrapper is None:
+        raise click.BadParameter(f"Unknown wrapper {name}", param_hint="--wrapper")
+    return wrapper
+
+
+def generate_states(wrapper: type[Wrapper], count: int) -> List[State]:
+    container = FakeContainer("benchmark", [wrapper.__name__])
+    return container.generate_states(wrapper.definition(), wrapper, count)
+
+
+def bench_pipeline(
+    backend: str,
+    base_image: str,
+    rounds: int,
+    wrappers_per_round: int,
+    supported: List[str],
+    latency: float,
+) -> Dict[str, Metric]:
+    logger = logging.getLogger(__name__)
+
+    def run(rounds: int) -> Tuple[Execution, float]:
+        execution = Execution(
+            base_image,
+            True,
+            rounds,
+            wrappers_per_round,
+            "WARNING",
+            "WARNING",
+            True,
+            False,
+            Target.ANSIBLE.name,
+            None,
+        )
+        execution.load_list_of_wrapper_classes()
+        if backend == "fake":
+            docker = FakeDockerClient(supported, latency)
+        else:
+            docker = triac_main.DockerClient()
+
+        start = time.perf_counter()
+        triac_main.exec_fuzzing_worker(0, docker, execution, Event())
+        elapsed = time.perf_counter() - start
+        if backend != "fake":
+            triac_main.perform_cleanup(execution, logger, [docker])
+        return (execution, elapsed)
+
+    with ExitStack() as stack:
+        if backend == "fake":
+            for name, generator in [("Ansible", Ansible), ("PyInfra", PyInfra)]:
+                stack.enter_context(
+                    patch.object(triac_main, name, fake_tool(generator))
+                )
+
+        # The first round builds the caches, e.g. the index of the paths
+        run(1)
+        tracer.reset()
+        execution, elapsed = run(rounds)
+
+    if execution.errors > 0:
+        logger.warning(f"{execution.errors} rounds ended with a mismatch")
+
+    metrics = {
+        "pipeline.wrappers_per_second": (
+            execution.wrappers_executed / elapsed,
+            "wrappers/s",
+            True,
+        ),
+    }
+    for phase, _, p50, p95, _ in tracer.summary():
+        metrics[f"phase.{phase}.p50"] = (p50 * 1000, "ms", False)
+        metrics[f"phase.{phase}.p95"] = (p95 * 1000, "ms", None)
+    return metrics
+
+
+def bench_encoding(
+    base_image: str, wrapper: type[Wrapper], count: int
+) -> Dict[str, Metric]:
+    wrappers = Wrappers(BaseImages[base_image], Target.ANSIBLE.name, None, [])
+    for state in generate_states(wrapper, count):
+        wrappers.append_with_state(wrapper, state)
+    data = wrappers.encode()
+    size = len(data) / 1e6
+
+    encode = measure(wrappers.encode)
+    decode = measure(lambda: loads(data))
+    return {
+        "encoding.encode_per_second": (encode, "files/s", True),
+        "encoding.decode_per_second": (decode, "files/s", True),
+        "encoding.encode_throughput": (encode * size, "MB/s", True),
+        "encoding.decode_throughput": (decode * size, "MB/s", True),
+    }
+
+
+def bench_generators(wrappers: List[type[Wrapper]]) -> Dict[str, Metric]:
+    container = FakeContainer("benchmark", [w.__name__ for w in wrappers])
+    metrics = {}
+    for target, generator in GENERATORS.items():
+        supporting = [w for w in wrappers if target in w.supported_targets()]
+        if len(supporting) == 0:
+            continue
+        states = [(w, generate_states(w, 1)[0]) for w in supporting]
+
+        def generate():
+            wrapper, state = random.choice(states)
+            generator(wrapper, state, container).destroy()
+
+        metrics[f"generators.{target.value}_per_second"] = (
+            measure(generate),
+            "files/s",
+            True,
+        )
+    connections.release(container)
+    return metrics
+
+
+def bench_fuzzer(wrappers: List[type[Wrapper]]) -> Dict[str, Metric]:
+    fuzzer = Fuzzer(Coverage())
+    return {
+        "fuzzer.fuzz_wrapper_per_second": (
+            measure(lambda: fuzzer.fuzz_wrapper(None, wrappers)),
+            "calls/s",
+            True,
+        ),
+    }
+
+
+def compare(
+    metrics: Dict[str, Metric],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    comparable: bool = True,
+) -> Tuple[Table, List[str]]:
+    """
+    Returns the report and the metrics that regressed. If the baseline
+    is not comparable, all metrics are only reported.
+    """
+    table = Table(title="Benchmark results")
+    table.add_column("Metric", no_wrap=True)
+    table.add_column("Value", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Change", justify="right")
+
+    regressions = []
+    for name, (value, unit, higher_is_better) in sorted(metrics.items()):
+        if name not in baseline:
+            table.add_row(name, f"{value:.2f} {unit}", "", "")
+            continue
+
+        expected = baseline[name]["value"]
+        change = value / expected - 1 if expected > 0 else 0
+        if not comparable or (unit == "ms" and expected < MIN_COMPARED_MS):
+            higher_is_better = None
+        regressed = (
+            higher_is_better is not None
+            and (-change if higher_is_better else change) > tolerance
+        )
+        if regressed:
+            regressions.append(name)
+        table.add_row(
+            name,
+            f"{value:.2f} {unit}",
+            f"{expected:.2f} {unit}",
+            f"[{'red' if regressed else 'green'}]{change:+.1%}",
+        )
+    return (table, regressions)
+
+
+@click.command()
+@click.option(
+    "--backend",
+    help="Whether docker and the tools are replaced by in-process fakes or the local docker is used",
+    type=click.Choice(["fake", "docker"]),
+    default="fake",
+    show_default=True,
+)
+@click.option(
+    "--base-image",
+    help="The base image of the fuzzing rounds",
+    type=click.Choice([img.name for img in BaseImages]),
+    default=BaseImages.DEBIAN12.name,
+    show_default=True,
+)
+@click.option(
+    "--rounds",
+    "-R",
+    help="Number of fuzzing rounds that are measured",
+    type=click.IntRange(1),
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--wrappers-per-round",
+    "-W",
+    help="Number of wrappers per round",
+    type=click.IntRange(1),
+    default=10,
+    show_default=True,
+)
+@click.option(
+    "--wrapper",
+    "wrappers",
+    help="Wrapper that can execute on the fake backend. Its methods are executed on this machine, so only wrappers that merely read the system should be used.",
+    multiple=True,
+    default=["File"],
+    show_default=True,
+)
+@click.option(
+    "--latency",
+    help="Seconds that every operation of the fake docker takes",
+    type=click.FloatRange(0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--states",
+    help="Number of target states in the file that is encoded",
+    type=click.IntRange(1),
+    default=50,
+    show_default=True,
+)
+@click.option(
+    "--seed",
+    help="Seed of the random choices",
+    type=int,
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--baseline",
+    help="Baseline file to compare with. Defaults to benchmarks/baselines/{backend}.json",
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--save-baseline",
+    help="Stores the results as the new baseline instead of comparing them",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--tolerance",
+    help="Relative change that is still accepted before a metric counts as regressed",
+    type=click.FloatRange(0),
+    default=0.25,
+    show_default=True,
+)
+def benchmark(
+    backend,
+    base_image,
+    rounds,
+    wrappers_per_round,
+    wrappers,
+    latency,
+    states,
+    seed,
+    baseline,
+    save_baseline,
+    tolerance,
+):
+    """
+    Measures the throughput of the fuzzing pipeline, the encoding,
+    the generators and the fuzzer and compares it to the baseline.
+    Exits with 1 if a metric regressed by more than the tolerance.
+    """
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    random.seed(seed)
+    console = Console()
+
+    execution = Execution(
+        base_image, True, 1, 1, "WARNING", "WARNING", True, False, "ANSIBLE", None
+    )
+    available = execution.load_list_of_wrapper_classes()
+    selected = [get_wrapper(execution, name) for name in wrappers]
+
+    metrics: Dict[str, Metric] = {}
+    with console.status("Benchmarking the pipeline"):
+        metrics.update(
+            bench_pipeline(
+                backend,
+                base_image,
+                rounds,
+                wrappers_per_round,
+                list(wrappers),
+                latency,
+            )
+        )
+    with console.status("Benchmarking the encoding"):
+        metrics.update(bench_encoding(base_image, selected[0], states))
+    with console.status("Benchmarking the generators"):
+        metrics.update(bench_generators(selected))
+    with console.status("Benchmarking the fuzzer"):
+        metrics.update(bench_fuzzer(available))
+
+    environment = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "backend": backend,
+        "rounds": rounds,
+        "wrappers_per_round": wrappers_per_round,
+        "wrappers": list(wrappers),
+        "latency": latency,
+        "states": states,
+    }
+
+    path = baseline or join(BASELINES, f"{backend}.json")
+    if save_baseline:
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "environment": environment,
+                    "metrics": {
+                        name: {
+                            "value": round(value, 4),
+                            "unit": unit,
+                            "higher_is_better": higher_is_better,
+                        }
+                        for name, (value, unit, higher_is_better) in sorted(
+                            metrics.items()
+                        )
+                    },
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        console.print(f"Stored the baseline in {path}")
+
+    stored = {}
+    comparable = False
+    if not save_baseline and exists(path):
+        with open(path, "r") as f:
+            stored = json.load(f)
+        # Runs with other parameters measure something else
+        different = [
+            key
+            for key in RUN_PARAMETERS
+            if stored["environment"].get(key) != environment[key]
+        ]
+        comparable = len(different) == 0
+        if not comparable:
+            console.print(
+                f"The baseline was measured with other parameters ({', '.join(different)}), the results are only reported"
+            )
+        stored = stored["metrics"]
+    elif not save_baseline:
+        console.print(f"There is no baseline in {path}, use --save-baseline")
+
+    table, regressions = compare(metrics, stored, tolerance, comparable)
+    console.print(table)
+    if len(regressions) > 0:
+        console.print(
+            f"[bold red]{len(regressions)} metrics regressed by more than {tolerance:.0%}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark()
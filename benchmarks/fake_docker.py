@@ -0,0 +1,138 @@
+import time
+from threading import Lock
+from typing import Any, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from triac.lib.docker.const import get_image_identifier
+from triac.lib.docker.types.base_images import BaseImages
+from triac.lib.docker.types.container import Container
+from triac.lib.encoding import dumps, loads
+from triac.lib.tracing import tracer
+from triac.types.wrapper import Definition, State, Wrapper
+
+
+class FakeContainer(Container):
+    """
+    Container that executes the methods of the agent in the current
+    process. Requests and responses are still encoded and decoded,
+    like on the way to the agent and back. Methods are executed on
+    the host, so only wrappers that only read the system are supported.
+    """
+
+    def __init__(self, id: str, supported: List[str]) -> None:
+        super().__init__(id, 0, None)
+        self.__supported = supported
+
+    def execute_method(self, obj: Any, method: str, arguments: List[Any] = []) -> Any:
+        request = loads(dumps({"obj": obj, "method": method, "arguments": arguments}))
+        if method == "verify":
+            # The tools always reach the target state
+            result = request["arguments"][0]
+        else:
+            result = getattr(request["obj"], method)(*request["arguments"])
+        return loads(dumps({"method_result": result}))["method_result"]
+
+    def generate_states(
+        self, definition: Definition, wrapper: Wrapper = None, count: int = 1
+    ) -> Optional[List[State]]:
+        # Other wrappers cannot execute on the fake container
+        if wrapper is not None and wrapper.__name__ not in self.__supported:
+            return None
+        return super().generate_states(definition, wrapper, count)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeDockerClient:
+    """
+    In-process replacement of the DockerClient. Images and containers
+    only exist as identifiers, every operation takes the given latency.
+    """
+
+    def __init__(self, supported: List[str], latency: float = 0) -> None:
+        self.__supported = supported
+        self.__latency = latency
+        self.__lock = Lock()
+        self.__images = {}
+        self.__containers = 0
+
+    @property
+    def host(self) -> str:
+        return "fake"
+
+    @property
+    def ssh_host(self) -> str:
+        return "localhost"
+
+    @property
+    def built_images(self) -> Set[str]:
+        with self.__lock:
+            return set(self.__images.values())
+
+    @property
+    def containers(self) -> int:
+        """
+        Number of containers that were started
+        """
+        return self.__containers
+
+    def __wait(self) -> None:
+        if self.__latency > 0:
+            time.sleep(self.__latency)
+
+    def get_base_image(self, img: BaseImages) -> Tuple[str, bool]:
+        with self.__lock:
+            if img in self.__images:
+                return (self.__images[img], False)
+            self.__images[img] = get_image_identifier(img)
+        self.__wait()
+        return (self.__images[img], True)
+
+    def run_container_from_image(self, image_identifier: str) -> Container:
+        self.__wait()
+        with self.__lock:
+            self.__containers += 1
+        return FakeContainer(uuid4().hex, self.__supported)
+
+    def commit_container_to_image(self, container: Container) -> str:
+        self.__wait()
+        return f"triac:intermediate-state-{uuid4().hex[:8]}"
+
+    def remove_container(self, container: Container) -> None:
+        self.__wait()
+
+    def remove_image(self, image: str, prune: bool = True) -> None:
+        self.__wait()
+
+    def prune_images(self) -> None:
+        self.__wait()
+
+
+def fake_tool(generator: type) -> type:
+    """
+    Replaces the run of a tool. The files of the tool are generated,
+    but the tool is not invoked and the target state is reached.
+    """
+
+    class FakeTool:
+        def __init__(self, wrapper: Wrapper, state: State, container: Container):
+            self.__generator = generator(wrapper, state, container)
+            self.__wrapper = wrapper
+            self.__state = state
+            self.__container = container
+
+        @property
+        def changed(self) -> Optional[bool]:
+            return True
+
+        def run(self) -> State:
+            with tracer.span("run_tool"):
+                self.__generator.destroy()
+            with tracer.span("verify"):
+                return self.__container.execute_method(
+                    self.__wrapper, "verify", [self.__state]
+                )
+
+    FakeTool.__name__ = f"Fake{generator.__name__}"
+    return FakeTool
@@ -0,0 +1,64 @@
+import struct
+from socket import SHUT_WR, socketpair
+
+import pytest
+from docker.utils.socket import STDERR, STDOUT
+
+from triac.lib.docker.types.agent import AgentConnection, AgentTerminatedError
+from triac.lib.encoding import FRAME_HEADER, dumps
+
+
+def docker_frame(stream: int, data: bytes) -> bytes:
+    return struct.pack(">BxxxL", stream, len(data)) + data
+
+
+def rpc_frame(result) -> bytes:
+    payload = dumps({"method_result": result})
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+@pytest.fixture
+def sockets():
+    host, agent = socketpair()
+    yield (host, agent)
+    host.close()
+    agent.shutdown(SHUT_WR)
+
+
+def test_rpc_frame_split_across_docker_frames(sockets):
+    host, agent = sockets
+    frame = rpc_frame({"path": "/etc/hosts", "mode": 0o644})
+    agent.sendall(
+        docker_frame(STDOUT, frame[:2])
+        + docker_frame(STDERR, b"warning")
+        + docker_frame(STDOUT, frame[2:7])
+        + docker_frame(STDOUT, frame[7:])
+    )
+
+    connection = AgentConnection(host)
+    assert connection.call(None, "verify", []) == {
+        "method_result": {"path": "/etc/hosts", "mode": 0o644}
+    }
+
+
+def test_several_rpc_frames_in_one_docker_frame(sockets):
+    host, agent = sockets
+    agent.sendall(
+        docker_frame(STDOUT, rpc_frame(1) + rpc_frame("two") + rpc_frame([3]))
+    )
+
+    connection = AgentConnection(host)
+    assert connection.call(None, "verify", []) == {"method_result": 1}
+    assert connection.call(None, "verify", []) == {"method_result": "two"}
+    assert connection.call(None, "verify", []) == {"method_result": [3]}
+
+
+def test_terminated_agent(sockets):
+    host, agent = sockets
+    frame = rpc_frame(1)
+    agent.sendall(docker_frame(STDOUT, frame[:3]))
+    agent.shutdown(SHUT_WR)
+
+    connection = AgentConnection(host)
+    with pytest.raises(AgentTerminatedError):
+        connection.call(None, "verify", [])
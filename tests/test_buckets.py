@@ -0,0 +1,67 @@
+from deepdiff import DeepDiff
+
+from triac.lib.buckets import get_error_fingerprint, get_fingerprint
+from triac.types.errors import StateMismatchError
+from triac.types.target import Target
+from triac.values.bool import BoolValue
+
+
+def fingerprint(wrapper, target, actual, disagreeing=[]):
+    return get_fingerprint(
+        wrapper, target, actual, DeepDiff(target, actual), disagreeing
+    )
+
+
+def test_concrete_values_are_ignored():
+    first = fingerprint("File", {"path": "/etc/a"}, {"path": "/etc/b"})
+    second = fingerprint("File", {"path": "/usr/c"}, {"path": "/usr/d"})
+    assert first == second
+
+
+def test_list_positions_are_ignored():
+    first = fingerprint("User", {"groups": ["a", "b"]}, {"groups": ["a", "c"]})
+    second = fingerprint("User", {"groups": ["d", "e"]}, {"groups": ["f", "e"]})
+    assert first == second
+
+
+def test_wrapper_is_part_of_the_fingerprint():
+    target, actual = {"path": "/etc/a"}, {"path": "/etc/b"}
+    assert fingerprint("File", target, actual) != fingerprint(
+        "Directory", target, actual
+    )
+
+
+def test_fields_are_part_of_the_fingerprint():
+    first = fingerprint("File", {"path": "/a", "owner": "root"}, {"path": "/b"})
+    second = fingerprint("File", {"path": "/a", "owner": "root"}, {"owner": "x"})
+    assert first != second
+
+
+def test_value_classes_are_part_of_the_fingerprint():
+    first = fingerprint("File", {"mode": BoolValue(True)}, {"mode": None})
+    second = fingerprint("File", {"mode": "644"}, {"mode": None})
+    assert first != second
+
+
+def test_kinds_of_changes_are_part_of_the_fingerprint():
+    first = fingerprint("File", {"path": "/a"}, {"path": "/b"})
+    second = fingerprint("File", {"path": "/a"}, {})
+    assert first != second
+
+
+def test_disagreeing_tools_are_part_of_the_fingerprint():
+    target, actual = {"path": "/etc/a"}, {"path": "/etc/b"}
+    assert fingerprint("File", target, actual, ["ANSIBLE"]) != fingerprint(
+        "File", target, actual, ["PYINFRA"]
+    )
+    assert fingerprint("File", target, actual, ["ANSIBLE", "PYINFRA"]) == (
+        fingerprint("File", target, actual, ["PYINFRA", "ANSIBLE"])
+    )
+
+
+def test_error_fingerprint():
+    target, actual = {"mode": BoolValue(True)}, {"mode": BoolValue(False)}
+    error = StateMismatchError(target, actual, [Target.PYINFRA])
+    assert get_error_fingerprint("File", error) == fingerprint(
+        "File", target, actual, ["PYINFRA"]
+    )
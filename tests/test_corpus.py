@@ -0,0 +1,121 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pytest
+
+from triac.lib.corpus import CORPUS_FILE, Corpus
+
+
+def add(corpus: Corpus, **kwargs) -> int:
+    entry = {
+        "file": "error-1",
+        "base_image": "DEBIAN12",
+        "mode": "differential",
+        "wrappers": ["User", "File"],
+        "targets": ["ANSIBLE", "PYINFRA"],
+        "disagreeing": ["PYINFRA"],
+        "fields": ["mode"],
+        "target_state": "{'mode': 644}",
+        "actual_state": "{'mode': 600}",
+        "changes": "values_changed",
+        "data": b"TRIAC\x01",
+        "fingerprint": "abc",
+    }
+    entry.update(kwargs)
+    return corpus.add(**entry)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    return Corpus(str(tmp_path / "errors"))
+
+
+def test_add_and_get(corpus):
+    id = add(corpus, data=b"\x00replay")
+    entry = corpus.get(id)
+
+    assert entry.file == "error-1"
+    assert entry.wrapper == "File"
+    assert entry.wrappers == 2
+    assert sorted(entry.targets) == ["ANSIBLE", "PYINFRA"]
+    assert entry.fields == ["mode"]
+    assert entry.fingerprint == "abc"
+    assert corpus.get_data(id) == b"\x00replay"
+
+
+def test_missing_entry(corpus):
+    assert corpus.get(42) is None
+    assert corpus.get_data(42) is None
+
+
+def test_find_filters(corpus):
+    first = add(corpus, wrappers=["User", "File"], base_image="DEBIAN12")
+    second = add(corpus, wrappers=["Service"], base_image="UBUNTU22", fields=["name"])
+
+    # Wrappers match anywhere in the round
+    assert [e.id for e in corpus.find(wrapper="User")] == [first]
+    assert [e.id for e in corpus.find(base_image="UBUNTU22")] == [second]
+    assert [e.id for e in corpus.find(field="mode")] == [first]
+    assert [e.id for e in corpus.find(target="ANSIBLE")] == [second, first]
+    assert corpus.find(wrapper="User", field="name") == []
+
+
+def test_find_newest_first_with_limit(corpus):
+    ids = [add(corpus, file=f"error-{i}") for i in range(5)]
+    assert [e.id for e in corpus.find(limit=2)] == ids[::-1][:2]
+
+
+def test_find_by_fingerprint(corpus):
+    add(corpus, fingerprint="abc")
+    other = add(corpus, fingerprint="def")
+    assert [e.id for e in corpus.find(fingerprint="def")] == [other]
+
+
+def test_bucket_hits(corpus):
+    assert corpus.hit("abc", "File", ["mode", "owner"]) == 1
+    assert corpus.hit("abc", "File", ["mode", "owner"]) == 2
+    assert corpus.hit("def", "User", []) == 1
+
+    buckets = corpus.buckets()
+    assert [b.fingerprint for b in buckets] == ["abc", "def"]
+    assert buckets[0].count == 2
+    assert buckets[0].fields == ["mode", "owner"]
+    assert buckets[1].fields == []
+    assert buckets[0].last_seen >= buckets[0].first_seen
+    assert len(corpus.buckets(limit=1)) == 1
+
+
+def test_corpus_is_reopened(tmp_path):
+    add(Corpus(str(tmp_path)))
+    assert len(Corpus(str(tmp_path)).find()) == 1
+
+
+def test_old_corpus_is_migrated(tmp_path):
+    # Corpora of earlier versions have no fingerprints
+    with closing(sqlite3.connect(tmp_path / CORPUS_FILE)) as connection:
+        connection.execute(
+            "CREATE TABLE errors (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "created TEXT NOT NULL, file TEXT NOT NULL, base_image TEXT NOT NULL, "
+            "mode TEXT NOT NULL, wrapper TEXT NOT NULL, wrappers INTEGER NOT NULL, "
+            "target_state TEXT NOT NULL, actual_state TEXT NOT NULL, "
+            "changes TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+        connection.execute(
+            "INSERT INTO errors VALUES "
+            "(1, '2024-01-01T00:00:00', 'old', 'DEBIAN12', 'unit', 'File', 1, "
+            "'{}', '{}', '', x'00')"
+        )
+        connection.commit()
+
+    corpus = Corpus(str(tmp_path))
+    assert corpus.get(1).fingerprint is None
+    id = add(corpus, fingerprint="abc")
+    assert [e.id for e in corpus.find(fingerprint="abc")] == [id]
+
+
+def test_concurrent_adds(corpus):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda i: add(corpus, file=f"error-{i}"), range(40)))
+    assert len(set(ids)) == 40
+    assert len(corpus.find()) == 40
@@ -0,0 +1,100 @@
+import pickle
+from base64 import b64encode
+
+import pytest
+
+from triac.lib.docker.types.base_images import BaseImages
+from triac.lib.encoding import EncodingError, dumps, loads
+from triac.types.target import Target
+from triac.types.wrappers import Identifier, Wrappers, load
+from triac.values.bool import BoolValue
+from triac.wrappers.file import File
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        0,
+        -1,
+        2**70,
+        1.5,
+        "",
+        "ä",
+        b"\x00\xff",
+        [1, [2, "two"]],
+        (1, (2,)),
+        {1, "one"},
+        frozenset([1, 2]),
+        {"key": {"nested": [None]}, 1: (True, False)},
+    ],
+)
+def test_builtin_round_trip(value):
+    assert loads(dumps(value)) == value
+
+
+def test_object_round_trip():
+    value = loads(dumps(BoolValue(True)))
+    assert type(value) is BoolValue
+    assert value.val is True
+
+
+def test_enum_and_class_round_trip():
+    assert loads(dumps([Target.ANSIBLE, BaseImages.DEBIAN12, File])) == [
+        Target.ANSIBLE,
+        BaseImages.DEBIAN12,
+        File,
+    ]
+
+
+def test_shared_references_are_kept():
+    shared = [1, 2]
+    value = loads(dumps({"a": shared, "b": shared, "c": (shared, shared)}))
+    assert value["a"] is value["b"]
+    assert value["c"][0] is value["a"] and value["c"][1] is value["a"]
+
+
+def test_cycle_through_list():
+    value = [1]
+    value.append(value)
+    decoded = loads(dumps(value))
+    assert decoded[1] is decoded
+
+
+def test_cycle_through_object():
+    value = BoolValue(None)
+    value.val = {"self": value}
+    decoded = loads(dumps(value))
+    assert decoded.val["self"] is decoded
+
+
+def test_cycle_through_tuple_is_rejected():
+    items = []
+    value = (items,)
+    items.append(value)
+    with pytest.raises(EncodingError):
+        dumps(value)
+
+
+def test_strings_are_written_once():
+    name = "a-fairly-long-string-that-is-repeated"
+    assert dumps([name] * 100).count(name.encode()) == 1
+
+
+def test_legacy_pickle_file(tmp_path):
+    wrappers = Wrappers(
+        BaseImages.DEBIAN12,
+        Target.ANSIBLE.name,
+        None,
+        [(Identifier(File), {"mode": BoolValue(True)})],
+    )
+    path = tmp_path / "legacy.triac"
+    path.write_bytes(b64encode(pickle.dumps(wrappers)))
+
+    loaded = load(str(path))
+    assert loaded.base_image == BaseImages.DEBIAN12
+    assert loaded.unit == Target.ANSIBLE.name
+    identifier, state = loaded.target_states[0]
+    assert identifier.name == "File"
+    assert state["mode"].val is True
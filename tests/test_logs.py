@@ -0,0 +1,83 @@
+import gzip
+import logging
+
+import pytest
+
+import triac.lib.logs as logs
+from triac.lib.logs import CompressingLogHandler
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("triac.tests.logs")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def attach(logger, handler):
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return handler
+
+
+def test_rotated_files_are_compressed(tmp_path, logger):
+    path = tmp_path / "triac.log"
+    attach(logger, CompressingLogHandler(str(path), 100, 2))
+    logger.info("a" * 80)
+    logger.info("b" * 80)
+
+    with gzip.open(f"{path}.1.gz", "rt") as file:
+        assert file.read() == "a" * 80 + "\n"
+    assert path.read_text() == "b" * 80 + "\n"
+
+
+def test_only_backups_are_kept(tmp_path, logger):
+    path = tmp_path / "triac.log"
+    attach(logger, CompressingLogHandler(str(path), 100, 2))
+    for char in "abcd":
+        logger.info(char * 80)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "triac.log",
+        "triac.log.1.gz",
+        "triac.log.2.gz",
+    ]
+    with gzip.open(f"{path}.2.gz", "rt") as file:
+        assert file.read() == "b" * 80 + "\n"
+
+
+def test_without_backups_the_file_starts_over(tmp_path, logger):
+    path = tmp_path / "triac.log"
+    attach(logger, CompressingLogHandler(str(path), 100, 0))
+    for char in "abc":
+        logger.info(char * 80)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["triac.log"]
+    assert path.read_text() == "c" * 80 + "\n"
+
+
+def test_rotation_after_interval(tmp_path, logger, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(logs.time, "time", lambda: now[0])
+    path = tmp_path / "triac.log"
+    attach(logger, CompressingLogHandler(str(path), 0, 3, interval=60))
+
+    logger.info("first")
+    now[0] += 30
+    logger.info("second")
+    assert not (tmp_path / "triac.log.1.gz").exists()
+
+    now[0] += 31
+    logger.info("third")
+    with gzip.open(f"{path}.1.gz", "rt") as file:
+        assert file.read() == "first\nsecond\n"
+    assert path.read_text() == "third\n"
+
+    # The interval starts again with the rollover
+    now[0] += 59
+    logger.info("fourth")
+    assert not (tmp_path / "triac.log.2.gz").exists()
@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from triac.lib.minimize import ddmin, split
+
+
+def reproduces_with(*needed):
+    """
+    Tester that reproduces the error if all needed items are present
+    and records every candidate it was asked to test
+    """
+    tested = []
+
+    def test(candidates: List[List[int]]) -> Optional[int]:
+        for position, candidate in enumerate(candidates):
+            tested.append(candidate)
+            if all([item in candidate for item in needed]):
+                return position
+        return None
+
+    return test, tested
+
+
+def test_split():
+    assert split([1, 2, 3, 4, 5], 2) == [[1, 2, 3], [4, 5]]
+    assert split([1, 2, 3], 3) == [[1], [2], [3]]
+
+
+def test_single_culprit():
+    test, _ = reproduces_with(5)
+    assert ddmin(list(range(8)), test) == [5]
+
+
+def test_culprits_in_different_chunks():
+    test, _ = reproduces_with(1, 6)
+    assert ddmin(list(range(8)), test) == [1, 6]
+
+
+def test_result_is_one_minimal():
+    needed = [0, 3, 4, 9]
+    test, _ = reproduces_with(*needed)
+    result = ddmin(list(range(10)), test)
+    assert result == needed
+    for item in result:
+        assert test([[i for i in result if i != item]]) is None
+
+
+def test_order_is_kept():
+    test, _ = reproduces_with("c", "a")
+    assert ddmin(["d", "c", "b", "a"], test) == ["c", "a"]
+
+
+def test_single_item_is_not_tested():
+    test, tested = reproduces_with(1)
+    assert ddmin([1], test) == [1]
+    assert tested == []
+
+
+def test_rejected_candidates_are_not_tested_again():
+    test, tested = reproduces_with(2, 5, 7)
+    ddmin(list(range(12)), test)
+    assert len(tested) == len(set([tuple(c) for c in tested]))
@@ -0,0 +1,114 @@
+import random
+from collections import Counter
+from os import makedirs
+from shutil import rmtree
+
+import pytest
+
+import triac.lib.path_index as path_index
+from triac.lib.path_index import (
+    Candidates,
+    FileType,
+    PathIndex,
+    PathIndexSnapshot,
+    depth,
+)
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    # /tmp is not indexed inside the containers
+    monkeypatch.setattr(path_index, "IGNORE_PATHS", "^$")
+    monkeypatch.setattr(path_index, "indexes", {})
+    makedirs(tmp_path / "etc" / "conf.d")
+    (tmp_path / "etc" / "conf.d" / "a.conf").write_text("a")
+    (tmp_path / "etc" / "hosts").write_text("hosts")
+    makedirs(tmp_path / "var" / "empty")
+    return str(tmp_path)
+
+
+def all_paths(index: PathIndex):
+    files, dirs, empty_dirs = index.entries()
+    return set(files), set(dirs), set(empty_dirs)
+
+
+def test_removed_tree_is_dropped(root):
+    index = PathIndex(root)
+    rmtree(f"{root}/etc")
+    index.update(f"{root}/etc")
+
+    files, dirs, _ = all_paths(index)
+    assert files == set()
+    assert dirs == {f"{root}/var", f"{root}/var/empty"}
+
+
+def test_created_tree_is_indexed(root):
+    index = PathIndex(root)
+    makedirs(f"{root}/opt/app")
+    open(f"{root}/opt/app/run", "w").close()
+    index.update(f"{root}/opt")
+
+    files, dirs, empty_dirs = all_paths(index)
+    assert f"{root}/opt/app/run" in files
+    assert {f"{root}/opt", f"{root}/opt/app"} <= dirs
+    assert f"{root}/opt/app" not in empty_dirs
+
+
+def test_parent_emptiness_is_updated(root):
+    index = PathIndex(root)
+    open(f"{root}/var/empty/file", "w").close()
+    index.update(f"{root}/var/empty/file")
+
+    _, _, empty_dirs = all_paths(index)
+    assert f"{root}/var/empty" not in empty_dirs
+
+
+def test_snapshot_with_updates(root):
+    index = path_index.get_path_index(root)
+    snapshot = PathIndexSnapshot.take()
+
+    # The intermediate image contains the changes of the earlier wrappers
+    rmtree(f"{root}/etc/conf.d")
+    path_index.update_path_indexes(f"{root}/etc/conf.d")
+    makedirs(f"{root}/srv/www")
+    path_index.update_path_indexes(f"{root}/srv")
+    expected = all_paths(index)
+
+    intermediate = snapshot.with_updates(PathIndexSnapshot.take_updates())
+    path_index.indexes.clear()
+    intermediate.restore()
+    assert all_paths(path_index.indexes[root]) == expected
+
+
+def test_sampled_paths_exist(root):
+    index = PathIndex(root)
+    rmtree(f"{root}/var/empty")
+    for _ in range(20):
+        path = index.sample(True, FileType.DIRECTORY, True, True)
+        assert path != f"{root}/var/empty"
+
+
+def test_candidates_are_balanced_over_depths():
+    # Deep trees like /usr/share hold most paths of a filesystem. Sampling
+    # every path uniformly would nearly never return shallow paths like /etc
+    candidates = Candidates()
+    candidates.add("/etc")
+    for i in range(1000):
+        candidates.add(f"/usr/share/doc/pkg/{i}")
+
+    random.seed(0)
+    depths = Counter(depth(candidates.sample()) for _ in range(2000))
+    assert 800 < depths[1] < 1200
+    assert 800 < depths[5] < 1200
+
+
+def test_candidates_discard():
+    candidates = Candidates()
+    for path in ["/a", "/a/b", "/a/c", "/d"]:
+        candidates.add(path)
+    candidates.discard("/a/b")
+    candidates.discard("/a/c")
+    candidates.discard("/missing")
+
+    assert sorted(candidates.paths) == ["/a", "/d"]
+    assert all(candidates.sample() in ["/a", "/d"] for _ in range(20))
@@ -3,49 +3,77 @@ import signal
 import sys
 import time
 from asyncio import Event
-from threading import Thread
-from typing import Container, Dict, List, Set
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from itertools import combinations
+from os.path import splitext
+from queue import Queue
+from threading import Thread, current_thread
+from typing import Container, Dict, List, Optional, Set, Tuple
 
 import click
 from art import text2art
 from deepdiff import DeepDiff
 
+from triac.lib.buckets import get_error_fingerprint
+from triac.lib.coverage import Observer
 from triac.lib.docker.client import DockerClient
 from triac.lib.docker.const import get_base_image_identifiers
+from triac.lib.docker.pool import ContainerPool
+from triac.lib.docker.reaper import reaper
 from triac.lib.docker.types.base_images import BaseImages
 from triac.lib.errors import persist_error
 from triac.lib.generator.ansible import Ansible
+from triac.lib.generator.connections import connections
 from triac.lib.generator.pyinfra import PyInfra
+from triac.lib.logs import (
+    LogFormat,
+    ToolLogs,
+    configure_headless_logging,
+    get_file_handler,
+    round_logs,
+)
+from triac.lib.metrics import Metrics
+from triac.lib.minimize import ddmin
+from triac.lib.tracing import TraceFormat, tracer
 from triac.types.errors import (
     ExecutionShouldStopRequestedError,
     StateMismatchError,
     TargetNotSupportedError,
     WrappersExhaustedError,
 )
-from triac.types.execution import Execution, ExecutionMode
+from triac.types.execution import CANDIDATE_STATES, Execution, ExecutionMode
+from triac.types.replay import ReplayResult, ReplayStatus
 from triac.types.target import Target
+from triac.types.worker import WorkerStatus
 from triac.types.wrapper import State, Wrapper
-from triac.types.wrappers import Wrappers, load
+from triac.types.wrappers import Identifier, Wrappers, load
 from triac.ui.cli_layout import CLILayout
 from triac.wrappers.systemd import Systemd
 
 
-def build_base_image(
-    docker: DockerClient, execution: Execution, image_cache: Dict[BaseImages, str]
-) -> BaseImages:
-    # Build the base image or take from cache
-    if execution.base_image not in image_cache:
-         image = docker.build_base_image(execution.base_image)
-         execution.add_image_to_used(image)
-         image_cache[execution.base_image] = image
-    #return docker.get_client().images.get(f"triac:DEBIAN12_POSTGRES16")
-    return image_cache[execution.base_image]
+def build_base_image(docker: DockerClient, execution: Execution) -> BaseImages:
+    # Build the base image or take from the cache of the host
+    with tracer.span("build_base_image"):
+        image, built = docker.get_base_image(execution.base_image)
+    execution.add_base_image_lookup(built)
+    if built:
+        execution.add_image_to_used(image)
+    return image
 
 
 def create_container_for_image(
-    docker: DockerClient, image: BaseImages, containers: List[Container]
+    docker: DockerClient,
+    image: BaseImages,
+    containers: List[Container],
+    pool: ContainerPool = None,
 ):
-    container = docker.run_container_from_image(image)
+    with tracer.span("run_container", pooled=pool is not None):
+        if pool is not None:
+            container = pool.acquire(image)
+        else:
+            container = docker.run_container_from_image(image)
     containers.append(container)
     return container
 
@@ -71,27 +99,37 @@ def execute_against_target(
     container: Container,
     wrapper: Wrapper,
     logger: logging.Logger,
+    observe: Observer = None,
 ) -> State:
     match target:
         case Target.ANSIBLE:
             logger.info(f"Executing Ansible against target")
-            is_state = Ansible(wrapper, target_state, container).run()
+            generator = Ansible(wrapper, target_state, container)
         case Target.PYINFRA:
             logger.info(f"Executing pyinfra against target")
-            is_state = PyInfra(wrapper, target_state, container).run()
+            generator = PyInfra(wrapper, target_state, container)
         case _:
             raise TargetNotSupportedError(target)
+    with tracer.context(target=target.value):
+        is_state = generator.run()
 
     logger.debug(f"Got the following actual state:")
     logger.debug(is_state)
 
+    if observe is not None:
+        observe(target, is_state, generator.changed)
+
     return is_state
 
 
+def states_equal(first: State, second: State) -> bool:
+    return len(DeepDiff(first, second).affected_root_keys) == 0
+
+
 def raise_error_when_states_not_equal(
     is_state: State, target_state: State, logger: logging.Logger
 ):
-    if len(DeepDiff(is_state, target_state).affected_root_keys) > 0:
+    if not states_equal(is_state, target_state):
         raise StateMismatchError(target_state, is_state)
 
 
@@ -102,9 +140,12 @@ def exec_unit_test_with_wrapper(
     wrapper: Wrapper,
     logger: logging.Logger,
     stop_event: Event,
+    observe: Observer = None,
 ) -> State:
     # Execute against the target
-    is_state = execute_against_target(target, target_state, container, wrapper, logger)
+    is_state = execute_against_target(
+        target, target_state, container, wrapper, logger, observe
+    )
     raise_when_stop_event_set(stop_event)
 
     # Check states for equality
@@ -114,6 +155,46 @@ def exec_unit_test_with_wrapper(
     return is_state
 
 
+def raise_error_when_targets_disagree(
+    targets: List[Target],
+    states: List[State],
+    target_state: State,
+    logger: logging.Logger,
+):
+    # Group the tools by the state they reached
+    groups: List[Tuple[State, List[Target]]] = []
+    for target, state in zip(targets, states):
+        for group_state, members in groups:
+            if states_equal(state, group_state):
+                members.append(target)
+                break
+        else:
+            groups.append((state, [target]))
+
+    # Majority vote, ties are decided in favour of the target state
+    majority_state, majority = max(
+        groups, key=lambda g: (len(g[1]), states_equal(g[0], target_state))
+    )
+
+    if not states_equal(majority_state, target_state):
+        # Not even the majority reached the target state
+        disagreeing = [
+            target
+            for target, state in zip(targets, states)
+            if not states_equal(state, target_state)
+        ]
+        actual = majority_state
+    else:
+        disagreeing = [target for target in targets if target not in majority]
+        actual = states[targets.index(disagreeing[0])] if disagreeing else None
+
+    if len(disagreeing) > 0:
+        for state, members in groups:
+            logger.debug(f"{', '.join([t.value for t in members])} reached state:")
+            logger.debug(state)
+        raise StateMismatchError(target_state, actual, disagreeing)
+
+
 def exec_differential_test_with_wrapper(
     execution: Execution,
     target_state: State,
@@ -124,33 +205,48 @@ def exec_differential_test_with_wrapper(
     docker: DockerClient,
     image: BaseImages,
     containers: List[Container],
+    observe: Observer = None,
 ):
-    # Execute first tool against target
-    first_state = exec_unit_test_with_wrapper(
-        execution.first_differential_target,
-        target_state,
-        container,
-        wrapper,
-        logger,
-        stop_event,
-    )
+    def exec_target(target: Target, target_container: Container) -> State:
+        # Every tool except the first one gets its own container
+        if target_container is None:
+            raise_when_stop_event_set(stop_event)
+            target_container = create_container_for_image(docker, image, containers)
+        raise_when_stop_event_set(stop_event)
+        return execute_against_target(
+            target, target_state, target_container, wrapper, logger, observe
+        )
 
-    # Create second container for second tool
-    raise_when_stop_event_set(stop_event)
-    second_container = create_container_for_image(docker, image, containers)
-    raise_when_stop_event_set(stop_event)
-    second_state = exec_unit_test_with_wrapper(
-        execution.second_differential_target,
-        target_state,
-        second_container,
-        wrapper,
-        logger,
-        stop_event,
-    )
+    # All tools are executed concurrently. The containers of
+    # the other tools boot while the first tool is already running
+    targets = execution.differential_targets
+    with ThreadPoolExecutor(
+        max_workers=len(targets),
+        thread_name_prefix=f"{current_thread().name}-differential",
+    ) as executor:
+        # The tools keep the tracing attributes of the wrapper
+        futures = [
+            executor.submit(
+                copy_context().run,
+                exec_target,
+                target,
+                container if i == 0 else None,
+            )
+            for i, target in enumerate(targets)
+        ]
 
-    # Check the states for equality
+    # Errors of earlier tools take precedence, as in a sequential execution
+    states = [future.result() for future in futures]
+
+    # Compare the states of all tools
     raise_when_stop_event_set(stop_event)
-    raise_error_when_states_not_equal(first_state, second_state, logger)
+    raise_error_when_targets_disagree(targets, states, target_state, logger)
+
+
+def log_disagreeing_targets(e: StateMismatchError, logger: logging.Logger):
+    if len(e.disagreeing) > 0:
+        names = ", ".join([target.value for target in e.disagreeing])
+        logger.error(f"The following tools did not reach the expected state: {names}")
 
 
 def check_slow_mode(execution: Execution, logger: logging.Logger):
@@ -164,50 +260,58 @@ def exec_fuzzing_round(
     docker: DockerClient,
     execution: Execution,
     stop_event: Event,
-    image_cache: Dict[BaseImages, str],
     containers: List[Container],
+    pool: ContainerPool = None,
 ):
-    # Start new round
-    execution.start_new_round()
     logger = logging.getLogger(__name__)
     logger.info(
-        f"***** Starting fuzzing round {execution.round} on image {execution.base_image.name} *****"
+        f"***** Starting fuzzing round {execution.worker_round} on image {execution.base_image.name} *****"
     )
 
     # Build base image
-    image = build_base_image(docker, execution, image_cache)
+    image = build_base_image(docker, execution)
+    base_image = image
     raise_when_stop_event_set(stop_event)
 
     # Main execution loop
+    container = None
     while execution.wrappers_left_in_round():
         raise_when_stop_event_set(stop_event)
         logger.info(f"---- Executing wrapper #{execution.num_wrappers_in_round + 1}")
 
-        container = create_container_for_image(docker, image, containers)
+        if container is None or not execution.reuse_containers:
+            # Only containers of the base image are kept booted in the pool
+            container = create_container_for_image(
+                docker, image, containers, pool if image == base_image else None
+            )
         raise_when_stop_event_set(stop_event)
 
         # Randomly choose next wrapper and get target state
-        wrapper = get_next_wrapper(execution, container, logger)
-        target_state = execution.add_wrapper_to_round(wrapper, container)
+        wrapper, target_state = get_next_wrapper(execution, container, logger)
+        execution.add_wrapper_and_state_to_round(wrapper, target_state)
         raise_when_stop_event_set(stop_event)
 
-        image = execute_wrapper(
-            execution,
-            docker,
-            target_state,
-            container,
-            containers,
-            image,
-            wrapper,
-            logger,
-            stop_event,
-        )
+        with tracer.context(wrapper=wrapper.__name__):
+            with tracer.span("execute_wrapper"):
+                image = execute_wrapper(
+                    execution,
+                    docker,
+                    target_state,
+                    container,
+                    containers,
+                    image,
+                    wrapper,
+                    logger,
+                    stop_event,
+                )
 
         # Check slow mode
         check_slow_mode(execution, logger)
 
-        # Remove containers
-        remove_containers(docker, containers)
+        # Remove containers unless they are reused for the next wrapper.
+        # Reused containers are removed at the end of the round
+        if not execution.reuse_containers:
+            remove_containers(docker, containers)
 
 
 def print_debug_header(logger: logging.Logger):
@@ -216,27 +320,42 @@ def print_debug_header(logger: logging.Logger):
 
 
 def remove_containers(docker: DockerClient, containers: List[Container]):
+    # Removed in the background, the rounds do not wait for docker
     for container in containers:
-        docker.remove_container(container)
+        connections.release(container)
+        reaper.remove_container(docker, container)
     containers.clear()
 
 
-def cleanup_images(docker: DockerClient, logger: logging.Logger, images: List[str]):
+def cleanup_images(
+    docker: DockerClient,
+    logger: logging.Logger,
+    images: List[str],
+    prune: bool = True,
+):
+    # Without prune, the parents of the images are removed
+    # together with the other dangling images of the host
     for image in images:
         logger.debug(f"Removing image {image}")
-        docker.remove_image(image)
+        reaper.remove_image(docker, image, prune)
 
 
-def perform_cleanup(execution: Execution, logger: logging.Logger, docker: DockerClient):
+def perform_cleanup(
+    execution: Execution, logger: logging.Logger, dockers: List[DockerClient]
+):
     logger.info("Cleaning up resources")
     logger.debug("The following images where used during execution:")
     logger.debug(execution.used_docker_images)
-    to_remove = filter(
-        lambda elem: elem not in get_base_image_identifiers()
-        or not execution.keep_base_images,
-        execution.used_docker_images,
-    )
-    cleanup_images(docker, logger, to_remove)
+    # Every host removes the images it built itself
+    for docker in dockers:
+        to_remove = filter(
+            lambda elem: elem not in get_base_image_identifiers()
+            or not execution.keep_base_images,
+            docker.built_images,
+        )
+        cleanup_images(docker, logger, to_remove)
+    # Wait until the containers and images are removed
+    reaper.drain()
 
 
 def get_execution_for_replay(
@@ -244,6 +363,7 @@ def get_execution_for_replay(
     keep_base_images: bool,
     log_level: str,
     ui_log_level: str,
+    jobs: int = 1,
 ) -> Execution:
     # Parse replay file
     try:
@@ -255,6 +375,18 @@ def get_execution_for_replay(
         )
         sys.exit(1)
 
+    return get_execution_for_wrappers(
+        to_replay, keep_base_images, log_level, ui_log_level, jobs
+    )
+
+
+def get_execution_for_wrappers(
+    to_replay: Wrappers,
+    keep_base_images: bool,
+    log_level: str,
+    ui_log_level: str,
+    jobs: int = 1,
+) -> Execution:
     return Execution(
         to_replay.base_image.name,
         keep_base_images,
@@ -266,6 +398,8 @@ def get_execution_for_replay(
         False,
         to_replay.unit,
         to_replay.differential,
+        jobs,
+        reuse_containers=to_replay.reuse_containers,
         replay_wrappers=to_replay,
     )
 
@@ -281,96 +415,142 @@ def execute_wrapper(
     logger: logging.Logger,
     stop_event: Event,
 ):
-    if execution.mode == ExecutionMode.UNIT:
-        # Unit test
-        exec_unit_test_with_wrapper(
-            execution.unit_target,
-            target_state,
-            container,
-            wrapper,
-            logger,
-            stop_event,
-        )
-        logger.info(f"Target state reached, wrapper finished")
-    else:
-        # Differential test
-        exec_differential_test_with_wrapper(
-            execution,
-            target_state,
-            container,
-            wrapper,
-            logger,
-            stop_event,
-            docker,
-            image,
-            containers,
-        )
-        logger.info("Target state reached by all targets, wrapper finished")
+    # Every tool reports its outcome, the execution is recorded once
+    arm = execution.get_coverage_arm(wrapper, target_state)
+    outcomes = []
+
+    def observe(target: Target, is_state: State, changed: Optional[bool]):
+        outcomes.append((target, is_state, changed))
+
+    try:
+        if execution.mode == ExecutionMode.UNIT:
+            # Unit test
+            exec_unit_test_with_wrapper(
+                execution.unit_target,
+                target_state,
+                container,
+                wrapper,
+                logger,
+                stop_event,
+                observe,
+            )
+            logger.info(f"Target state reached, wrapper finished")
+        else:
+            # Differential test
+            exec_differential_test_with_wrapper(
+                execution,
+                target_state,
+                container,
+                wrapper,
+                logger,
+                stop_event,
+                docker,
+                image,
+                containers,
+                observe,
+            )
+            logger.info("Target state reached by all targets, wrapper finished")
+    finally:
+        # Mismatches are recorded as well
+        if len(outcomes) > 0 and execution.coverage.record(arm, target_state, outcomes):
+            logger.debug("The wrapper showed new behaviour")
+
+    # The live container is used for the next wrapper, no snapshot needed
+    if execution.reuse_containers:
+        return image
 
     # Commit container for next round
-    image = docker.commit_container_to_image(container)
+    with tracer.span("commit_container_to_image"):
+        image = docker.commit_container_to_image(container)
     execution.add_intermediate_image_to_used(image)
     return image
 
 
-def exec_replay(execution: Execution, stop_event: Event):
+def replay_target_states(
+    docker: DockerClient,
+    execution: Execution,
+    target_states: List[Tuple[Identifier, State]],
+    stop_event: Event,
+    containers: List[Container],
+    interactive: bool = False,
+):
+    """
+    Executes the wrappers with the given target states in the round
+    of the current worker. Raises a StateMismatchError on a mismatch.
+    Interactive replays wait for the user before and after every wrapper.
+    """
     logger = logging.getLogger(__name__)
-    image_cache = {}
-    containers: List[Container] = []
-    print_debug_header(logger)
-
-    execution.start_new_round()
-    logger.info(f"***** Starting replay on image {execution.base_image.name} *****")
 
-    try:
-        # Initialize docker client
-        docker = DockerClient()
+    # Build base image
+    image = build_base_image(docker, execution)
+    raise_when_stop_event_set(stop_event)
 
-        # Build base image
-        image = build_base_image(docker, execution, image_cache)
+    # Replay the wrappers
+    container = None
+    for identifier, target_state in target_states:
         raise_when_stop_event_set(stop_event)
+        logger.info(f"---- Executing wrapper #{execution.num_wrappers_in_round + 1}")
 
-        # Replace the wrappers wrappers
-        for identifier, target_state in execution.replay_wrappers.target_states:
-            raise_when_stop_event_set(stop_event)
-            logger.info(
-                f"---- Executing wrapper #{execution.num_wrappers_in_round + 1}"
-            )
-
+        if container is None or not execution.reuse_containers:
             container = create_container_for_image(docker, image, containers)
-            raise_when_stop_event_set(stop_event)
+        raise_when_stop_event_set(stop_event)
 
-            # Instantiate wrapper
-            wrapper = execution.get_wrapper_by_name(identifier.name)
-            if wrapper == None:
-                raise Exception(
-                    f"No wrapper with the name {identifier.name} could be found for replay"
-                )
-            execution.add_wrapper_and_state_to_round(wrapper, target_state)
-            raise_when_stop_event_set(stop_event)
+        # Instantiate wrapper
+        wrapper = execution.get_wrapper_by_name(identifier.name)
+        if wrapper == None:
+            raise Exception(
+                f"No wrapper with the name {identifier.name} could be found for replay"
+            )
+        execution.add_wrapper_and_state_to_round(wrapper, target_state)
+        raise_when_stop_event_set(stop_event)
 
+        if interactive:
             logger.info("Press Enter to continue the execute the wrapper...")
             time.sleep(2)  # Hacky UI Update
             input()
 
-            image = execute_wrapper(
-                execution,
-                docker,
-                target_state,
-                container,
-                containers,
-                image,
-                wrapper,
-                logger,
-                stop_event,
-            )
+        image = execute_wrapper(
+            execution,
+            docker,
+            target_state,
+            container,
+            containers,
+            image,
+            wrapper,
+            logger,
+            stop_event,
+        )
 
+        if interactive:
             logger.info("Press Enter to continue with next wrapper...")
             time.sleep(2)  # Hacky UI Update
             input()
 
-            # Remove containers
+        # Remove containers unless they are reused for the next wrapper
+        if not execution.reuse_containers:
             remove_containers(docker, containers)
+
+
+def exec_replay(execution: Execution, stop_event: Event):
+    logger = logging.getLogger(__name__)
+    containers: List[Container] = []
+    print_debug_header(logger)
+
+    execution.start_new_round()
+    logger.info(f"***** Starting replay on image {execution.base_image.name} *****")
+
+    try:
+        # Initialize docker client
+        docker = DockerClient()
+
+        replay_target_states(
+            docker,
+            execution,
+            execution.replay_wrappers.target_states,
+            stop_event,
+            containers,
+            interactive=True,
+        )
     except ExecutionShouldStopRequestedError as e:
         # Do nothing, the method failed because the execution should stop
         pass
@@ -380,6 +560,7 @@ def exec_replay(execution: Execution, stop_event: Event):
         logger.error(e.target)
         logger.error("Actual state:")
         logger.error(e.actual)
+        log_disagreeing_targets(e, logger)
         execution.set_error_for_round(e.target, e.actual)
 
         logger.info("Press Enter to finish execution")
@@ -393,18 +574,91 @@ def exec_replay(execution: Execution, stop_event: Event):
         # Remove containers
         remove_containers(docker, containers)
         # Cleanup all intermediate images
-        cleanup_images(docker, logger, execution.used_intermediate_images)
+        cleanup_images(docker, logger, execution.used_intermediate_images, prune=False)
         execution.reset_intermediate_images()
         # Cleanup the base images
-        perform_cleanup(execution, logger, docker)
+        perform_cleanup(execution, logger, [docker])
 
 
-def exec_fuzzing(execution: Execution, stop_event: Event):
+def replay_headless(
+    docker: DockerClient,
+    execution: Execution,
+    target_states: List[Tuple[Identifier, State]],
+    stop_event: Event,
+) -> ReplayResult:
+    """
+    Replays the target states without user interaction in a new
+    round of the worker that the calling thread is bound to
+    """
+    logger = logging.getLogger(__name__)
+    containers: List[Container] = []
+    execution.start_replay_round()
+    start = time.time()
+
+    try:
+        replay_target_states(docker, execution, target_states, stop_event, containers)
+        return ReplayResult(
+            ReplayStatus.NOT_REPRODUCED,
+            execution.num_wrappers_in_round,
+            time.time() - start,
+        )
+    except StateMismatchError as e:
+        wrapper = execution.target_states[-1][0].name
+        return ReplayResult(
+            ReplayStatus.REPRODUCED,
+            execution.num_wrappers_in_round,
+            time.time() - start,
+            error=e,
+            fingerprint=get_error_fingerprint(wrapper, e),
+        )
+    except ExecutionShouldStopRequestedError as e:
+        raise e
+    except Exception as e:
+        logger.debug("Could not replay the wrappers:")
+        logger.debug(e)
+        return ReplayResult(
+            ReplayStatus.CRASHED,
+            execution.num_wrappers_in_round,
+            time.time() - start,
+            message=str(e),
+        )
+    finally:
+        remove_containers(docker, containers)
+        cleanup_images(docker, logger, execution.used_intermediate_images, prune=False)
+        execution.reset_intermediate_images()
+
+
+def replay_candidate(
+    docker: DockerClient,
+    execution: Execution,
+    worker_ids: Queue,
+    target_states: List[Tuple[Identifier, State]],
+    stop_event: Event,
+) -> ReplayResult:
+    # Every candidate is replayed by one of the free workers
+    worker_id = worker_ids.get()
+    execution.bind_worker(worker_id, docker.host)
+    execution.set_worker_status(WorkerStatus.RUNNING)
+    try:
+        return replay_headless(docker, execution, target_states, stop_event)
+    finally:
+        execution.set_worker_status(WorkerStatus.IDLE)
+        worker_ids.put(worker_id)
+
+
+def exec_minimize(execution: Execution, stop_event: Event, output: str):
     logger = logging.getLogger(__name__)
-    image_cache = {}
     print_debug_header(logger)
+    replay = execution.replay_wrappers
+    logger.info(
+        f"***** Minimizing replay of {replay.count} wrappers on image {replay.base_image.name} *****"
+    )
+
+    # Every candidate is replayed by one of the workers
+    worker_ids = Queue()
+    for worker in execution.workers:
+        worker_ids.put(worker.id)
 
-    # Initialize docker client
     try:
         docker = DockerClient()
     except Exception as e:
@@ -412,45 +666,189 @@ def exec_fuzzing(execution: Execution, stop_event: Event):
         logger.exception(e)
         return
 
-    # Execute all the rounds
-    while execution.rounds_left() and stop_event.is_set() == False:
+    executor = ThreadPoolExecutor(
+        max_workers=execution.jobs, thread_name_prefix="minimize"
+    )
+    try:
+        # The mismatch that all candidates have to reproduce
+        baseline = replay_candidate(
+            docker, execution, worker_ids, replay.target_states, stop_event
+        )
+        if baseline.status != ReplayStatus.REPRODUCED:
+            logger.error("The replay does not end with a mismatch, nothing to minimize")
+            return
+        fingerprint, error = baseline.fingerprint, baseline.error
+        logger.info(f"Replay reproduces the mismatch of bucket {fingerprint}")
+
+        def reproduces(
+            target_states: List[Tuple[Identifier, State]],
+        ) -> Optional[StateMismatchError]:
+            result = replay_candidate(
+                docker, execution, worker_ids, target_states, stop_event
+            )
+            if result.fingerprint != fingerprint:
+                return None
+            return result.error
+
+        def test(candidates: List[List[Tuple[Identifier, State]]]) -> Optional[int]:
+            nonlocal error
+            # One candidate per job is replayed at the same time
+            for start in range(0, len(candidates), execution.jobs):
+                wave = candidates[start : start + execution.jobs]
+                for position, found in enumerate(list(executor.map(reproduces, wave))):
+                    if found is not None:
+                        error = found
+                        return start + position
+            return None
+
+        # Remove wrappers
+        target_states = ddmin(replay.target_states, test)
+        logger.info(
+            f"Reduced the replay from {replay.count} to {len(target_states)} wrappers"
+        )
+
+        # Write the minimized replay
+        minimized = Wrappers(
+            replay.base_image,
+            replay.unit,
+            replay.differential,
+            target_states,
+            replay.reuse_containers,
+        )
+        minimized.set_error_state(error.target, error.actual)
+        with open(output, "wb") as file:
+            file.write(minimized.encode())
+        logger.info(f"Wrote minimized replay to {output}")
+    except ExecutionShouldStopRequestedError as e:
+        # Do nothing, the method failed because the execution should stop
+        pass
+    except Exception as e:
+        logger.error("Encountered unexpected error during minimization:")
+        logger.exception(e)
+    finally:
+        executor.shutdown()
+        perform_cleanup(execution, logger, [docker])
+
+
+def exec_fuzzing_worker(
+    worker_id: int,
+    docker: DockerClient,
+    execution: Execution,
+    stop_event: Event,
+    pool: ContainerPool = None,
+):
+    logger = logging.getLogger(__name__)
+    execution.bind_worker(worker_id, docker.host)
+    execution.set_worker_status(WorkerStatus.RUNNING)
+
+    # Execute rounds until all of them have been claimed
+    while stop_event.is_set() == False and execution.start_new_round():
         containers = []  # Container to cleanup
-        try:
-            exec_fuzzing_round(docker, execution, stop_event, image_cache, containers)
-        except StateMismatchError as e:
-            logger.error("Found mismatch between target and actual state")
-            logger.error("Target state:")
-            logger.error(e.target)
-            logger.error("Actual state:")
-            logger.error(e.actual)
-            execution.set_error_for_round(e.target, e.actual)
-            persist_error(execution, e)
-            check_slow_mode(execution, logger)
-        except ExecutionShouldStopRequestedError as e:
-            # Do nothing, the method failed because the execution should stop
-            pass
-        except Exception as e:
-            logger.error("Encountered unexpected error during execution of round:")
-            logger.exception(e)
-            logger.error("\n")
-            if stop_event.is_set() == False:
-                if execution.continue_on_error == False:
-                    logger.error("Press Enter to continue with the next round...")
-                    input()
-                else:
-                    logger.error("Executing next round")
-        finally:
-            # Remove container that have not been removed
-            remove_containers(docker, containers)
-            # Cleanup all intermediate images
-            cleanup_images(docker, logger, execution.used_intermediate_images)
-            execution.reset_intermediate_images()
+        # All spans of the round carry the round and its base image
+        with tracer.context(
+            round=execution.worker_round, base_image=execution.base_image.name
+        ):
+            try:
+                exec_fuzzing_round(docker, execution, stop_event, containers, pool)
+            except StateMismatchError as e:
+                logger.error("Found mismatch between target and actual state")
+                logger.error("Target state:")
+                logger.error(e.target)
+                logger.error("Actual state:")
+                logger.error(e.actual)
+                log_disagreeing_targets(e, logger)
+                execution.set_error_for_round(e.target, e.actual)
+                persist_error(execution, e)
+                round_logs.persist()
+                check_slow_mode(execution, logger)
+            except ExecutionShouldStopRequestedError as e:
+                # Do nothing, the method failed because the execution should stop
+                pass
+            except Exception as e:
+                logger.error("Encountered unexpected error during execution of round:")
+                logger.exception(e)
+                round_logs.persist()
+                logger.error("\n")
+                if stop_event.is_set() == False:
+                    if execution.continue_on_error == False:
+                        logger.error("Press Enter to continue with the next round...")
+                        input()
+                    else:
+                        logger.error("Executing next round")
+            finally:
+                # Remove container that have not been removed
+                remove_containers(docker, containers)
+                # Cleanup all intermediate images
+                cleanup_images(
+                    docker, logger, execution.used_intermediate_images, prune=False
+                )
+                execution.reset_intermediate_images()
+                # The output of the tools is only kept for failed rounds
+                round_logs.discard()
+
+    execution.set_worker_status(WorkerStatus.FINISHED)
+
+
+def get_docker_clients(execution: Execution) -> List[DockerClient]:
+    if len(execution.docker_hosts) == 0:
+        return [DockerClient()]
+    return [DockerClient(host) for host in execution.docker_hosts]
+
+
+def exec_fuzzing(execution: Execution, stop_event: Event):
+    logger = logging.getLogger(__name__)
+    print_debug_header(logger)
+
+    # Initialize one docker client per host
+    try:
+        dockers = get_docker_clients(execution)
+    except Exception as e:
+        logger.error("Could not initialize docker client:")
+        logger.exception(e)
+        return
+
+    for docker in dockers:
+        execution.add_docker_client(docker)
+
+    # Keep booted containers ready on every host
+    pools = {}
+    if execution.warm_pool > 0:
+        for docker in dockers:
+            pools[docker] = ContainerPool(docker, execution.warm_pool)
+            pools[docker].prewarm(execution.base_images)
+            execution.add_container_pool(pools[docker])
+
+    # Execute all the rounds on the worker pool. The workers
+    # are spread evenly across the hosts and claim rounds
+    # from the same execution, so faster hosts execute more rounds
+    workers = [
+        Thread(
+            target=exec_fuzzing_worker,
+            args=(
+                worker_id,
+                dockers[worker_id % len(dockers)],
+                execution,
+                stop_event,
+                pools.get(dockers[worker_id % len(dockers)]),
+            ),
+            name=f"worker-{worker_id}",
+        )
+        for worker_id in range(execution.jobs)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Remove the containers that are still waiting in the pools
+    for pool in pools.values():
+        pool.close()
 
     if stop_event.is_set() == False:
         logger.info("All rounds executed")
 
     # Cleanup
-    perform_cleanup(execution, logger, docker)
+    perform_cleanup(execution, logger, dockers)
 
     # Done!
     if stop_event.is_set():
@@ -464,14 +862,22 @@ def exec_fuzzing(execution: Execution, stop_event: Event):
 def get_differential_options() -> List[str]:
     results: List[str] = []
     targets = [val.name for val in Target]
-    # Build all possible pairs
-    for first in range(0, len(targets)):
-        for second in range(first + 1, len(targets)):
-            results.append(f"{targets[first]}:{targets[second]}")
+    # Build all combinations of two or more tools
+    for size in range(2, len(targets) + 1):
+        for combination in combinations(targets, size):
+            results.append(":".join(combination))
     return results
 
 
-def validate_options(unit: Target, differential: str, replay: str):
+def validate_options(
+    unit: Target,
+    differential: str,
+    replay: str,
+    jobs: int,
+    slow_mode: bool,
+    minimize: bool,
+    headless: bool,
+):
     if unit != None and differential != None:
         print(
             "Error: You cannot enable differential and unit testing at the same time",
@@ -490,6 +896,30 @@ def validate_options(unit: Target, differential: str, replay: str):
             file=sys.stderr,
         )
         sys.exit(1)
+    elif minimize and replay == None:
+        print(
+            "Error: Minimization requires a replay file that is supplied with --replay",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    elif jobs > 1 and slow_mode:
+        print(
+            "Error: Slow mode cannot be used while executing multiple jobs",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    elif headless and slow_mode:
+        print(
+            "Error: Slow mode cannot be used in headless mode",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    elif headless and replay != None and not minimize:
+        print(
+            "Error: Replays are interactive, use 'python3 -m triac.recheck' to replay errors without user interaction",
+            file=sys.stderr,
+        )
+        sys.exit(1)
 
 
 @click.command()
@@ -540,7 +970,7 @@ def validate_options(unit: Target, differential: str, replay: str):
 @click.option(
     "--continue-on-error",
     "-C",
-    help="Whether triac should automatically continue with the execution of the next round whenever a unexpected error is encountered.",
+    help="Whether triac should automatically continue with the execution of the next round whenever a unexpected error is encountered. Always enabled when executing multiple jobs.",
     is_flag=True,
     default=False,
     show_default=True,
@@ -553,6 +983,54 @@ def validate_options(unit: Target, differential: str, replay: str):
     default=False,
     show_default=True,
 )
+@click.option(
+    "--jobs",
+    "-j",
+    help="The number of rounds to execute concurrently. Every job uses its own containers and images.",
+    type=click.IntRange(1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--docker-host",
+    "-H",
+    "docker_hosts",
+    help="A Docker endpoint to execute rounds on, e.g. unix:///var/run/docker.sock or tcp://10.0.0.2:2375. Can be supplied multiple times to spread the rounds across several hosts. At least one job is started per host. If not specified, the Docker environment variables are used.",
+    multiple=True,
+)
+@click.option(
+    "--reuse-containers/--no-reuse-containers",
+    help="Whether unit tests execute all wrappers of a round in the same live container. Otherwise, the container is committed to an image and a new container is started after every wrapper.",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--warm-pool",
+    help="Number of containers per base image that are booted ahead of time in the background, so that rounds do not have to wait for the container boot. 0 disables the pool.",
+    type=click.IntRange(0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--exemplars",
+    help="Number of errors that are stored per bucket. Errors with the same fingerprint (wrapper, differing fields, value classes and kinds of changes) are put into the same bucket. Further errors of a full bucket are only counted.",
+    type=click.IntRange(1),
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "--coverage-guided/--no-coverage-guided",
+    help="Whether the choice of wrappers and target states is biased towards combinations of wrapper, value categories and previous wrapper that were rarely executed or still lead to new behaviour. Otherwise, all choices are uniformly random. The number of unique behaviours is measured in both cases.",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--candidate-states",
+    help="Number of target states that are generated per wrapper when the fuzzing is guided by the coverage. The state with the least covered value categories is executed. Every candidate is generated in full, so the generation takes accordingly longer.",
+    type=click.IntRange(1),
+    default=CANDIDATE_STATES,
+    show_default=True,
+)
 @click.option(
     "--unit",
     "-U",
@@ -562,7 +1040,7 @@ def validate_options(unit: Target, differential: str, replay: str):
 @click.option(
     "--differential",
     "-D",
-    help="Enables differential testing between two tools. The tools have to be specified using one of the provided format options.",
+    help="Enables differential testing between two or more tools. The tools have to be specified using one of the provided format options. All tools execute the same target state concurrently and the tools that disagree with the majority are reported.",
     type=click.Choice(get_differential_options()),
 )
 @click.option(
@@ -572,6 +1050,80 @@ def validate_options(unit: Target, differential: str, replay: str):
         exists=True, dir_okay=False, file_okay=True, readable=True, resolve_path=True
     ),
 )
+@click.option(
+    "--minimize",
+    help="Minimizes the replay file instead of replaying it step by step. Wrappers are removed (delta debugging) as long as the replay still ends with the same mismatch. Candidates are replayed concurrently, one per job. The result is written next to the replay file as {name}-min.triac.",
+    is_flag=True,
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "--trace",
+    help="File to write the duration of every phase of the execution to, e.g. building images, running the tools or verifying the states. Every span carries the round, base image, wrapper and tool it belongs to.",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+@click.option(
+    "--trace-format",
+    help="Format of the trace file. 'jsonl' writes one JSON object per span, 'chrome' writes the Chrome trace format, which can be opened with chrome://tracing or Perfetto.",
+    type=click.Choice([format.value for format in TraceFormat]),
+    default=TraceFormat.JSONL.value,
+    show_default=True,
+)
+@click.option(
+    "--headless",
+    help="Runs without the UI and without waiting for user input, e.g. as a service. Unexpected errors continue with the next round and the log is also written to stderr with the log level of --ui-log-level. SIGTERM stops the execution like STRG+C.",
+    is_flag=True,
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "--log-format",
+    help="Format of the log file. 'json' writes one JSON object per line, including the round, base image, wrapper and tool the line belongs to.",
+    type=click.Choice([format.value for format in LogFormat]),
+    default=LogFormat.TEXT.value,
+    show_default=True,
+)
+@click.option(
+    "--log-max-size",
+    help="Size in MB after which the log file is rotated and compressed, 0 disables the rotation by size",
+    type=click.IntRange(0),
+    default=100,
+    show_default=True,
+)
+@click.option(
+    "--log-rotate-interval",
+    help="Hours after which the log file is rotated and compressed, 0 disables the rotation by time",
+    type=click.FloatRange(0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--log-backups",
+    help="Number of rotated log files that are kept",
+    type=click.IntRange(0),
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--tool-logs",
+    help="Whether the verbose debug output of the tools (generated files, Ansible events, output in the container) is always written to the log file or only for rounds that fail",
+    type=click.Choice([logs.value for logs in ToolLogs]),
+    default=ToolLogs.ALWAYS.value,
+    show_default=True,
+)
+@click.option(
+    "--metrics-port",
+    help="Serves metrics about the progress of the execution in the Prometheus text format on http://127.0.0.1:PORT/metrics, e.g. rounds, wrappers, errors, phase durations and the number of containers and images on the docker hosts.",
+    type=click.IntRange(1, 65535),
+    default=None,
+)
+@click.option(
+    "--metrics-textfile",
+    help="Writes the same metrics to FILE every 15 seconds, e.g. for the textfile collector of the Prometheus node exporter.",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
 def fuzz(
     rounds,
     wrappers_per_round,
@@ -581,14 +1133,42 @@ def fuzz(
     keep_base_images,
     continue_on_error,
     slow_mode,
+    jobs,
+    docker_hosts,
+    reuse_containers,
+    warm_pool,
+    exemplars,
+    coverage_guided,
+    candidate_states,
     unit,
     differential,
     replay,
+    minimize,
+    trace,
+    trace_format,
+    headless,
+    log_format,
+    log_max_size,
+    log_rotate_interval,
+    log_backups,
+    tool_logs,
+    metrics_port,
+    metrics_textfile,
 ):
     """Start a TRIaC fuzzing or replay session"""
-    validate_options(unit, differential, replay)
+    validate_options(unit, differential, replay, jobs, slow_mode, minimize, headless)
 
-    if replay != None:
+    if trace != None:
+        tracer.export(trace, TraceFormat(trace_format))
+
+    if replay != None and minimize:
+        state = get_execution_for_replay(
+            replay, keep_base_images, log_level, ui_log_level, jobs
+        )
+        thread_target = partial(
+            exec_minimize, output=f"{splitext(replay)[0]}-min.triac"
+        )
+    elif replay != None:
         state = get_execution_for_replay(
             replay, keep_base_images, log_level, ui_log_level
         )
@@ -602,10 +1182,19 @@ def fuzz(
             wrappers_per_round,
             log_level,
             ui_log_level,
-            continue_on_error,
+            # Nobody could confirm to continue. Concurrent workers
+            # cannot share stdin to wait for the confirmation
+            continue_on_error or headless or max(jobs, len(docker_hosts)) > 1,
             slow_mode,
             unit,
             differential,
+            max(jobs, len(docker_hosts)),
+            list(docker_hosts),
+            reuse_containers,
+            warm_pool,
+            exemplars,
+            coverage_guided,
+            candidate_states,
         )
         thread_target = exec_fuzzing
 
@@ -620,30 +1209,61 @@ def fuzz(
         logger.error("Execution cancellation requested, stopping current execution....")
 
     signal.signal(signal.SIGINT, interrupt_handler)
+    if headless:
+        signal.signal(signal.SIGTERM, interrupt_handler)
+
+    file_handler = get_file_handler(
+        log_level,
+        state.jobs,
+        LogFormat(log_format),
+        log_max_size * 1024 * 1024,
+        log_backups,
+        log_rotate_interval * 3600,
+        ToolLogs(tool_logs),
+    )
 
     # initialize the UI
-    ui = CLILayout(state)
+    if headless:
+        configure_headless_logging(log_level, ui_log_level, file_handler)
+    else:
+        ui = CLILayout(state, file_handler)
+
+    # Expose the metrics after the logging was configured
+    metrics = Metrics(state)
+    if metrics_port != None:
+        metrics.serve(metrics_port)
+    if metrics_textfile != None:
+        metrics.export_textfile(metrics_textfile)
 
     # Load the wrappers
     state.load_list_of_wrapper_classes()
 
     # Start the threads to display the UI and computation
     fuzz_worker = Thread(target=thread_target, args=(state, fuzz_stop))
-    ui_worker = Thread(
-        target=ui.render_ui,
-        args=(
-            ui_stop,
-            fuzz_stop,
-        ),
-    )
-
     fuzz_worker.start()
-    ui_worker.start()
 
-    fuzz_worker.join()
-    ui_stop.set()  # Set event when the worker finished to close the UI
+    if headless:
+        fuzz_worker.join()
+        logging.getLogger(__name__).info(
+            f"Executed {state.wrappers_executed} wrappers in {state.round} rounds, found {state.errors} errors"
+        )
+    else:
+        ui_worker = Thread(
+            target=ui.render_ui,
+            args=(
+                ui_stop,
+                fuzz_stop,
+            ),
+        )
+        ui_worker.start()
+
+        fuzz_worker.join()
+        ui_stop.set()  # Set event when the worker finished to close the UI
 
-    ui_worker.join()
+        ui_worker.join()
+    tracer.close()
+    metrics.close()
+    logging.shutdown()
 
 
 if __name__ == "__main__":
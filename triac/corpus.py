@@ -0,0 +1,138 @@
+import sys
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from triac.lib.corpus import Corpus
+from triac.lib.errors import get_path_to_errors
+
+# Command line interface to search the errors found by TRIaC.
+# Invoke from the root of the repository via: python3 -m triac.corpus
+
+
+def get_entry_or_exit(corpus: Corpus, id: int):
+    entry = corpus.get(id)
+    if entry is None:
+        print(f"Error: There is no corpus entry with id {id}", file=sys.stderr)
+        sys.exit(1)
+    return entry
+
+
+@click.group()
+@click.option(
+    "--errors",
+    help="Folder that contains the error corpus",
+    type=click.Path(file_okay=False),
+    default=get_path_to_errors(),
+    show_default=True,
+)
+@click.pass_context
+def corpus(ctx, errors):
+    ctx.obj = Corpus(errors)
+
+
+@corpus.command(name="list")
+@click.option("--wrapper", "-w", help="Only errors of rounds that executed the wrapper")
+@click.option(
+    "--target", "-t", help="Only errors that involve the target (e.g. ANSIBLE)"
+)
+@click.option("--base-image", "-b", help="Only errors found on the base image")
+@click.option("--field", "-f", help="Only errors where the field of the state differs")
+@click.option("--bucket", help="Only errors with the fingerprint")
+@click.option(
+    "--limit",
+    "-n",
+    help="Maximum number of errors to show",
+    type=click.IntRange(1),
+    default=50,
+    show_default=True,
+)
+@click.pass_obj
+def list_entries(corpus: Corpus, wrapper, target, base_image, field, bucket, limit):
+    """
+    Lists the newest errors that match all filters
+    """
+    entries = corpus.find(wrapper, target, base_image, field, limit, bucket)
+
+    table = Table()
+    for column in ["#", "Found", "Base Image", "Wrapper", "Targets", "Fields", "File"]:
+        table.add_column(column)
+    for entry in entries:
+        table.add_row(
+            str(entry.id),
+            entry.created.strftime("%Y-%m-%d %H:%M:%S"),
+            entry.base_image,
+            f"{entry.wrapper} ({entry.wrappers})",
+            ", ".join(entry.targets),
+            ", ".join(entry.fields),
+            entry.file,
+        )
+    Console().print(table)
+
+
+@corpus.command()
+@click.option(
+    "--limit",
+    "-n",
+    help="Maximum number of buckets to show",
+    type=click.IntRange(1),
+    default=50,
+    show_default=True,
+)
+@click.pass_obj
+def buckets(corpus: Corpus, limit):
+    """
+    Lists the buckets of equal errors, most frequent first
+    """
+    table = Table()
+    for column in ["Fingerprint", "Wrapper", "Fields", "Hits", "First", "Last"]:
+        table.add_column(column)
+    for bucket in corpus.buckets(limit):
+        table.add_row(
+            bucket.fingerprint,
+            bucket.wrapper,
+            ", ".join(bucket.fields),
+            str(bucket.count),
+            bucket.first_seen.strftime("%Y-%m-%d %H:%M:%S"),
+            bucket.last_seen.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+    Console().print(table)
+
+
+@corpus.command()
+@click.argument("id", type=int)
+@click.pass_obj
+def show(corpus: Corpus, id):
+    """
+    Shows the states and changes of an error
+    """
+    entry = get_entry_or_exit(corpus, id)
+    console = Console()
+    console.print(f"[bold]Error #{entry.id}[/bold] found {entry.created}")
+    console.print(f"Wrapper: {entry.wrapper}, Targets: {', '.join(entry.targets)}")
+    console.print(f"Bucket: {entry.fingerprint}")
+    console.print("[bold]Target state:[/bold]")
+    console.print(entry.target_state)
+    console.print("[bold]Actual state:[/bold]")
+    console.print(entry.actual_state)
+    console.print("[bold]Changes:[/bold]")
+    console.print_json(entry.changes)
+
+
+@corpus.command()
+@click.argument("id", type=int)
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.pass_obj
+def export(corpus: Corpus, id, output):
+    """
+    Exports an error to a .triac file that can be replayed
+    """
+    get_entry_or_exit(corpus, id)
+    with open(output, "wb") as file:
+        file.write(corpus.get_data(id))
+    print(f"Exported error #{id} to {output}")
+
+
+if __name__ == "__main__":
+    corpus()
@@ -0,0 +1,49 @@
+import hashlib
+import re
+from typing import List
+
+from deepdiff import DeepDiff
+
+from triac.types.errors import StateMismatchError
+from triac.types.wrapper import State
+
+
+def normalize_change_path(path: str) -> str:
+    # Positions in lists differ between hits of the same problem
+    return re.sub(r"\[\d+\]", "[]", path)
+
+
+def get_fingerprint(
+    wrapper: str,
+    target: State,
+    actual: State,
+    diff: DeepDiff,
+    disagreeing: List[str] = [],
+) -> str:
+    """
+    Normalized signature of a mismatch. Mismatches of the same wrapper
+    that differ in the same fields, value classes and kinds of changes
+    are considered to have the same root cause. Concrete values (e.g.
+    paths or user names) are not part of the fingerprint.
+    """
+    parts = [wrapper, ",".join(sorted(disagreeing))]
+
+    for key in sorted([str(key) for key in diff.affected_root_keys]):
+        target_class = type(target.get(key)).__name__
+        actual_class = type(actual.get(key)).__name__
+        parts.append(f"{key}:{target_class}:{actual_class}")
+
+    for change, paths in sorted(diff.items()):
+        for path in sorted(set([normalize_change_path(p) for p in paths])):
+            parts.append(f"{change}:{path}")
+
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def get_error_fingerprint(wrapper: str, e: StateMismatchError) -> str:
+    """
+    Fingerprint of the mismatch that the wrapper caused
+    """
+    diff = DeepDiff(e.target, e.actual)
+    disagreeing = [target.name for target in e.disagreeing]
+    return get_fingerprint(wrapper, e.target, e.actual, diff, disagreeing)
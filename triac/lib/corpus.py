@@ -0,0 +1,351 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from os.path import join
+from pathlib import Path
+from typing import List, Optional
+
+CORPUS_FILE = "corpus.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    file TEXT NOT NULL,
+    base_image TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    wrapper TEXT NOT NULL,
+    wrappers INTEGER NOT NULL,
+    target_state TEXT NOT NULL,
+    actual_state TEXT NOT NULL,
+    changes TEXT NOT NULL,
+    data BLOB NOT NULL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    fingerprint TEXT PRIMARY KEY,
+    wrapper TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS error_wrappers (
+    error_id INTEGER NOT NULL REFERENCES errors(id),
+    position INTEGER NOT NULL,
+    wrapper TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS error_targets (
+    error_id INTEGER NOT NULL REFERENCES errors(id),
+    target TEXT NOT NULL,
+    disagreeing INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS error_fields (
+    error_id INTEGER NOT NULL REFERENCES errors(id),
+    field TEXT NOT NULL
+);
+"""
+
+# Created after the migrations, as they might refer to new columns
+INDEXES = """
+CREATE INDEX IF NOT EXISTS errors_wrapper ON errors(wrapper);
+CREATE INDEX IF NOT EXISTS errors_base_image ON errors(base_image);
+CREATE INDEX IF NOT EXISTS errors_fingerprint ON errors(fingerprint);
+CREATE INDEX IF NOT EXISTS error_wrappers_wrapper ON error_wrappers(wrapper, error_id);
+CREATE INDEX IF NOT EXISTS error_targets_target ON error_targets(target, error_id);
+CREATE INDEX IF NOT EXISTS error_fields_field ON error_fields(field, error_id);
+"""
+
+# Columns that were added to existing corpora later on
+MIGRATIONS = {"errors": {"fingerprint": "TEXT"}}
+
+
+class CorpusEntry:
+    def __init__(self, row: sqlite3.Row, targets: List[str], fields: List[str]):
+        self.__row = row
+        self.__targets = targets
+        self.__fields = fields
+
+    @property
+    def id(self) -> int:
+        return self.__row["id"]
+
+    @property
+    def created(self) -> datetime:
+        return datetime.fromisoformat(self.__row["created"])
+
+    @property
+    def file(self) -> str:
+        """
+        Name of the error files (without extension)
+        """
+        return self.__row["file"]
+
+    @property
+    def base_image(self) -> str:
+        return self.__row["base_image"]
+
+    @property
+    def mode(self) -> str:
+        return self.__row["mode"]
+
+    @property
+    def wrapper(self) -> str:
+        """
+        The wrapper that caused the mismatch (last wrapper of the round)
+        """
+        return self.__row["wrapper"]
+
+    @property
+    def wrappers(self) -> int:
+        return self.__row["wrappers"]
+
+    @property
+    def targets(self) -> List[str]:
+        return self.__targets
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        The root keys of the state that differ
+        """
+        return self.__fields
+
+    @property
+    def target_state(self) -> str:
+        return self.__row["target_state"]
+
+    @property
+    def actual_state(self) -> str:
+        return self.__row["actual_state"]
+
+    @property
+    def changes(self) -> str:
+        return self.__row["changes"]
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self.__row["fingerprint"]
+
+
+class Bucket:
+    def __init__(self, row: sqlite3.Row):
+        self.__row = row
+
+    @property
+    def fingerprint(self) -> str:
+        return self.__row["fingerprint"]
+
+    @property
+    def wrapper(self) -> str:
+        return self.__row["wrapper"]
+
+    @property
+    def fields(self) -> List[str]:
+        return [f for f in self.__row["fields"].split(",") if f != ""]
+
+    @property
+    def first_seen(self) -> datetime:
+        return datetime.fromisoformat(self.__row["first_seen"])
+
+    @property
+    def last_seen(self) -> datetime:
+        return datetime.fromisoformat(self.__row["last_seen"])
+
+    @property
+    def count(self) -> int:
+        """
+        Number of times the mismatch was found,
+        including the hits that were not stored
+        """
+        return self.__row["count"]
+
+
+class Corpus:
+    """
+    Append-only SQLite database of all errors found so far. Every
+    error is stored with its encoded wrappers (to replay it) and
+    indexed by wrapper, target, base image and differing fields.
+    """
+
+    def __init__(self, folder: str) -> None:
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        self.__path = join(folder, CORPUS_FILE)
+        with closing(self.__connect()) as connection:
+            connection.executescript(SCHEMA)
+            self.__migrate(connection)
+            connection.executescript(INDEXES)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def __migrate(self, connection: sqlite3.Connection) -> None:
+        for table, columns in MIGRATIONS.items():
+            existing = [
+                row["name"] for row in connection.execute(f"PRAGMA table_info({table})")
+            ]
+            for column, definition in columns.items():
+                if column not in existing:
+                    connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                    )
+        connection.commit()
+
+    def __connect(self) -> sqlite3.Connection:
+        # Every call uses its own connection, which makes
+        # the corpus safe to use from several workers
+        connection = sqlite3.connect(self.__path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def add(
+        self,
+        file: str,
+        base_image: str,
+        mode: str,
+        wrappers: List[str],
+        targets: List[str],
+        disagreeing: List[str],
+        fields: List[str],
+        target_state: str,
+        actual_state: str,
+        changes: str,
+        data: bytes,
+        fingerprint: Optional[str] = None,
+    ) -> int:
+        with closing(self.__connect()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO errors (created, file, base_image, mode, wrapper, wrappers, "
+                "target_state, actual_state, changes, data, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.now().isoformat(),
+                    file,
+                    base_image,
+                    mode,
+                    wrappers[-1] if len(wrappers) > 0 else "",
+                    len(wrappers),
+                    target_state,
+                    actual_state,
+                    changes,
+                    data,
+                    fingerprint,
+                ),
+            )
+            id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO error_wrappers VALUES (?, ?, ?)",
+                [(id, pos, wrapper) for pos, wrapper in enumerate(wrappers)],
+            )
+            connection.executemany(
+                "INSERT INTO error_targets VALUES (?, ?, ?)",
+                [(id, target, target in disagreeing) for target in targets],
+            )
+            connection.executemany(
+                "INSERT INTO error_fields VALUES (?, ?)",
+                [(id, field) for field in fields],
+            )
+        return id
+
+    def hit(self, fingerprint: str, wrapper: str, fields: List[str]) -> int:
+        """
+        Counts a hit of the bucket with the fingerprint and returns
+        the number of hits of the bucket including this one
+        """
+        now = datetime.now().isoformat()
+        with closing(self.__connect()) as connection, connection:
+            connection.execute(
+                "INSERT INTO buckets VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(fingerprint) DO UPDATE "
+                "SET count = count + 1, last_seen = excluded.last_seen",
+                (fingerprint, wrapper, ",".join(fields), now, now),
+            )
+            row = connection.execute(
+                "SELECT count FROM buckets WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        return row["count"]
+
+    def buckets(self, limit: Optional[int] = None) -> List[Bucket]:
+        """
+        Returns the buckets with the most hits first
+        """
+        query = "SELECT * FROM buckets ORDER BY count DESC, last_seen DESC"
+        params = []
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with closing(self.__connect()) as connection:
+            return [Bucket(row) for row in connection.execute(query, params)]
+
+    def __entries(
+        self, connection: sqlite3.Connection, rows: List[sqlite3.Row]
+    ) -> List[CorpusEntry]:
+        entries = []
+        for row in rows:
+            targets = connection.execute(
+                "SELECT target FROM error_targets WHERE error_id = ?", (row["id"],)
+            )
+            fields = connection.execute(
+                "SELECT field FROM error_fields WHERE error_id = ?", (row["id"],)
+            )
+            entries.append(
+                CorpusEntry(row, [r[0] for r in targets], [r[0] for r in fields])
+            )
+        return entries
+
+    def find(
+        self,
+        wrapper: Optional[str] = None,
+        target: Optional[str] = None,
+        base_image: Optional[str] = None,
+        field: Optional[str] = None,
+        limit: Optional[int] = None,
+        fingerprint: Optional[str] = None,
+    ) -> List[CorpusEntry]:
+        """
+        Returns the newest entries that match all given filters.
+        A wrapper matches if it was executed anywhere in the round.
+        """
+        query = "SELECT * FROM errors WHERE 1 = 1"
+        params = []
+        if wrapper is not None:
+            query += (
+                " AND id IN (SELECT error_id FROM error_wrappers WHERE wrapper = ?)"
+            )
+            params.append(wrapper)
+        if target is not None:
+            query += " AND id IN (SELECT error_id FROM error_targets WHERE target = ?)"
+            params.append(target)
+        if base_image is not None:
+            query += " AND base_image = ?"
+            params.append(base_image)
+        if field is not None:
+            query += " AND id IN (SELECT error_id FROM error_fields WHERE field = ?)"
+            params.append(field)
+        if fingerprint is not None:
+            query += " AND fingerprint = ?"
+            params.append(fingerprint)
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with closing(self.__connect()) as connection:
+            return self.__entries(connection, connection.execute(query, params))
+
+    def get(self, id: int) -> Optional[CorpusEntry]:
+        with closing(self.__connect()) as connection:
+            rows = connection.execute("SELECT * FROM errors WHERE id = ?", (id,))
+            entries = self.__entries(connection, rows)
+        return entries[0] if len(entries) > 0 else None
+
+    def get_data(self, id: int) -> Optional[bytes]:
+        """
+        Returns the encoded wrappers of the entry, which can be replayed
+        """
+        with closing(self.__connect()) as connection:
+            row = connection.execute(
+                "SELECT data FROM errors WHERE id = ?", (id,)
+            ).fetchone()
+        return row["data"] if row is not None else None
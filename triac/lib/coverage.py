@@ -0,0 +1,129 @@
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from deepdiff import DeepDiff
+
+from triac.lib.buckets import normalize_change_path
+from triac.types.base import BaseValue
+from triac.types.target import Target
+from triac.types.wrapper import State
+
+# (wrapper, previous wrapper of the round, categories of the target state)
+Arm = Tuple[str, Optional[str], Tuple[str, ...]]
+
+# Receives the reached state of a tool and whether the tool reported a change
+Observer = Callable[[Target, State, Optional[bool]], None]
+
+# Options that never produced anything new are still chosen sometimes
+MIN_WEIGHT = 0.05
+
+
+def get_categories(state: State) -> Tuple[str, ...]:
+    return tuple(
+        [
+            f"{key}={value.category() if isinstance(value, BaseValue) else type(value).__name__}"
+            for key, value in sorted(state.items())
+        ]
+    )
+
+
+def get_arm(wrapper: str, previous: Optional[str], state: State) -> Arm:
+    return (wrapper, previous, get_categories(state))
+
+
+def get_behaviour(
+    target: Target,
+    target_state: State,
+    actual: State,
+    changed: Optional[bool],
+) -> Tuple:
+    """
+    What a tool did when executing a wrapper: the categories of
+    the reached state, whether the tool reported a change and
+    the shape of the differences to the target state. The arm is
+    not part of it, the same outcome of different arms is not new.
+    """
+    diff = DeepDiff(target_state, actual)
+    shape = tuple(
+        sorted(
+            set(
+                [
+                    f"{change}:{normalize_change_path(path)}"
+                    for change, paths in diff.items()
+                    for path in paths
+                ]
+            )
+        )
+    )
+    return (target.name, get_categories(actual), changed, shape)
+
+
+def get_weight(stats: List[int]) -> float:
+    # Rarely executed and productive options get higher weights
+    executions, new = stats
+    return max((new + 1) / (executions + 1), MIN_WEIGHT)
+
+
+class Coverage:
+    """
+    Records which combinations of wrapper, value categories and
+    previous wrapper were executed and which of them led to behaviour
+    that was not seen before. The weights steer the fuzzer towards
+    combinations that are rarely executed or still find new behaviour.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__start_time = datetime.now()
+        self.__arms: Dict[Arm, List[int]] = {}
+        self.__wrappers: Dict[Tuple[Optional[str], str], List[int]] = {}
+        self.__behaviours: Set[Tuple] = set()
+
+    def record(
+        self,
+        arm: Arm,
+        target_state: State,
+        outcomes: List[Tuple[Target, State, Optional[bool]]],
+    ) -> bool:
+        """
+        Records the outcomes of all tools of one wrapper execution
+        and returns whether any of them is new
+        """
+        behaviours = [
+            get_behaviour(target, target_state, actual, changed)
+            for target, actual, changed in outcomes
+        ]
+        wrapper, previous, _ = arm
+        with self.__lock:
+            new = any([b not in self.__behaviours for b in behaviours])
+            self.__behaviours.update(behaviours)
+            # Only the arm that reached the behaviour first is credited
+            for stats in [
+                self.__arms.setdefault(arm, [0, 0]),
+                self.__wrappers.setdefault((previous, wrapper), [0, 0]),
+            ]:
+                stats[0] += 1
+                stats[1] += 1 if new else 0
+        return new
+
+    def wrapper_weight(self, previous: Optional[str], wrapper: str) -> float:
+        with self.__lock:
+            return get_weight(self.__wrappers.get((previous, wrapper), [0, 0]))
+
+    def arm_weight(self, arm: Arm) -> float:
+        with self.__lock:
+            return get_weight(self.__arms.get(arm, [0, 0]))
+
+    @property
+    def behaviours(self) -> int:
+        """
+        Number of unique behaviours found so far
+        """
+        with self.__lock:
+            return len(self.__behaviours)
+
+    @property
+    def behaviours_per_hour(self) -> float:
+        hours = (datetime.now() - self.__start_time).total_seconds() / 3600
+        return self.behaviours / hours if hours > 0 else 0
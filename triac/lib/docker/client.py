@@ -5,32 +5,117 @@ import tarfile
 import time
 from os import getcwd
 from os.path import dirname, join
-from typing import List
+from threading import Lock
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urlparse
+from uuid import uuid4
 
 import docker
 
 from triac.lib.docker.const import (
+    TRIAC_CONTAINER_LABEL,
     TRIAC_DIR_IN_REPO,
+    TRIAC_IMAGE_REPOSITORY,
     TRIAC_SRC_DIR,
     TRIAC_WORKING_DIR,
+    get_dockerfile_path,
     get_image_identifier,
 )
+from triac.lib.docker.reaper import ResourceKind, reaper
 from triac.lib.docker.types.base_images import BaseImages
-from triac.lib.docker.types.container import Container
+from triac.lib.docker.types.container import Container, forget_path_indexes
+
+LOCAL_HOSTNAMES = ["localhost", "127.0.0.1", "::1"]
 
 
 class DockerClient:
-    def __init__(self):
-        self._client = docker.from_env()
+    def __init__(self, base_url: str = None):
+        """
+        Connects to the Docker daemon at base_url (e.g. unix:///var/run/docker.sock
+        or tcp://10.0.0.2:2375). The environment configuration is used if no
+        base_url is supplied.
+        """
+        if base_url is None:
+            self._client = docker.from_env()
+        else:
+            self._client = docker.DockerClient(base_url=base_url)
         self.__logger = logging.getLogger(__name__)
+        self.__host = base_url if base_url is not None else "local"
+        self.__ssh_host = self.__parse_ssh_host(self._client.api.base_url)
+        self.__image_cache: Dict[BaseImages, str] = {}
+        # Only the images built by this process may be removed. Reused
+        # images are kept and might be used by concurrent runs
+        self.__built_images: Set[str] = set()
+        self.__image_cache_lock = Lock()
+        self.__sources_archive = None
+        # Resources that a crashed run left behind on this host
+        reaper.recover(self)
+
+    @staticmethod
+    def __parse_ssh_host(api_url: str) -> str:
+        # Sockets (http+docker://...) always refer to the local machine
+        url = urlparse(api_url)
+        if url.scheme.startswith("http+docker") or url.hostname is None:
+            return "localhost"
+        return url.hostname
 
     def get_client(self):
         return self._client
 
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    @property
+    def ssh_host(self) -> str:
+        """
+        The hostname under which the ports published
+        by containers of this daemon can be reached
+        """
+        return self.__ssh_host
+
+    @property
+    def is_local(self) -> bool:
+        return self.__ssh_host in LOCAL_HOSTNAMES
+
+    @property
+    def built_images(self) -> Set[str]:
+        with self.__image_cache_lock:
+            return set(self.__built_images)
+
+    def get_base_image(self, img: BaseImages) -> Tuple[str, bool]:
+        """
+        Returns the identifier of the base image and whether it was
+        built by this call. Every base image is only built once per host
+        and not at all if the host already has an image built from the
+        same inputs.
+        """
+        with self.__image_cache_lock:
+            if img in self.__image_cache:
+                return (self.__image_cache[img], False)
+
+            image = get_image_identifier(img)
+            built = not self.__image_exists(image)
+            if built:
+                self.build_base_image(img)
+                self.__built_images.add(image)
+            else:
+                self.__logger.info(f"Reusing base image {image} on host {self.host}")
+
+            self.__image_cache[img] = image
+            return (image, built)
+
+    def __image_exists(self, image: str) -> bool:
+        try:
+            self.get_client().images.get(image)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+
     # Returns the build image
     def build_base_image(self, img: BaseImages):
-        self.__logger.info(f"Building base image {img.name}")
-        docker_file_path = join(dirname(__file__), "images", img.value)
+        self.__logger.info(f"Building base image {img.name} on host {self.host}")
+        docker_file_path = get_dockerfile_path(img)
         repository_root = getcwd()
         image_identifier = get_image_identifier(img)
         self.get_client().images.build(
@@ -41,8 +126,24 @@ class DockerClient:
             tag=image_identifier,
         )
         self.__logger.info(f"Base image finished building")
+        self.__remove_outdated_base_images(img, image_identifier)
         return image_identifier
 
+    def __remove_outdated_base_images(self, img: BaseImages, current: str):
+        # Images of the same base image that were built from other inputs
+        # can never be used again
+        for image in self.get_client().images.list(name=TRIAC_IMAGE_REPOSITORY):
+            for tag in image.tags:
+                name = tag.split(":", 1)[1]
+                if tag != current and (
+                    name == img.name or name.startswith(f"{img.name}-")
+                ):
+                    self.__logger.debug(f"Removing outdated base image {tag}")
+                    try:
+                        self.remove_image(tag)
+                    except docker.errors.APIError as e:
+                        self.__logger.debug(f"Could not remove {tag}: {e}")
+
     def __ensure_working_dir_exists(self, container):
         try:
             # If this succeeds, the path exists
@@ -59,46 +160,128 @@ class DockerClient:
             container.put_archive("/", mem_stream)
             return True
 
+    def __get_sources_archive(self) -> bytes:
+        # Pack the TRIaC sources only once per client
+        if self.__sources_archive is None:
+            mem_stream = io.BytesIO()
+            with tarfile.open(fileobj=mem_stream, mode="w") as tar:
+                tar.add(
+                    TRIAC_DIR_IN_REPO,
+                    arcname=os.path.basename(TRIAC_SRC_DIR),
+                    filter=lambda info: (None if "__pycache__" in info.name else info),
+                )
+            self.__sources_archive = mem_stream.getvalue()
+        return self.__sources_archive
+
+    def __copy_sources(self, container):
+        # Remote daemons cannot bind mount the sources from this machine
+        container.put_archive(
+            os.path.dirname(TRIAC_SRC_DIR), self.__get_sources_archive()
+        )
+
     def run_container_from_image(self, image_identifier: str) -> Container:
         self.__logger.debug(f"Starting container for image {image_identifier}")
         ssh_image_port = "22/tcp"
+        volumes = {
+            # Needed for systemd
+            "/sys/fs/cgroup": {"bind": "/sys/fs/cgroup"},
+        }
+        if self.is_local:
+            # Needed to export state from the container
+            volumes[TRIAC_DIR_IN_REPO] = {"bind": TRIAC_SRC_DIR, "mode": "ro"}
+
         container = self.get_client().containers.run(
             image=image_identifier,
             privileged=True,
             detach=True,
             cgroupns="host",
             ports={ssh_image_port: 0},  # Bind random free port to 22 (ssh)
-            volumes={
-                # Needed for systemd
-                "/sys/fs/cgroup": {"bind": "/sys/fs/cgroup"},
-                # Needed to export state from the container
-                TRIAC_DIR_IN_REPO: {"bind": TRIAC_SRC_DIR, "mode": "ro"},
-            },
+            volumes=volumes,
+            labels={TRIAC_CONTAINER_LABEL: "true"},
         )
+        reaper.track(self, ResourceKind.CONTAINER, container.id)
         container.reload()
         assert container.status == "running"
         ssh_host_port = container.ports[ssh_image_port][0]["HostPort"]
         self.__ensure_working_dir_exists(container)
+        if not self.is_local:
+            self.__copy_sources(container)
         self.__logger.debug(
-            f"Container running with ssh available at port {ssh_host_port}"
+            f"Container running with ssh available at {self.ssh_host}:{ssh_host_port}"
+        )
+        return Container(
+            container.id,
+            ssh_host_port,
+            container,
+            self.ssh_host,
+            image_identifier,
+        )
+
+    def wait_until_booted(self, container: Container, timeout: int = 120) -> bool:
+        """
+        Blocks until systemd finished booting the container (including sshd
+        and all other enabled services). Returns whether the boot succeeded.
+        """
+        res = container.base_obj.exec_run(
+            cmd=f"timeout {timeout} systemctl is-system-running --wait",
+            user="root",
         )
-        return Container(container.id, ssh_host_port, container)
+        # Degraded means that some unrelated unit failed to start
+        state = res.output.decode("utf-8").strip()
+        self.__logger.debug(f"Container {container.id} finished booting: {state}")
+        return state in ["running", "degraded"]
 
     def commit_container_to_image(self, container: Container):
         image_repository = "triac"
         # We need to give every intermediate image
         # a different name. Otherwise, they will be overwritten
-        # and then not properly removed during cleanup
-        image_tag = f"intermediate-state-{int(time.time())}"
+        # and then not properly removed during cleanup.
+        # Concurrent workers may commit within the same second
+        image_tag = f"intermediate-state-{int(time.time())}-{uuid4().hex[:8]}"
+        image = f"{image_repository}:{image_tag}"
         container.base_obj.commit(
             repository=image_repository, author="triac", tag=image_tag
         )
-        return f"{image_repository}:{image_tag}"
+        reaper.track(self, ResourceKind.IMAGE, image)
+        container.store_path_indexes_for(image)
+        return image
 
     def remove_container(self, container: Container):
         self.__logger.debug(f"Removing container with id {container.id}")
+        container.close()
         container.base_obj.remove(v=True, force=True)
         self.__logger.debug(f"Container with id {container.id} removed")
 
-    def remove_image(self, image: str):
-        self.get_client().images.remove(image, noprune=False)
+    def remove_container_by_id(self, id: str):
+        self.get_client().containers.get(id).remove(v=True, force=True)
+
+    def remove_image(self, image: str, prune: bool = True):
+        """
+        Removes the image and, if prune is set, its untagged parents
+        """
+        self.get_client().images.remove(image, noprune=not prune)
+        forget_path_indexes(image)
+
+    def prune_images(self):
+        """
+        Removes the dangling images that were committed from containers of TRIaC
+        """
+        # Committed images inherit the label of the container
+        result = self.get_client().images.prune(
+            filters={"dangling": True, "label": TRIAC_CONTAINER_LABEL}
+        )
+        self.__logger.debug(
+            f"Pruned {len(result.get('ImagesDeleted') or [])} images on host {self.host}"
+        )
+
+    def count_resources(self) -> Dict[str, int]:
+        """
+        Number of containers and images of TRIaC on the host,
+        including those of other executions
+        """
+        client = self.get_client()
+        containers = client.containers.list(
+            all=True, filters={"label": TRIAC_CONTAINER_LABEL}
+        )
+        images = client.images.list(name=TRIAC_IMAGE_REPOSITORY)
+        return {"containers": len(containers), "images": len(images)}
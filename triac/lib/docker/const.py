@@ -1,5 +1,9 @@
-from os import getcwd
-from os.path import join
+import hashlib
+import shlex
+from functools import cache
+from glob import glob
+from os import getcwd, walk
+from os.path import dirname, isdir, join, relpath
 from typing import List
 
 from triac.lib.docker.types.base_images import BaseImages
@@ -7,6 +11,10 @@ from triac.lib.docker.types.base_images import BaseImages
 TRIAC_SRC_DIR = "/usr/lib/python3/dist-packages/triac"
 TRIAC_WORKING_DIR = "/usr/app/triac"
 TRIAC_DIR_IN_REPO = join(getcwd(), "triac")
+TRIAC_IMAGE_REPOSITORY = "triac"
+# Label of all containers that TRIaC starts
+TRIAC_CONTAINER_LABEL = "triac"
+IMAGES_DIR = join(dirname(__file__), "images")
 
 
 def get_base_image_identifiers() -> List[str]:
@@ -14,4 +22,52 @@ def get_base_image_identifiers() -> List[str]:
 
 
 def get_image_identifier(img: BaseImages):
-    return f"triac:{img.name}"
+    return f"{TRIAC_IMAGE_REPOSITORY}:{img.name}-{get_image_inputs_hash(img)}"
+
+
+def get_dockerfile_path(img: BaseImages) -> str:
+    return join(IMAGES_DIR, img.value)
+
+
+def _get_copied_files(dockerfile: str, context: str) -> List[str]:
+    # Collect all files from the build context that
+    # are copied into the image by COPY or ADD instructions
+    files = []
+    with open(dockerfile, "r") as file:
+        for line in file:
+            if not line.strip().upper().startswith(("COPY ", "ADD ")):
+                continue
+
+            parts = shlex.split(line.strip(), comments=True)
+
+            sources = [part for part in parts[1:-1] if not part.startswith("--")]
+            for source in sources:
+                for path in sorted(glob(join(context, source))):
+                    if isdir(path):
+                        for root, _, names in sorted(walk(path)):
+                            files.extend(sorted([join(root, n) for n in names]))
+                    else:
+                        files.append(path)
+    return files
+
+
+@cache
+def get_image_inputs_hash(img: BaseImages) -> str:
+    """
+    Hash over everything the base image is built from: The Dockerfile
+    (including the tag of the image it is based on) and all files that
+    are copied into the image. Images with the same hash can be reused.
+    """
+    context = getcwd()
+    dockerfile = get_dockerfile_path(img)
+    sha = hashlib.sha256()
+
+    with open(dockerfile, "rb") as file:
+        sha.update(file.read())
+
+    for path in _get_copied_files(dockerfile, context):
+        sha.update(relpath(path, context).encode("utf-8"))
+        with open(path, "rb") as file:
+            sha.update(file.read())
+
+    return sha.hexdigest()[:12]
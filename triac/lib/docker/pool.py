@@ -0,0 +1,145 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List
+
+from triac.lib.docker.client import DockerClient
+from triac.lib.docker.reaper import reaper
+from triac.lib.docker.types.base_images import BaseImages
+from triac.lib.docker.types.container import Container
+
+
+class ContainerPool:
+    """
+    Keeps a number of booted and health checked containers per image
+    ahead of demand. Containers are handed out instantly when available
+    and the pool is refilled in the background.
+    """
+
+    def __init__(self, docker: DockerClient, size: int) -> None:
+        self.__docker = docker
+        self.__size = size
+        self.__logger = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.__idle: Dict[str, List[Container]] = {}
+        self.__booting: Dict[str, int] = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__closed = False
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max(size, 1), thread_name_prefix="pool"
+        )
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def idle(self) -> int:
+        with self.__lock:
+            return sum([len(containers) for containers in self.__idle.values()])
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def warm(self, image: str) -> None:
+        """
+        Starts booting containers for the image in the background
+        until the pool holds the configured number of containers.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            idle = len(self.__idle.setdefault(image, []))
+            booting = self.__booting.setdefault(image, 0)
+            missing = self.__size - idle - booting
+            self.__booting[image] += max(missing, 0)
+
+        for _ in range(missing):
+            self.__executor.submit(self.__boot, image)
+
+    def prewarm(self, images: List[BaseImages]) -> None:
+        """
+        Builds or looks up the base images in the background and
+        warms the pool for each of them, before the first round
+        asks for a container
+        """
+        for img in images:
+            self.__executor.submit(self.__prewarm, img)
+
+    def __prewarm(self, img: BaseImages) -> None:
+        try:
+            image, _ = self.__docker.get_base_image(img)
+        except Exception as e:
+            self.__logger.warning(f"Could not prepare base image {img.name}: {e}")
+            return
+        self.warm(image)
+
+    def acquire(self, image: str) -> Container:
+        """
+        Returns a running container for the image. Takes a booted
+        container from the pool if there is one, otherwise starts a
+        new container synchronously.
+        """
+        container = None
+        with self.__lock:
+            idle = self.__idle.get(image, [])
+            if len(idle) > 0:
+                container = idle.pop()
+                self.__hits += 1
+            else:
+                self.__misses += 1
+
+        self.warm(image)
+
+        if container is None:
+            self.__logger.debug(f"No booted container for {image} available")
+            return self.__docker.run_container_from_image(image)
+
+        self.__logger.debug(f"Took booted container {container.id} from the pool")
+        return container
+
+    def __boot(self, image: str) -> None:
+        container = None
+        try:
+            container = self.__docker.run_container_from_image(image)
+            if not self.__docker.wait_until_booted(container):
+                raise Exception("the container did not finish booting")
+        except Exception as e:
+            self.__logger.warning(f"Could not boot container for the pool: {e}")
+            if container is not None:
+                reaper.remove_container(self.__docker, container)
+            container = None
+
+        with self.__lock:
+            self.__booting[image] -= 1
+            if container is not None and not self.__closed:
+                self.__idle[image].append(container)
+                container = None
+
+        # The pool was closed while booting
+        if container is not None:
+            reaper.remove_container(self.__docker, container)
+
+    def close(self) -> None:
+        """
+        Stops refilling and removes all idle containers
+        """
+        with self.__lock:
+            self.__closed = True
+
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+        with self.__lock:
+            # Cancelled boots never decrement their count
+            self.__booting.clear()
+            containers = [c for idle in self.__idle.values() for c in idle]
+            self.__idle.clear()
+
+        for container in containers:
+            reaper.remove_container(self.__docker, container)
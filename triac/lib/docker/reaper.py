@@ -0,0 +1,388 @@
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from glob import glob
+from os.path import basename, dirname, expanduser, join
+from threading import Condition, Lock, Thread
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+import docker
+
+from triac.lib.docker.types.container import Container
+from triac.lib.tracing import tracer
+
+# Every run records the containers and intermediate images it created
+# in its own ledger, so a later run can remove them after a crash
+STATE_DIR = join(
+    os.environ.get("XDG_STATE_HOME", join(expanduser("~"), ".local", "state")),
+    "triac",
+)
+LEDGER_DIR = join(STATE_DIR, "ledger")
+
+# Removals that are executed together and how many containers
+# are removed concurrently
+BATCH_SIZE = 32
+REMOVAL_THREADS = 4
+
+# Failed removals are retried with an exponential backoff
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 1
+
+# Seconds between two prunes of the dangling images of a host
+PRUNE_INTERVAL = 60
+
+# Seconds to wait for the background removals at the end of a run
+DRAIN_TIMEOUT = 300
+
+Key = Tuple[str, str, str]
+
+
+class ResourceKind(Enum):
+    CONTAINER = "container"
+    IMAGE = "image"
+
+
+class Removal:
+    def __init__(
+        self,
+        docker: Any,
+        kind: ResourceKind,
+        id: str,
+        container: Optional[Container] = None,
+        prune: bool = True,
+    ) -> None:
+        self.docker = docker
+        self.kind = kind
+        self.id = id
+        self.container = container
+        # Whether the untagged parents of an image are removed with it.
+        # Otherwise, they are left for the next prune of the host
+        self.prune = prune
+        self.attempts = 0
+        self.not_before = 0.0
+
+    @property
+    def key(self) -> Key:
+        return (self.docker.host, self.kind.value, self.id)
+
+
+def get_boot_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as file:
+            return file.read().strip()
+    except OSError:
+        return "unknown"
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_ledger(path: str) -> Dict[Key, None]:
+    """
+    Resources of the ledger that were created but not removed, in order
+    """
+    outstanding: Dict[Key, None] = {}
+    with open(path, "r") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a crashed run may be incomplete
+                continue
+            key = (entry["host"], entry["kind"], entry["id"])
+            if entry["event"] == "created":
+                outstanding[key] = None
+            else:
+                outstanding.pop(key, None)
+    return outstanding
+
+
+class Reaper:
+    """
+    Removes containers and images in the background, so the fuzzing
+    rounds do not wait for Docker. Removals are executed in batches
+    and retried when they fail. All created resources are recorded
+    in a ledger, so they are removed by the next run after a crash.
+    """
+
+    def __init__(self) -> None:
+        self.__logger = logging.getLogger(__name__)
+        self.__condition = Condition()
+        self.__queue: List[Removal] = []
+        self.__in_flight = 0
+        self.__thread: Thread = None
+        self.__executor = ThreadPoolExecutor(
+            max_workers=REMOVAL_THREADS, thread_name_prefix="reaper"
+        )
+        self.__ledger_lock = Lock()
+        self.__ledger: Optional[TextIO] = None
+        self.__outstanding: Dict[Key, None] = {}
+        # Hosts with images whose parents were not removed yet
+        self.__unpruned: Dict[str, Any] = {}
+        self.__pruned_at: Dict[str, float] = {}
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of removals that did not finish yet
+        """
+        with self.__condition:
+            return len(self.__queue) + self.__in_flight
+
+    @property
+    def ledger_path(self) -> str:
+        # Pids are only unique within a machine and its current boot, other
+        # machines (or containers) may share the state directory
+        return join(
+            LEDGER_DIR, socket.gethostname(), get_boot_id(), f"{os.getpid()}.jsonl"
+        )
+
+    def __write_ledger(self, event: str, key: Key) -> None:
+        if self.__ledger is None:
+            os.makedirs(dirname(self.ledger_path), exist_ok=True)
+            self.__ledger = open(self.ledger_path, "a")
+        host, kind, id = key
+        entry = {"event": event, "host": host, "kind": kind, "id": id}
+        self.__ledger.write(json.dumps(entry) + "\n")
+        self.__ledger.flush()
+
+    def track(self, docker: Any, kind: ResourceKind, id: str) -> None:
+        """
+        Records a resource that was created on the host of the client
+        """
+        key = (docker.host, kind.value, id)
+        with self.__ledger_lock:
+            self.__outstanding[key] = None
+            self.__write_ledger("created", key)
+
+    def __untrack(self, key: Key) -> None:
+        with self.__ledger_lock:
+            # Base images and resources of other clients are not tracked
+            if key in self.__outstanding:
+                del self.__outstanding[key]
+                self.__write_ledger("removed", key)
+
+    def remove_container(self, docker: Any, container: Container) -> None:
+        self.__enqueue(Removal(docker, ResourceKind.CONTAINER, container.id, container))
+
+    def remove_image(self, docker: Any, image: str, prune: bool = True) -> None:
+        self.__enqueue(Removal(docker, ResourceKind.IMAGE, image, prune=prune))
+
+    def __enqueue(self, removal: Removal) -> None:
+        with self.__condition:
+            self.__queue.append(removal)
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__run, name="reaper", daemon=True)
+                self.__thread.start()
+            self.__condition.notify_all()
+
+    def __is_alive(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def __take_batch(self) -> List[Removal]:
+        with self.__condition:
+            while True:
+                now = time.monotonic()
+                ready = [r for r in self.__queue if r.not_before <= now]
+                if len(ready) > 0:
+                    break
+                timeout = None
+                if len(self.__queue) > 0:
+                    timeout = min([r.not_before for r in self.__queue]) - now
+                self.__condition.wait(timeout)
+
+            batch = ready[:BATCH_SIZE]
+            for removal in batch:
+                self.__queue.remove(removal)
+            self.__in_flight = len(batch)
+            return batch
+
+    def __run(self) -> None:
+        while True:
+            batch = self.__take_batch()
+            # Containers first, their images cannot be removed before
+            containers = [r for r in batch if r.kind == ResourceKind.CONTAINER]
+            images = [r for r in batch if r.kind == ResourceKind.IMAGE]
+
+            failed = []
+            if len(containers) > 0:
+                with tracer.span("remove_containers", containers=len(containers)):
+                    results = self.__executor.map(self.__remove, containers)
+                    failed += [r for r, ok in zip(containers, results) if not ok]
+            if len(images) > 0:
+                with tracer.span("cleanup_images", images=len(images)):
+                    failed += [r for r in images if not self.__remove(r)]
+
+            for docker in self.__take_unpruned(PRUNE_INTERVAL):
+                self.__prune(docker)
+
+            with self.__condition:
+                for removal in failed:
+                    self.__retry(removal)
+                self.__in_flight = 0
+                self.__condition.notify_all()
+
+    def __remove(self, removal: Removal) -> bool:
+        try:
+            if removal.kind == ResourceKind.CONTAINER:
+                if removal.container is not None:
+                    removal.docker.remove_container(removal.container)
+                else:
+                    removal.docker.remove_container_by_id(removal.id)
+            else:
+                removal.docker.remove_image(removal.id, prune=removal.prune)
+                if not removal.prune:
+                    with self.__condition:
+                        self.__unpruned[removal.docker.host] = removal.docker
+        except docker.errors.NotFound:
+            # Already removed, e.g. by the previous attempt
+            pass
+        except Exception as e:
+            removal.attempts += 1
+            self.__logger.debug(
+                f"Could not remove {removal.kind.value} {removal.id} (attempt {removal.attempts}): {e}"
+            )
+            return False
+
+        self.__untrack(removal.key)
+        return True
+
+    def __retry(self, removal: Removal) -> None:
+        if removal.attempts >= MAX_ATTEMPTS:
+            # Stays in the ledger and is removed by the next run
+            self.__logger.warning(
+                f"Giving up removing {removal.kind.value} {removal.id} on host {removal.docker.host}"
+            )
+            return
+        delay = RETRY_DELAY * 2 ** (removal.attempts - 1)
+        removal.not_before = time.monotonic() + delay
+        self.__queue.append(removal)
+
+    def __take_unpruned(self, interval: float) -> List[Any]:
+        now = time.monotonic()
+        with self.__condition:
+            due = [
+                host
+                for host in self.__unpruned
+                if now - self.__pruned_at.get(host, 0) >= interval
+            ]
+            for host in due:
+                self.__pruned_at[host] = now
+            return [self.__unpruned.pop(host) for host in due]
+
+    def __prune(self, docker: Any) -> None:
+        with tracer.span("prune_images"):
+            try:
+                docker.prune_images()
+            except Exception as e:
+                self.__logger.debug(f"Could not prune images on {docker.host}: {e}")
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """
+        Blocks until all removals finished and prunes the dangling
+        images. If the background thread died or does not finish in
+        time, the queued removals are executed synchronously. The
+        ledger is deleted if nothing is left to remove.
+        """
+        deadline = time.monotonic() + timeout
+        with self.__condition:
+            while len(self.__queue) + self.__in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if not self.__is_alive() or remaining <= 0:
+                    break
+                self.__condition.wait(min(remaining, 1))
+
+            if not self.__is_alive():
+                # Restarted by the next removal
+                self.__thread = None
+                self.__in_flight = 0
+            left = self.__queue
+            self.__queue = []
+
+        if len(left) > 0:
+            self.__logger.warning(
+                f"Removing {len(left)} resources without the background thread"
+            )
+            for removal in left:
+                # Failed removals stay in the ledger for the next run
+                self.__remove(removal)
+
+        for docker in self.__take_unpruned(0):
+            self.__prune(docker)
+
+        with self.__ledger_lock:
+            if self.__ledger is not None and len(self.__outstanding) == 0:
+                self.__ledger.close()
+                self.__ledger = None
+                os.remove(self.ledger_path)
+
+    def recover(self, docker: Any) -> None:
+        """
+        Removes the resources that crashed runs left behind
+        on the host of the client in the background
+        """
+        boot_id = get_boot_id()
+        # Ledgers of other machines cannot be checked for running processes
+        for path in glob(join(LEDGER_DIR, socket.gethostname(), "*", "*.jsonl")):
+            name = basename(path)[: -len(".jsonl")]
+            if not name.isdigit():
+                continue
+            # Processes of an earlier boot cannot be running anymore
+            same_boot = basename(dirname(path)) == boot_id
+            if same_boot and (int(name) == os.getpid() or is_running(int(name))):
+                continue
+
+            # Only one run may take over the ledger
+            claimed = f"{path}.{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+
+            outstanding = read_ledger(claimed)
+            others = [key for key in outstanding if key[0] != docker.host]
+            if len(others) > 0:
+                # Left for the runs that use the other hosts
+                with open(path, "a") as file:
+                    for host, kind, id in others:
+                        entry = {
+                            "event": "created",
+                            "host": host,
+                            "kind": kind,
+                            "id": id,
+                        }
+                        file.write(json.dumps(entry) + "\n")
+            os.remove(claimed)
+            if not same_boot and len(os.listdir(dirname(path))) == 0:
+                try:
+                    os.rmdir(dirname(path))
+                except OSError:
+                    # Another run recovers a ledger of the same boot
+                    pass
+
+            found = [key for key in outstanding if key[0] == docker.host]
+            if len(found) > 0:
+                self.__logger.info(
+                    f"Removing {len(found)} resources that a previous run left on host {docker.host}"
+                )
+            for _, kind, id in found:
+                self.track(docker, ResourceKind(kind), id)
+                self.__enqueue(Removal(docker, ResourceKind(kind), id))
+
+
+reaper = Reaper()
+
+
+def get_reaper() -> Reaper:
+    return reaper
@@ -0,0 +1,110 @@
+import io
+import os
+import re
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from os.path import join
+from sys import argv
+
+from triac.lib.encoding import FRAME_HEADER, dumps, loads
+
+# Long-lived agent that is started once per container.
+#
+# Expected arguments:
+#  1.    The path to the module definitions of TrIAC
+#
+# Protocol: The agent reads one request frame from stdin and
+# answers each of them with exactly one frame on stdout. Every frame
+# is a 4 byte big endian length followed by data in the TRIaC encoding.
+#
+#  Request:  dict with the keys "obj", "method" and "arguments"
+#  Response: dict with the keys "method_result", "std_out" and
+#            "std_err" (or "error" if the method raised)
+#
+# The agent terminates once stdin is closed.
+
+if len(argv) < 2:
+    print(f"Got invalid arguments! Gotten: {argv}", file=sys.stderr)
+    exit(1)
+
+#
+# IMPORTANT: Only responses may be written to the channel.
+#            Therefore, the original stdout is moved to a private
+#            file descriptor and everything else that is printed
+#            (e.g. by subprocesses) ends up on stderr instead.
+#
+channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+#
+# Import all python modules from TRIaC directory once
+#
+import_path = argv[1]
+modules = []
+for root, dirs, files in os.walk(import_path):
+    modules.extend([join(root, file) for file in files if file.endswith(".py")])
+
+modules = list(
+    filter(
+        lambda f: "__init__" not in f
+        and "__main__" not in f
+        and not f.endswith(join("runners", "agent.py")),
+        modules,
+    )
+)
+last_folder = os.path.basename(os.path.normpath(import_path))
+base_path = import_path[0 : len(import_path) - len(last_folder)]
+modules = list(map(lambda f: f.replace(base_path, ""), modules))
+
+for module in modules:
+    # We only want to replace the .py at the end
+    # Otherwise, we will screw up files like lib.pysmth.py
+    module_path = re.sub(".py$", "", module.replace("/", "."))
+    mod = __import__(module_path, fromlist=[None])
+
+
+def execute(request: dict) -> dict:
+    # Call the method with captured stdout and stderr
+    o = io.StringIO()
+    e = io.StringIO()
+    result = {}
+    try:
+        with redirect_stdout(o):
+            with redirect_stderr(e):
+                method = getattr(request["obj"], request["method"])
+                result["method_result"] = method(*request["arguments"])
+    except Exception as ex:
+        result["error"] = f"{type(ex).__name__}: {ex}"
+
+    result["std_out"] = o.getvalue()
+    result["std_err"] = e.getvalue()
+    return result
+
+
+def read_frame() -> bytes | None:
+    header = sys.stdin.buffer.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    return sys.stdin.buffer.read(size)
+
+
+#
+# Serve requests until the host closes stdin
+#
+while (request := read_frame()) is not None:
+    try:
+        response = execute(loads(request))
+    except Exception as ex:
+        response = {
+            "error": f"Could not decode request: {ex}",
+            "std_out": "",
+            "std_err": "",
+        }
+
+    data = dumps(response)
+    channel.write(FRAME_HEADER.pack(len(data)))
+    channel.write(data)
+    channel.flush()
+
+exit(0)
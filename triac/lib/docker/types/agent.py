@@ -0,0 +1,84 @@
+import logging
+from socket import SHUT_WR
+from threading import Lock
+from typing import Any, List
+
+from docker.utils.socket import STDOUT, next_frame_header, read_exactly
+
+from triac.lib.docker.const import TRIAC_WORKING_DIR
+from triac.lib.encoding import FRAME_HEADER, dumps, loads
+
+
+class AgentTerminatedError(Exception):
+    def __init__(self):
+        super().__init__("The agent inside the container terminated unexpectedly")
+
+
+class AgentConnection:
+    """
+    Host side of the long-lived agent that runs inside a container.
+    The agent is started once via docker exec and keeps TRIaC imported.
+    Method calls are then served over the attached exec socket.
+    """
+
+    def __init__(self, socket: Any) -> None:
+        """
+        Speaks the protocol of the agent over the attached exec socket,
+        which carries the output of the agent in docker stream frames
+        """
+        self.__logger = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.__buffer = b""
+        self.__socket = socket
+        # Writes have to happen on the underlying raw socket
+        self.__raw_socket = getattr(socket, "_sock", socket)
+
+    @classmethod
+    def start(cls, base_obj: Any, cmd: List[str]) -> "AgentConnection":
+        api = base_obj.client.api
+        exec_id = api.exec_create(
+            base_obj.id,
+            cmd,
+            stdin=True,
+            stdout=True,
+            stderr=True,
+            user="root",
+            workdir=TRIAC_WORKING_DIR,
+        )["Id"]
+        connection = cls(api.exec_start(exec_id, socket=True))
+        logging.getLogger(__name__).debug(f"Started agent in container {base_obj.id}")
+        return connection
+
+    def __read_exactly(self, size: int) -> bytes:
+        while len(self.__buffer) < size:
+            # The docker frames are independent of the frames of the agent
+            stream, frame_size = next_frame_header(self.__raw_socket)
+            if frame_size < 0:
+                raise AgentTerminatedError()
+            data = read_exactly(self.__raw_socket, frame_size)
+            if stream == STDOUT:
+                self.__buffer += data
+            else:
+                self.__logger.debug(f"Agent stderr: {data.decode('utf-8', 'replace')}")
+
+        data, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+        return data
+
+    def __read_frame(self) -> bytes:
+        (size,) = FRAME_HEADER.unpack(self.__read_exactly(FRAME_HEADER.size))
+        return self.__read_exactly(size)
+
+    def call(self, obj: Any, method: str, arguments: List[Any]) -> dict:
+        request = dumps({"obj": obj, "method": method, "arguments": arguments})
+        with self.__lock:
+            self.__raw_socket.sendall(FRAME_HEADER.pack(len(request)) + request)
+            return loads(self.__read_frame())
+
+    def close(self) -> None:
+        # Closing stdin makes the agent terminate
+        try:
+            self.__raw_socket.shutdown(SHUT_WR)
+            self.__raw_socket.close()
+            self.__socket.close()
+        except Exception as e:
+            self.__logger.debug(f"Could not close agent connection: {e}")
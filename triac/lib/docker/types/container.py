@@ -1,16 +1,36 @@
 import logging
 from os.path import commonprefix, dirname, join, realpath, relpath
-from typing import Any, List
+from threading import Lock
+from typing import Any, Dict, List, Optional
 
-from triac.lib.docker.const import TRIAC_DIR_IN_REPO, TRIAC_SRC_DIR, TRIAC_WORKING_DIR
-from triac.lib.encoding import decode, encode
+from triac.lib.docker.const import TRIAC_DIR_IN_REPO, TRIAC_SRC_DIR
+from triac.lib.docker.types.agent import AgentConnection
+from triac.lib.path_index import PathIndexSnapshot
+from triac.types.errors import StateGenerationError
+from triac.types.generation import GenerationResult, StateGenerator
+from triac.types.wrapper import Definition, State, Wrapper
+
+# Path indexes by the base or intermediate image they describe
+path_indexes: Dict[str, PathIndexSnapshot] = {}
+path_indexes_lock = Lock()
+
+
+def forget_path_indexes(image: str) -> None:
+    with path_indexes_lock:
+        path_indexes.pop(image, None)
 
 
 class Container:
-    def __init__(self, id, ssh_port, base_obj):
+    def __init__(self, id, ssh_port, base_obj, ssh_host="localhost", image=None):
         self.__id = id
         self.__ssh_port = ssh_port
+        self.__ssh_host = ssh_host
         self.__base_obj = base_obj
+        self.__image = image
+        self.__agent = None
+        # Snapshot of the path indexes the agent holds, None if
+        # the agent did not build or restore them yet
+        self.__path_indexes: Optional[PathIndexSnapshot] = None
 
     @property
     def id(self):
@@ -20,45 +40,45 @@ class Container:
     def ssh_port(self):
         return self.__ssh_port
 
+    @property
+    def ssh_host(self):
+        return self.__ssh_host
+
     @property
     def base_obj(self):
         return self.__base_obj
 
-    def __get_runner_path(self):
+    @property
+    def image(self):
+        """
+        The base or intermediate image the container was started from
+        """
+        return self.__image
+
+    def __get_agent_path(self):
         file_dirname = realpath(join(dirname(__file__), ".."))
         relative_path_to_lib_docker = relpath(
             file_dirname,
             commonprefix([file_dirname, TRIAC_DIR_IN_REPO]),
         )
-        return join(
-            TRIAC_SRC_DIR, relative_path_to_lib_docker, "runners", "run_in_container.py"
-        )
+        return join(TRIAC_SRC_DIR, relative_path_to_lib_docker, "runners", "agent.py")
 
-    def execute_method(self, obj: Any, method: str, arguments: List[Any] = []) -> Any:
-        # Dump the object
-        encoded_obj = encode(obj)
-        encoded_args = " ".join([encode(arg) for arg in arguments])
+    def __get_agent(self) -> AgentConnection:
+        # The agent is started lazily on the first method call
+        # and then reused for the lifetime of the container
+        if self.__agent is None:
+            self.__agent = AgentConnection.start(
+                self.base_obj,
+                ["python3", self.__get_agent_path(), TRIAC_SRC_DIR],
+            )
+        return self.__agent
 
+    def execute_method(self, obj: Any, method: str, arguments: List[Any] = []) -> Any:
         logger = logging.getLogger(__name__)
         logger.debug(f"Executing method {method} in container")
 
-        # Call the script in the container
-        res = self.base_obj.exec_run(
-            workdir=TRIAC_WORKING_DIR,
-            user="root",
-            cmd=f"python3 {self.__get_runner_path()} {TRIAC_SRC_DIR} {encoded_obj} {method} {encoded_args}",
-        )
-        # Check exit code
-        if res[0] != 0:
-            print(res[1])
-            raise AssertionError(
-                f"Execution of method in container failed. Exit code {res[0]}"
-            )
-
-        logger.debug(f"Method {method} executed successfully")
-
-        # Unpickle the result
-        res = decode(res[1])
+        # Call the method via the agent in the container
+        res = self.__get_agent().call(obj, method, arguments)
 
         # Log the std and stderr of the execution
         if res["std_out"] != "":
@@ -68,4 +88,80 @@ class Container:
             logger.debug("Execution std err:")
             logger.debug(res["std_err"])
 
+        # Check if the method failed
+        if "error" in res:
+            logger.error(f"Method {method} failed with exception: {res['error']}")
+            raise AssertionError(
+                f"Execution of method {method} in container failed: {res['error']}"
+            )
+
+        logger.debug(f"Method {method} executed successfully")
         return res["method_result"]
+
+    def generate_state(
+        self, definition: Definition, wrapper: Wrapper = None
+    ) -> Optional[State]:
+        """
+        Generates the whole state for the definition in a single round trip.
+        If a wrapper is supplied, its can_execute method is checked first
+        and None is returned if the wrapper cannot run in the container.
+        """
+        states = self.generate_states(definition, wrapper)
+        return states[0] if states is not None else None
+
+    def generate_states(
+        self, definition: Definition, wrapper: Wrapper = None, count: int = 1
+    ) -> Optional[List[State]]:
+        """
+        Like generate_state, but generates count candidate
+        states for the definition in the same round trip
+        """
+        self.__restore_path_indexes()
+        result: GenerationResult = self.execute_method(
+            StateGenerator(definition, wrapper, count), "generate"
+        )
+        self.__store_path_indexes()
+
+        if result.capable != True:
+            return None
+
+        if len(result.errors) > 0:
+            raise StateGenerationError(result.errors)
+
+        return result.states
+
+    def __restore_path_indexes(self) -> None:
+        # The filesystem of an image is only walked in its first container
+        if self.__image is None or self.__path_indexes is not None:
+            return
+        with path_indexes_lock:
+            snapshot = path_indexes.get(self.__image)
+        if snapshot is not None:
+            self.execute_method(snapshot, "restore")
+            self.__path_indexes = snapshot
+
+    def __store_path_indexes(self) -> None:
+        if self.__image is None or self.__path_indexes is not None:
+            return
+        snapshot = self.execute_method(PathIndexSnapshot, "take")
+        if snapshot is not None:
+            with path_indexes_lock:
+                path_indexes.setdefault(self.__image, snapshot)
+            self.__path_indexes = snapshot
+
+    def store_path_indexes_for(self, image: str) -> None:
+        """
+        Stores the path indexes for an image committed from the container,
+        including the paths that changed since they were restored
+        """
+        if self.__path_indexes is None:
+            return
+        updates = self.execute_method(PathIndexSnapshot, "take_updates")
+        with path_indexes_lock:
+            path_indexes[image] = self.__path_indexes.with_updates(updates)
+
+    def close(self) -> None:
+        if self.__agent is not None:
+            self.__agent.close()
+            self.__agent = None
+        self.__path_indexes = None
@@ -1,14 +1,366 @@
-from base64 import b64decode, b64encode
-from pickle import dumps, loads
+import io
+import pickle
+import struct
+from base64 import b64decode
+from enum import Enum
+from importlib import import_module
+from typing import Any, BinaryIO, Dict, List, Set
 
+# Compact binary format used for replay files and the container RPC.
+#
+# A stream starts with MAGIC followed by the format VERSION and exactly
+# one encoded value. Every value starts with a one byte tag. Integers
+# and lengths are stored as varints. Strings and classes are written
+# only once per stream, later occurrences refer to them by index. The
+# same holds for containers and objects that are referenced repeatedly.
+# Objects of TRIaC classes are stored as their class and attributes,
+# everything else that is not a builtin value is embedded as a pickle.
+# Tuples and frozensets are only created once all of their items are
+# decoded, so cycles through them cannot be encoded.
+#
+# Files that were written before this format existed (base64 encoded
+# pickles) are still loaded.
 
-def encode(obj: object) -> str:
-    enc = dumps(obj)
-    b64enc = b64encode(enc).decode("utf-8")
-    return b64enc
+MAGIC = b"TRIAC"
+VERSION = 1
 
 
-def decode(b64enc: str) -> object:
-    enc = b64decode(b64enc)
-    obj = loads(enc)
-    return obj
+class Tag:
+    # Plain integers, enum lookups are too slow for the hot loop
+    NONE = 0
+    TRUE = 1
+    FALSE = 2
+    INT = 3
+    FLOAT = 4
+    STR = 5
+    STR_REF = 6
+    BYTES = 7
+    LIST = 8
+    TUPLE = 9
+    SET = 10
+    FROZENSET = 11
+    DICT = 12
+    CLASS = 13
+    CLASS_REF = 14
+    ENUM = 15
+    OBJECT = 16
+    PICKLE = 17
+    REF = 18
+
+
+# Only classes from these modules are recreated by name
+ALLOWED_MODULES = ("triac.",)
+
+FLOAT = struct.Struct(">d")
+
+# Encoded data is written to streams in chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+# Length prefix of the messages exchanged with the container agent
+FRAME_HEADER = struct.Struct(">I")
+
+
+class EncodingError(Exception):
+    def __init__(self, message: str):
+        super().__init__(f"Could not encode or decode TRIaC data: {message}")
+
+
+class Encoder:
+    def __init__(self, stream: BinaryIO) -> None:
+        self.__stream = stream
+        # Values are collected and written to the stream in chunks
+        self.__buffer = bytearray()
+        self.__strings: Dict[str, int] = {}
+        self.__classes: Dict[type, int] = {}
+        self.__objects: Dict[int, int] = {}
+        # Keeps the ids of memoized objects unique while encoding
+        self.__alive: List[Any] = []
+        # Tuples and frozensets whose items are being written
+        self.__unfinished: Set[int] = set()
+
+    def __write_varint(self, value: int) -> None:
+        while value >= 0x80:
+            self.__buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.__buffer.append(value)
+
+    def __write_tag(self, tag: int) -> None:
+        self.__buffer.append(tag)
+
+    def __write_bytes(self, data: bytes) -> None:
+        self.__buffer += data
+        if len(self.__buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self.__stream.write(self.__buffer)
+        self.__buffer = bytearray()
+
+    def __write_str(self, value: str) -> None:
+        if value in self.__strings:
+            self.__write_tag(Tag.STR_REF)
+            self.__write_varint(self.__strings[value])
+            return
+
+        self.__strings[value] = len(self.__strings)
+        data = value.encode("utf-8")
+        self.__write_tag(Tag.STR)
+        self.__write_varint(len(data))
+        self.__write_bytes(data)
+
+    def __write_class(self, cls: type) -> None:
+        if cls in self.__classes:
+            self.__write_tag(Tag.CLASS_REF)
+            self.__write_varint(self.__classes[cls])
+            return
+
+        self.__classes[cls] = len(self.__classes)
+        self.__write_tag(Tag.CLASS)
+        self.__write_str(cls.__module__)
+        self.__write_str(cls.__qualname__)
+
+    def __memoize(self, obj: Any) -> None:
+        self.__objects[id(obj)] = len(self.__objects)
+        self.__alive.append(obj)
+
+    def __write_items(self, tag: int, items: Any, immutable: bool = False) -> None:
+        self.__memoize(items)
+        if immutable:
+            self.__unfinished.add(id(items))
+        values = list(items)
+        self.__write_tag(tag)
+        self.__write_varint(len(values))
+        for value in values:
+            self.write(value)
+        self.__unfinished.discard(id(items))
+
+    def write(self, obj: Any) -> None:
+        if obj is None:
+            self.__write_tag(Tag.NONE)
+        elif obj is True:
+            self.__write_tag(Tag.TRUE)
+        elif obj is False:
+            self.__write_tag(Tag.FALSE)
+        elif type(obj) is int:
+            # Zigzag encoding, small negative numbers stay small
+            self.__write_tag(Tag.INT)
+            self.__write_varint(obj * 2 if obj >= 0 else -obj * 2 - 1)
+        elif type(obj) is float:
+            self.__write_tag(Tag.FLOAT)
+            self.__write_bytes(FLOAT.pack(obj))
+        elif type(obj) is str:
+            self.__write_str(obj)
+        elif type(obj) is bytes:
+            self.__write_tag(Tag.BYTES)
+            self.__write_varint(len(obj))
+            self.__write_bytes(obj)
+        elif id(obj) in self.__objects:
+            if id(obj) in self.__unfinished:
+                raise EncodingError(
+                    f"cycle through a {type(obj).__name__} cannot be encoded"
+                )
+            # Shared objects are only written once
+            self.__write_tag(Tag.REF)
+            self.__write_varint(self.__objects[id(obj)])
+        elif type(obj) is list:
+            self.__write_items(Tag.LIST, obj)
+        elif type(obj) is tuple:
+            self.__write_items(Tag.TUPLE, obj, immutable=True)
+        elif type(obj) is set:
+            self.__write_items(Tag.SET, obj)
+        elif type(obj) is frozenset:
+            self.__write_items(Tag.FROZENSET, obj, immutable=True)
+        elif type(obj) is dict:
+            self.__memoize(obj)
+            self.__write_tag(Tag.DICT)
+            self.__write_varint(len(obj))
+            for key, value in obj.items():
+                self.write(key)
+                self.write(value)
+        elif isinstance(obj, type) and is_allowed(obj):
+            self.__write_class(obj)
+        elif isinstance(obj, Enum) and is_allowed(type(obj)):
+            self.__write_tag(Tag.ENUM)
+            self.__write_class(type(obj))
+            self.write(obj.value)
+        elif hasattr(obj, "__dict__") and is_allowed(type(obj)):
+            self.__memoize(obj)
+            self.__write_tag(Tag.OBJECT)
+            self.__write_class(type(obj))
+            self.__write_varint(len(obj.__dict__))
+            for key, value in obj.__dict__.items():
+                self.__write_str(key)
+                self.write(value)
+        else:
+            data = pickle.dumps(obj)
+            self.__write_tag(Tag.PICKLE)
+            self.__write_varint(len(data))
+            self.__write_bytes(data)
+
+
+class Decoder:
+    def __init__(self, stream: BinaryIO) -> None:
+        self.__stream = stream
+        self.__strings: List[str] = []
+        self.__classes: List[type] = []
+        self.__objects: List[Any] = []
+        # The stream is read ahead in chunks
+        self.__buffer = b""
+        self.__position = 0
+
+    def __fill(self, size: int) -> None:
+        self.__buffer = self.__buffer[self.__position :] + self.__stream.read(
+            max(size, CHUNK_SIZE)
+        )
+        self.__position = 0
+        if len(self.__buffer) < size:
+            raise EncodingError("unexpected end of data")
+
+    def __read(self, size: int) -> bytes:
+        if self.__position + size > len(self.__buffer):
+            self.__fill(size)
+        data = self.__buffer[self.__position : self.__position + size]
+        self.__position += size
+        return data
+
+    def __read_byte(self) -> int:
+        if self.__position >= len(self.__buffer):
+            self.__fill(1)
+        byte = self.__buffer[self.__position]
+        self.__position += 1
+        return byte
+
+    def __read_varint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.__read_byte()
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    def __read_items(self) -> List[Any]:
+        return [self.read() for _ in range(self.__read_varint())]
+
+    def __reserve(self) -> int:
+        # Objects are numbered in the order the encoder started them
+        self.__objects.append(None)
+        return len(self.__objects) - 1
+
+    def __read_class(self, tag: int) -> type:
+        if tag == Tag.CLASS_REF:
+            return self.__classes[self.__read_varint()]
+        if tag != Tag.CLASS:
+            raise EncodingError(f"expected a class, got tag {tag}")
+
+        module = self.read()
+        qualname = self.read()
+        if not module.startswith(ALLOWED_MODULES):
+            raise EncodingError(f"class {module}.{qualname} is not allowed")
+
+        cls = import_module(module)
+        for name in qualname.split("."):
+            cls = getattr(cls, name)
+        self.__classes.append(cls)
+        return cls
+
+    def read(self) -> Any:
+        tag = self.__read_byte()
+        match tag:
+            case Tag.NONE:
+                return None
+            case Tag.TRUE:
+                return True
+            case Tag.FALSE:
+                return False
+            case Tag.INT:
+                value = self.__read_varint()
+                return value // 2 if value % 2 == 0 else -(value + 1) // 2
+            case Tag.FLOAT:
+                return FLOAT.unpack(self.__read(FLOAT.size))[0]
+            case Tag.STR:
+                value = self.__read(self.__read_varint()).decode("utf-8")
+                self.__strings.append(value)
+                return value
+            case Tag.STR_REF:
+                return self.__strings[self.__read_varint()]
+            case Tag.BYTES:
+                return self.__read(self.__read_varint())
+            case Tag.LIST:
+                index = self.__reserve()
+                obj = self.__objects[index] = []
+                obj.extend(self.__read_items())
+                return obj
+            case Tag.TUPLE:
+                index = self.__reserve()
+                self.__objects[index] = tuple(self.__read_items())
+                return self.__objects[index]
+            case Tag.SET:
+                index = self.__reserve()
+                obj = self.__objects[index] = set()
+                obj.update(self.__read_items())
+                return obj
+            case Tag.FROZENSET:
+                index = self.__reserve()
+                self.__objects[index] = frozenset(self.__read_items())
+                return self.__objects[index]
+            case Tag.DICT:
+                index = self.__reserve()
+                obj = self.__objects[index] = {}
+                for _ in range(self.__read_varint()):
+                    key = self.read()
+                    obj[key] = self.read()
+                return obj
+            case Tag.CLASS | Tag.CLASS_REF:
+                return self.__read_class(tag)
+            case Tag.ENUM:
+                cls = self.__read_class(self.__read_byte())
+                return cls(self.read())
+            case Tag.OBJECT:
+                index = self.__reserve()
+                cls = self.__read_class(self.__read_byte())
+                obj = self.__objects[index] = cls.__new__(cls)
+                for _ in range(self.__read_varint()):
+                    key = self.read()
+                    obj.__dict__[key] = self.read()
+                return obj
+            case Tag.PICKLE:
+                return pickle.loads(self.__read(self.__read_varint()))
+            case Tag.REF:
+                return self.__objects[self.__read_varint()]
+            case _:
+                raise EncodingError(f"unknown tag {tag}")
+
+
+def is_allowed(cls: type) -> bool:
+    return cls.__module__.startswith(ALLOWED_MODULES)
+
+
+def dump(obj: object, stream: BinaryIO) -> None:
+    stream.write(MAGIC)
+    stream.write(bytes([VERSION]))
+    encoder = Encoder(stream)
+    encoder.write(obj)
+    encoder.flush()
+
+
+def load(stream: BinaryIO) -> object:
+    header = stream.read(len(MAGIC) + 1)
+    if not header.startswith(MAGIC):
+        # Base64 encoded pickle written by older versions
+        return pickle.loads(b64decode(header + stream.read()))
+
+    if header[-1] != VERSION:
+        raise EncodingError(f"unsupported version {header[-1]}")
+    return Decoder(stream).read()
+
+
+def dumps(obj: object) -> bytes:
+    stream = io.BytesIO()
+    dump(obj, stream)
+    return stream.getvalue()
+
+
+def loads(data: bytes) -> object:
+    return load(io.BytesIO(data))
@@ -1,42 +1,91 @@
 import json
+import logging
 from datetime import datetime
 from difflib import ndiff
 from os import getcwd
-from os.path import join
+from os.path import exists, join
 from pathlib import Path
+from threading import Lock
+from typing import List
 
 from deepdiff import DeepDiff
 from rich.console import Console
 
+from triac.lib.buckets import get_fingerprint
+from triac.lib.corpus import Corpus
 from triac.types.errors import StateMismatchError
-from triac.types.execution import Execution
+from triac.types.execution import Execution, ExecutionMode
+from triac.types.target import Target
 from triac.types.wrapper import State
 
 ERROR_LOCATION = "errors"
 
+# Concurrent workers must not pick the same file name
+file_name_lock = Lock()
+
 
 def get_path_to_errors() -> str:
     return join(getcwd(), ERROR_LOCATION)
 
 
+def get_corpus() -> Corpus:
+    return Corpus(get_path_to_errors())
+
+
+def get_targets(execution: Execution) -> List[Target]:
+    if execution.mode == ExecutionMode.UNIT:
+        return [execution.unit_target]
+    return execution.differential_targets
+
+
 def pretty_print_state(state: State) -> str:
-    console = Console(record=True)
+    console = Console()
     with console.capture() as capture:
         console.print(state)
-    return str(console.export_text())
+    return capture.get()
 
 
-def persist_error(execution: Execution, e: StateMismatchError) -> None:
+def persist_error(execution: Execution, e: StateMismatchError) -> bool:
+    """
+    Sorts the error into its bucket and stores it, unless the bucket
+    already holds enough exemplars. Returns whether it was stored.
+    """
+    logger = logging.getLogger(__name__)
     folder = get_path_to_errors()
-    file_name = datetime.today().strftime("%Y-%m-%d-%H:%M:%S")
+    corpus = get_corpus()
+    deep_diff = DeepDiff(e.target, e.actual)
+    wrappers = [identifier.name for identifier, _ in execution.target_states]
+    wrapper = wrappers[-1] if len(wrappers) > 0 else ""
+    fields = [str(key) for key in deep_diff.affected_root_keys]
+    disagreeing = [target.name for target in e.disagreeing]
+
+    # Bucket the error by its fingerprint
+    fingerprint = get_fingerprint(wrapper, e.target, e.actual, deep_diff, disagreeing)
+    hits = corpus.hit(fingerprint, wrapper, fields)
+    execution.add_bucket_hit(fingerprint)
+    if hits > execution.exemplars:
+        logger.info(f"Error belongs to bucket {fingerprint} ({hits} hits), not stored")
+        return False
+    logger.info(f"Storing error as exemplar {hits} of bucket {fingerprint}")
+
+    timestamp = datetime.today().strftime("%Y-%m-%d-%H:%M:%S")
 
     # Ensure the folder exists
     Path(folder).mkdir(parents=True, exist_ok=True)
 
-    # Write encoded wrappers
-    encoded_target = join(folder, f"{file_name}.triac")
-    with open(encoded_target, "w") as file:
-        file.write(execution.encode_wrappers_for_round())
+    # Write encoded wrappers. Errors found within the same
+    # second get a counter appended to their file name
+    with file_name_lock:
+        file_name = timestamp
+        counter = 1
+        while exists(join(folder, f"{file_name}.triac")):
+            file_name = f"{timestamp}-{counter}"
+            counter += 1
+
+        encoded_wrappers = execution.encode_wrappers_for_round()
+        encoded_target = join(folder, f"{file_name}.triac")
+        with open(encoded_target, "wb") as file:
+            file.write(encoded_wrappers)
 
     # Write diff between states in human readable format
 
@@ -49,7 +98,7 @@ def persist_error(execution: Execution, e: StateMismatchError) -> None:
             return lambda x: x.__repr__()
 
     # Get diff
-    json_diff = DeepDiff(e.target, e.actual).to_json()  # (default_mapping=Mapping())
+    json_diff = deep_diff.to_json()  # (default_mapping=Mapping())
 
     # Load back into json and then merge with target
     # and actual. Not the cleanest way to do this,
@@ -59,11 +108,28 @@ def persist_error(execution: Execution, e: StateMismatchError) -> None:
     # converted in order to be valid in json
     diff = json.loads(json_diff)
 
+    report = {"target": target_pretty, "actual": actual_pretty, "changes": diff}
+    if len(disagreeing) > 0:
+        report["disagreeing"] = disagreeing
+
     # Dump it into the file
     human_readable = join(folder, f"{file_name}.json")
     with open(human_readable, "w") as file:
-        json.dump(
-            {"target": target_pretty, "actual": actual_pretty, "changes": diff},
-            file,
-            indent=4,
-        )
+        json.dump(report, file, indent=4)
+
+    # Add to the corpus to make the error searchable
+    corpus.add(
+        file=file_name,
+        base_image=execution.base_image.name,
+        mode=execution.mode.name,
+        wrappers=wrappers,
+        targets=[target.name for target in get_targets(execution)],
+        disagreeing=disagreeing,
+        fields=fields,
+        target_state=target_pretty,
+        actual_state=actual_pretty,
+        changes=json.dumps(diff),
+        data=encoded_wrappers,
+        fingerprint=fingerprint,
+    )
+    return True
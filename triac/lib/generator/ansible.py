@@ -1,13 +1,16 @@
 import logging
 from os.path import join
 from pprint import pformat
+from typing import Optional
 
 import ansible_runner
 
 from triac.lib.docker.types.container import Container
+from triac.lib.generator.connections import connections
 from triac.lib.generator.errors import AnsibleError
 from triac.lib.generator.key import Key
 from triac.lib.generator.tmp import Tmp
+from triac.lib.tracing import tracer
 from triac.types.target import Target
 from triac.types.wrapper import State, Wrapper
 
@@ -22,9 +25,12 @@ class Ansible(Tmp, Key):
         self.__wrapper = wrapper
         self.__state = state
         self.__container = container
+        self.__changed = None
         self.__logger = logging.getLogger(__name__)
 
-        self.__inventory_path = join(super().tmp_path, "inventory.yaml")
+        self.__inventory_path = connections.inventory(
+            container, "inventory.yaml", self.__inventory
+        )
         self.__playbook_path = join(super().tmp_path, "playbook.yaml")
 
         self.__generate()
@@ -34,11 +40,12 @@ class Ansible(Tmp, Key):
 all:
   hosts:
     target:
-      ansible_host: localhost
+      ansible_host: {self.__container.ssh_host}
       ansible_port: {self.__container.ssh_port}
       ansible_user: root
       ansible_ssh_private_key_file: {self.key_path}
       ansible_ssh_common_args: "-o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no -o IdentitiesOnly=yes"
+      ansible_control_path: {connections.control_path(self.__container)}
         """
 
     def __playbook(self) -> str:
@@ -58,10 +65,6 @@ all:
     - {task}"""
 
     def __generate(self) -> None:
-        inventory_file = open(self.__inventory_path, "w+")
-        inventory_file.write(self.__inventory())
-        inventory_file.close()
-
         playbook_file = open(self.__playbook_path, "w+")
         playbook = self.__playbook()
         self.__logger.debug("Generated the following ansible playbook:")
@@ -70,20 +73,35 @@ all:
         playbook_file.close()
         pass
 
+    @property
+    def changed(self) -> Optional[bool]:
+        """
+        Whether Ansible reported a change, None before the run
+        """
+        return self.__changed
+
     def run(self) -> State:
-        # Run synchronous
-        runner = ansible_runner.run(
-            inventory=self.__inventory_path, playbook=self.__playbook_path, quiet=True
-        )
+        # Run synchronous. The ssh connection to the
+        # container is kept open for the next wrapper
+        with tracer.span("run_tool"):
+            runner = ansible_runner.run(
+                inventory=self.__inventory_path,
+                playbook=self.__playbook_path,
+                quiet=True,
+                envvars=connections.ansible_envvars(),
+            )
 
         for event in runner.events:
             if "event" in event:
-                self.__logger.debug(f"Got ansible event:")
-                self.__logger.debug(
-                    pformat(event)
-                )  # Pretty print the event to enable better debugging
+                # Pretty printing the events is costly, they are only needed for debugging
+                if self.__logger.isEnabledFor(logging.DEBUG):
+                    self.__logger.debug(f"Got ansible event:")
+                    self.__logger.debug(pformat(event))
                 if event["event"] in FAILURE_EVENTS:
                     raise AnsibleError(event["event"], event)
+                elif event["event"] == "runner_on_ok":
+                    result = event.get("event_data", {}).get("res", {})
+                    self.__changed = result.get("changed", False)
                 elif (
                     event["event"] == "verbose"
                     and "ERROR! We were unable to read" in event["stdout"]
@@ -92,8 +110,9 @@ all:
 
         # Cleanup the temp files
         self.destroy()
-    
+
         # Fetch the reached state and return
-        return self.__container.execute_method(
-            self.__wrapper, "verify", [self.__state]
-        )
+        with tracer.span("verify"):
+            return self.__container.execute_method(
+                self.__wrapper, "verify", [self.__state]
+            )
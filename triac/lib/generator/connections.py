@@ -0,0 +1,106 @@
+import atexit
+import logging
+import subprocess
+from glob import glob
+from os import remove
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import RLock
+from typing import Callable, Dict, Optional, Tuple
+
+from triac.lib.docker.types.container import Container
+
+# Seconds an idle SSH master connection stays open
+CONTROL_PERSIST = 300
+
+
+class Connections:
+    """
+    Keeps the SSH connections and inventories of a container alive
+    between the executions of consecutive wrappers. Everything is
+    keyed by the container, so a new container never reuses the
+    connection of a removed one. The temporary directory is only
+    created when it is used and removed when the process exits.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = RLock()
+        self.__path: Optional[str] = None
+        self.__inventories: Dict[Tuple[str, str], str] = {}
+        self.__logger = logging.getLogger(__name__)
+
+    @property
+    def tmp_path(self) -> str:
+        with self.__lock:
+            if self.__path is None:
+                self.__path = mkdtemp()
+                atexit.register(self.destroy)
+            return self.__path
+
+    def control_path(self, container: Container) -> str:
+        # Unix socket paths are limited to around 100 characters
+        return join(self.tmp_path, f"cp-{container.id[:12]}")
+
+    def ansible_envvars(self) -> Dict[str, str]:
+        return {
+            "ANSIBLE_PIPELINING": "True",
+            "ANSIBLE_SSH_ARGS": f"-C -o ControlMaster=auto -o ControlPersist={CONTROL_PERSIST}s",
+        }
+
+    def inventory(
+        self, container: Container, name: str, generate: Callable[[], str]
+    ) -> str:
+        """
+        Returns the path to the inventory file with the given name
+        for the container. The file is only written on the first call.
+        """
+        key = (name, container.id)
+        with self.__lock:
+            if key not in self.__inventories:
+                path = join(self.tmp_path, f"{container.id[:12]}-{name}")
+                with open(path, "w+") as file:
+                    file.write(generate())
+                self.__inventories[key] = path
+            return self.__inventories[key]
+
+    def release(self, container: Container) -> None:
+        """
+        Closes the master connection and removes
+        the inventories of the container
+        """
+        with self.__lock:
+            keys = [key for key in self.__inventories if key[1] == container.id]
+            paths = [self.__inventories.pop(key) for key in keys]
+
+        for path in paths:
+            if exists(path):
+                remove(path)
+
+        self.__close_master(self.control_path(container))
+
+    def __close_master(self, control_path: str) -> None:
+        if exists(control_path):
+            self.__logger.debug(f"Closing ssh master connection {control_path}")
+            subprocess.run(
+                ["ssh", "-O", "exit", "-o", f"ControlPath={control_path}", "target"],
+                capture_output=True,
+            )
+
+    def destroy(self) -> None:
+        """
+        Closes the remaining master connections and
+        removes the temporary directory
+        """
+        with self.__lock:
+            path, self.__path = self.__path, None
+            self.__inventories.clear()
+        if path is None:
+            return
+
+        for control_path in glob(join(path, "cp-*")):
+            self.__close_master(control_path)
+        rmtree(path, ignore_errors=True)
+
+
+connections = Connections()
@@ -1,11 +1,14 @@
+import json
 import logging
 import subprocess
 from os.path import join
-from typing import Container, List
+from typing import Container, List, Optional
 
+from triac.lib.generator.connections import connections
 from triac.lib.generator.errors import PyInfraError
 from triac.lib.generator.key import Key
 from triac.lib.generator.tmp import Tmp
+from triac.lib.tracing import tracer
 from triac.types.target import Target
 from triac.types.wrapper import State, Wrapper
 
@@ -18,10 +21,13 @@ class PyInfra(Tmp, Key):
         self.__wrapper = wrapper
         self.__state = state
         self.__container = container
+        self.__changed = None
         self.__logger = logging.getLogger(__name__)
 
         self.__operations_path = join(super().tmp_path, "deploy.py")
-        self.__inventory_path = join(super().tmp_path, "inventory.py")
+        self.__inventory_path = connections.inventory(
+            container, "inventory.py", self.__host_inventory
+        )
 
         self.__generate()
 
@@ -32,7 +38,7 @@ class PyInfra(Tmp, Key):
         return f"""
 targets = [
     ("localhost", {{
-        "ssh_hostname": "localhost",
+        "ssh_hostname": "{self.__container.ssh_host}",
         "ssh_port": {self.__container.ssh_port},
         "ssh_key": "{self.key_path}",
         "ssh_user": "root",
@@ -44,10 +50,6 @@ targets = [
         """
 
     def __generate(self):
-        # Inventory
-        with open(self.__inventory_path, "w+") as inventory:
-            inventory.write(self.__host_inventory())
-
         # Deploy script
         with open(self.__operations_path, "w+") as deploy_script:
             script = self.__deploy_script()
@@ -58,12 +60,41 @@ targets = [
             deploy_script.write(script)
 
     def __get_pyinfra_invocation(self) -> List[str]:
-        return ["pyinfra", self.__inventory_path, self.__operations_path, "--no-wait"]
+        # The results are printed as JSON, which requires the explicit --yes
+        return [
+            "pyinfra",
+            self.__inventory_path,
+            self.__operations_path,
+            "--no-wait",
+            "--json",
+            "--yes",
+        ]
+
+    @property
+    def changed(self) -> Optional[bool]:
+        """
+        Whether pyinfra reported a change, None if unknown
+        """
+        return self.__changed
+
+    def __parse_changed(self, output: str) -> Optional[bool]:
+        # Operations that executed commands count as
+        # success, all others as no change
+        try:
+            totals = json.loads(output)["results"]["totals"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return None
+        if totals["success"] > 0:
+            return True
+        elif totals["no_change"] > 0:
+            return False
+        return None
 
     def run(self) -> State:
-        pyinfra = subprocess.run(
-            self.__get_pyinfra_invocation(), capture_output=True, text=True
-        )
+        with tracer.span("run_tool"):
+            pyinfra = subprocess.run(
+                self.__get_pyinfra_invocation(), capture_output=True, text=True
+            )
 
         # Cleanup the temp files
         self.destroy()
@@ -79,5 +110,10 @@ targets = [
         if pyinfra.returncode != 0:
             raise PyInfraError(pyinfra.returncode)
 
+        self.__changed = self.__parse_changed(pyinfra.stdout)
+
         # Fetch the reached state and return that
-        return self.__container.execute_method(self.__wrapper, "verify", [self.__state])
+        with tracer.span("verify"):
+            return self.__container.execute_method(
+                self.__wrapper, "verify", [self.__state]
+            )
@@ -0,0 +1,214 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from enum import Enum
+from logging.handlers import RotatingFileHandler
+from threading import Lock
+from typing import Any, Deque, Dict, List
+
+from triac.lib.tracing import attributes
+from triac.ui.log_filter import build_log_filter
+
+LOG_FILE = "triac.log"
+
+# Loggers whose debug output is the verbose output of the tools,
+# e.g. the generated files, the events of Ansible and the
+# output of the methods that are executed in the container
+TOOL_LOGGERS = ("triac.lib.generator", "triac.lib.docker.types.container")
+
+# Records of the tools that are held back per round at most
+MAX_ROUND_RECORDS = 10000
+
+
+class LogFormat(Enum):
+    TEXT = "text"
+    JSON = "json"
+
+
+class ToolLogs(Enum):
+    ALWAYS = "always"
+    ON_ERROR = "on-error"
+
+
+def get_log_filter():
+    return build_log_filter(False, [__name__.split(".")[0], "__main__"])
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats every record as one JSON object, together with
+    the round, base image, wrapper and tool it belongs to
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            **getattr(record, "context", attributes.get()),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def compress(source: str, destination: str) -> None:
+    with open(source, "rb") as f_in:
+        with gzip.open(destination, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class CompressingLogHandler(RotatingFileHandler):
+    """
+    Rotates the log file when it exceeds the size or is older
+    than the interval. Rotated files are compressed with gzip.
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int, backups: int, interval: float = 0
+    ) -> None:
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = compress
+        self.__interval = interval
+        self.__rollover_at = time.time() + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.__interval > 0 and time.time() >= self.__rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        if self.backupCount > 0:
+            super().doRollover()
+        elif self.stream is not None:
+            # Without backups, the file starts over
+            self.stream.flush()
+            self.stream.truncate(0)
+        self.__rollover_at = time.time() + self.__interval
+
+
+class RoundLogBuffer(logging.Handler):
+    """
+    Holds back the verbose output of the tools during a fuzzing round.
+    The output is only written to the log if the round fails and
+    dropped otherwise. Records outside of rounds are written directly.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__lock = Lock()
+        self.__target: logging.Handler = None
+        self.__rounds: Dict[Any, Deque[logging.LogRecord]] = {}
+
+    def attach(self, target: logging.Handler) -> None:
+        self.__target = target
+        self.setLevel(target.level)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        round = attributes.get().get("round")
+        if (
+            round is None
+            or record.levelno > logging.DEBUG
+            or not record.name.startswith(TOOL_LOGGERS)
+        ):
+            self.__target.handle(record)
+            return
+
+        # The record is written later, in a different context
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = attributes.get()
+        with self.__lock:
+            records = self.__rounds.setdefault(round, deque(maxlen=MAX_ROUND_RECORDS))
+            records.append(record)
+
+    def __take(self) -> List[logging.LogRecord]:
+        with self.__lock:
+            return list(self.__rounds.pop(attributes.get().get("round"), []))
+
+    def persist(self) -> None:
+        """
+        Writes the held back output of the current round
+        """
+        for record in self.__take():
+            self.__target.handle(record)
+
+    def discard(self) -> None:
+        """
+        Drops the held back output of the current round
+        """
+        self.__take()
+
+    def flush(self) -> None:
+        if self.__target is not None:
+            self.__target.flush()
+
+    def close(self) -> None:
+        if self.__target is not None:
+            self.__target.close()
+        super().close()
+
+
+round_logs = RoundLogBuffer()
+
+
+def get_round_logs() -> RoundLogBuffer:
+    return round_logs
+
+
+def get_file_handler(
+    level: str,
+    workers: int,
+    format: LogFormat = LogFormat.TEXT,
+    max_bytes: int = 0,
+    backups: int = 0,
+    interval: float = 0,
+    tool_logs: ToolLogs = ToolLogs.ALWAYS,
+) -> logging.Handler:
+    handler = CompressingLogHandler(LOG_FILE, max_bytes, backups, interval)
+    handler.setLevel(level)
+    if format == LogFormat.JSON:
+        handler.setFormatter(JsonFormatter())
+    else:
+        # With multiple jobs, the worker is part of every log line
+        worker = "%(threadName)s - " if workers > 1 else ""
+        handler.setFormatter(
+            logging.Formatter(
+                fmt=f"%(asctime)s - {worker}%(name)s :: %(levelname)-8s :: %(message)s",
+                datefmt="[%Y-%m-%d %H:%M:%S]",
+            )
+        )
+    handler.addFilter(get_log_filter())
+
+    if tool_logs == ToolLogs.ON_ERROR:
+        round_logs.attach(handler)
+        return round_logs
+    return handler
+
+
+def configure_headless_logging(
+    level: str, console_level: str, file_handler: logging.Handler
+) -> None:
+    """
+    Logs to the file and, instead of the UI, to stderr
+    """
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(
+        logging.Formatter(
+            fmt="%(asctime)s - %(threadName)s :: %(levelname)-8s :: %(message)s",
+            datefmt="[%Y-%m-%d %H:%M:%S]",
+        )
+    )
+    console_handler.addFilter(get_log_filter())
+    logging.basicConfig(level=level, handlers=[file_handler, console_handler])
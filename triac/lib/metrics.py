@@ -0,0 +1,268 @@
+import logging
+import os
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Tuple
+
+from triac.lib.docker.reaper import reaper
+from triac.lib.tracing import tracer
+from triac.types.execution import Execution
+from triac.types.worker import WorkerStatus
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the duration buckets in seconds. The phases range
+# from milliseconds (verify) to minutes (building base images)
+BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600]
+
+# Seconds between two writes of the textfile
+TEXTFILE_INTERVAL = 15
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join([f'{key}="{escape(value)}"' for key, value in labels]) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.__counts = [0] * (len(BUCKETS) + 1)
+        self.__sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.__counts[bisect_left(BUCKETS, value)] += 1
+        self.__sum += value
+
+    def samples(self, name: str, labels: Labels) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS + [float("inf")], self.__counts):
+            cumulative += count
+            le = labels + (("le", format_value(float(bound))),)
+            lines.append(f"{name}_bucket{format_labels(le)} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(self.__sum)}")
+        lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """
+    Exposes the progress of the execution in the Prometheus text
+    format, either via HTTP or as a file for the textfile collector
+    of the node exporter. Most values are read from the execution
+    when the metrics are collected, the durations of the phases
+    are recorded from the tracer.
+    """
+
+    def __init__(self, execution: Execution) -> None:
+        self.__execution = execution
+        self.__logger = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.__durations: Dict[Labels, Histogram] = {}
+        self.__server: ThreadingHTTPServer = None
+        self.__stop = Event()
+        self.__writer: Thread = None
+        self.__textfile: str = None
+        tracer.add_listener(self.__observe_span)
+
+    def __observe_span(
+        self, phase: str, duration: float, attributes: Dict[str, Any]
+    ) -> None:
+        labels = (("phase", phase), ("target", attributes.get("target", "")))
+        with self.__lock:
+            self.__durations.setdefault(labels, Histogram()).observe(duration)
+
+    def __docker_resources(self) -> List[Tuple[Labels, Dict[str, int]]]:
+        resources = []
+        for docker in self.__execution.docker_clients:
+            try:
+                resources.append(((("host", docker.host),), docker.count_resources()))
+            except Exception as e:
+                self.__logger.debug(f"Could not count resources of {docker.host}: {e}")
+        return resources
+
+    def render(self) -> str:
+        execution = self.__execution
+        families: List[Tuple[str, str, str, List[Tuple[Labels, Any]]]] = []
+
+        def add(name: str, kind: str, help: str, *samples: Tuple[Labels, Any]):
+            families.append((name, kind, help, list(samples)))
+
+        add(
+            "triac_rounds", "counter", "Rounds that were started", ((), execution.round)
+        )
+        add(
+            "triac_rounds_planned",
+            "gauge",
+            "Rounds of the execution",
+            ((), execution.total_rounds),
+        )
+        add(
+            "triac_wrappers_executed",
+            "counter",
+            "Wrappers that were executed",
+            ((), execution.wrappers_executed),
+        )
+        add(
+            "triac_errors",
+            "counter",
+            "Rounds that ended with a state mismatch",
+            ((), execution.errors),
+        )
+        add(
+            "triac_error_buckets",
+            "gauge",
+            "Distinct errors by their fingerprint",
+            ((), len(execution.buckets)),
+        )
+        add(
+            "triac_behaviours",
+            "gauge",
+            "Unique behaviours of the tools",
+            ((), execution.coverage.behaviours),
+        )
+        add(
+            "triac_uptime_seconds",
+            "gauge",
+            "Seconds since the execution started",
+            ((), execution.elapsed_time.total_seconds()),
+        )
+        add(
+            "triac_workers",
+            "gauge",
+            "Workers by their status",
+            *[
+                (
+                    (("status", status.value),),
+                    len([w for w in execution.workers if w.status == status]),
+                )
+                for status in WorkerStatus
+            ],
+        )
+        add(
+            "triac_base_images",
+            "counter",
+            "Lookups of base images by whether the image had to be built",
+            ((("result", "built"),), execution.base_image_builds),
+            ((("result", "cached"),), execution.base_image_cache_hits),
+        )
+        pools = execution.container_pools
+        if len(pools) > 0:
+            add(
+                "triac_pool_acquisitions",
+                "counter",
+                "Containers taken from the warm pools by whether one was ready",
+                ((("result", "hit"),), sum([pool.hits for pool in pools])),
+                ((("result", "miss"),), sum([pool.misses for pool in pools])),
+            )
+
+        add(
+            "triac_cleanup_pending",
+            "gauge",
+            "Containers and images that wait for their removal",
+            ((), reaper.pending),
+        )
+
+        resources = self.__docker_resources()
+        add(
+            "triac_docker_containers",
+            "gauge",
+            "Containers of TRIaC on the docker host",
+            *[(labels, counts["containers"]) for labels, counts in resources],
+        )
+        add(
+            "triac_docker_images",
+            "gauge",
+            "Images of TRIaC on the docker host",
+            *[(labels, counts["images"]) for labels, counts in resources],
+        )
+
+        lines = []
+        for name, kind, help, samples in families:
+            suffix = "_total" if kind == "counter" else ""
+            lines.append(f"# HELP {name}{suffix} {help}")
+            lines.append(f"# TYPE {name}{suffix} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{suffix}{format_labels(labels)} {value}")
+
+        # The run of a tool, the boot of a container and the build of
+        # an image are the phases run_tool, run_container and build_base_image
+        name = "triac_phase_duration_seconds"
+        lines.append(f"# HELP {name} Duration of the phases of the execution")
+        lines.append(f"# TYPE {name} histogram")
+        with self.__lock:
+            for labels, histogram in sorted(self.__durations.items()):
+                lines += histogram.samples(name, labels)
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, address: str = "127.0.0.1") -> None:
+        """
+        Serves the metrics via HTTP on the port in the background
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ["/", "/metrics"]:
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((address, port), Handler)
+        self.__server.daemon_threads = True
+        Thread(target=self.__server.serve_forever, name="metrics", daemon=True).start()
+        self.__logger.info(f"Serving metrics on http://{address}:{port}/metrics")
+
+    def write_textfile(self, path: str) -> None:
+        # Replaced atomically, so the collector never reads a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def export_textfile(self, path: str) -> None:
+        """
+        Writes the metrics to the file in the background
+        """
+
+        def write():
+            while not self.__stop.wait(TEXTFILE_INTERVAL):
+                self.write_textfile(path)
+
+        self.write_textfile(path)
+        self.__writer = Thread(target=write, name="metrics-textfile", daemon=True)
+        self.__textfile = path
+        self.__writer.start()
+
+    def close(self) -> None:
+        self.__stop.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+        if self.__writer is not None:
+            self.__writer.join()
+            # The final values stay available
+            self.write_textfile(self.__textfile)
@@ -0,0 +1,70 @@
+from typing import Callable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Tests a batch of candidates and returns the position of the first
+# candidate that still reproduces the error, or None if none does.
+# Candidates after the first reproducing one do not have to be tested.
+Tester = Callable[[List[List[T]]], Optional[int]]
+
+
+def split(items: List[T], n: int) -> List[List[T]]:
+    """
+    Splits the items into n chunks of (almost) equal size
+    """
+    size, rest = divmod(len(items), n)
+    chunks = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def ddmin(items: List[T], test: Tester) -> List[T]:
+    """
+    Delta debugging (Zeller and Hildebrandt). Returns a 1-minimal
+    subsequence of the items that still reproduces the error, i.e.
+    removing any single item of the result makes the error disappear.
+    The items themselves have to reproduce the error. All candidates
+    of a step are handed to the tester at once, so that it can test
+    them in parallel.
+    """
+    # Candidates are tracked by the positions of their items,
+    # which allows to skip candidates that were already rejected
+    rejected: Set[Tuple[int, ...]] = set()
+
+    def first_reproducing(candidates: List[List[int]]) -> Optional[List[int]]:
+        untested = [c for c in candidates if tuple(c) not in rejected]
+        if len(untested) == 0:
+            return None
+
+        found = test([[items[i] for i in c] for c in untested])
+        tested = untested if found is None else untested[:found]
+        rejected.update([tuple(c) for c in tested])
+        return untested[found] if found is not None else None
+
+    current = list(range(len(items)))
+    n = 2
+    while len(current) >= 2:
+        chunks = split(current, n)
+        complements = [[i for i in current if i not in chunk] for chunk in chunks]
+
+        # With two chunks, the complements are the chunks themselves
+        found = first_reproducing(chunks if n == 2 else chunks + complements)
+        if found is not None and found in chunks:
+            # Continue with the smaller chunk
+            current = found
+            n = 2
+        elif found is not None:
+            # Continue with the complement, keep the granularity
+            current = found
+            n = max(n - 1, 2)
+        elif n < len(current):
+            # Increase the granularity
+            n = min(n * 2, len(current))
+        else:
+            break
+
+    return [items[i] for i in current]
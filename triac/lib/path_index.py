@@ -0,0 +1,305 @@
+from enum import Enum
+from itertools import product
+from os import listdir, walk
+from os.path import commonpath, dirname, isdir, isfile, islink, join
+from random import choice, randrange
+from re import match
+from string import ascii_letters, digits
+from typing import Dict, List, Optional, Set, Tuple
+
+from triac.lib.docker.const import TRIAC_WORKING_DIR
+
+
+class FileType(Enum):
+    FILE = "file"
+    DIRECTORY = "directory"
+
+
+IGNORE_PATHS = f"^/(tmp|proc|mnt|run|dev|lib\\w*|sys|{TRIAC_WORKING_DIR}|\\.socket$)"
+IGNORE_PATHS_DELETE = f"^/(etc$|etc/hostname$|sbin|usr/sbin|usr/app/triac|usr/lib.*|boot|bin|usr/bin|root/.ssh$)"
+
+
+class NoPathError(Exception):
+    def __init__(
+        self,
+        existing: bool,
+        filetype: FileType,
+        deletable: bool,
+        empty: bool,
+        cause: int,
+    ):
+        super().__init__(
+            f"No path matching the required options: existing={existing}, filetype={filetype}, deletable={deletable}, empty={empty}, cause={cause}"
+        )
+
+
+def random_name(size: int, chars=ascii_letters + digits):
+    return "".join(choice(chars) for _ in range(size))
+
+
+def depth(path: str) -> int:
+    return path.rstrip("/").count("/")
+
+
+class Candidates:
+    """
+    Set of paths that supports adding, removing and sampling in
+    constant time. Every depth is equally likely to be sampled and
+    the paths of a depth are sampled uniformly. Otherwise, nearly
+    all samples would come from deep trees like /usr/share.
+    """
+
+    def __init__(self) -> None:
+        self.__depths: Dict[int, List[str]] = {}
+        self.__positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.__positions)
+
+    @property
+    def paths(self) -> List[str]:
+        return list(self.__positions)
+
+    def add(self, path: str) -> None:
+        if path not in self.__positions:
+            paths = self.__depths.setdefault(depth(path), [])
+            self.__positions[path] = len(paths)
+            paths.append(path)
+
+    def discard(self, path: str) -> None:
+        pos = self.__positions.pop(path, None)
+        if pos is None:
+            return
+        # Move the last path of the depth into the freed slot
+        paths = self.__depths[depth(path)]
+        last = paths.pop()
+        if pos < len(paths):
+            paths[pos] = last
+            self.__positions[last] = pos
+        elif len(paths) == 0:
+            del self.__depths[depth(path)]
+
+    def sample(self) -> str:
+        return choice(choice(list(self.__depths.values())))
+
+
+# Files, directories and empty directories of an index
+IndexEntries = Tuple[List[str], List[str], List[str]]
+
+
+class PathIndex:
+    """
+    Index of the filesystem below root. The filesystem is only walked
+    once, afterwards paths are sampled from the precomputed candidates.
+    The index can also be restored from the entries of another container
+    instead of walking the filesystem. Sampled paths are checked against
+    the filesystem and updated if they changed in the meantime.
+    """
+
+    def __init__(self, root: str, entries: Optional[IndexEntries] = None) -> None:
+        self.__root = root
+        self.__parents = Candidates()
+        self.__files = Candidates()
+        # Directories by (deletable, empty)
+        self.__dirs = {key: Candidates() for key in product([True, False], repeat=2)}
+        # Indexed entries of every directory, to drop removed trees
+        self.__children: Dict[str, Set[str]] = {}
+        # Paths that were updated since the index was built or restored
+        self.__updates: Dict[str, None] = {}
+        self.__parents.add(root)
+        if entries is None:
+            self.__walk(root)
+        else:
+            self.__restore(entries)
+
+    @property
+    def root(self) -> str:
+        return self.__root
+
+    @property
+    def updates(self) -> List[str]:
+        return list(self.__updates)
+
+    def __walk(self, top: str) -> None:
+        for root, dirs, files in walk(top):
+            if root != self.__root:
+                self.__add_directory(root, len(dirs) == 0 and len(files) == 0)
+
+            # Ignored directories are not indexed, links are neither
+            # followed nor returned
+            dirs[:] = [d for d in dirs if not match(IGNORE_PATHS, join(root, d))]
+            for file in files:
+                if not islink(join(root, file)):
+                    self.__add_file(join(root, file))
+
+    def __restore(self, entries: IndexEntries) -> None:
+        files, dirs, empty_dirs = entries
+        empty = set(empty_dirs)
+        for path in dirs:
+            self.__add_directory(path, path in empty)
+        for path in files:
+            self.__add_file(path)
+
+    def entries(self) -> IndexEntries:
+        all_dirs = self.__dirs[(False, False)]
+        empty_dirs = self.__dirs[(False, True)]
+        return (self.__files.paths, all_dirs.paths, empty_dirs.paths)
+
+    def __add_file(self, path: str) -> None:
+        self.__files.add(path)
+        self.__children.setdefault(dirname(path), set()).add(path)
+
+    def __add_directory(self, path: str, empty: bool) -> None:
+        deletable = not match(IGNORE_PATHS_DELETE, path)
+        for (del_key, empty_key), candidates in self.__dirs.items():
+            # deletable ==> not match(..), empty ==> no entries
+            if (not del_key or deletable) and (not empty_key or empty):
+                candidates.add(path)
+        self.__parents.add(path)
+        self.__children.setdefault(dirname(path), set()).add(path)
+
+    def __discard(self, path: str) -> None:
+        self.__parents.discard(path)
+        self.__files.discard(path)
+        for candidates in self.__dirs.values():
+            candidates.discard(path)
+
+    def __remove_tree(self, path: str) -> None:
+        for child in self.__children.pop(path, set()):
+            self.__remove_tree(child)
+        self.__discard(path)
+        self.__children.get(dirname(path), set()).discard(path)
+
+    def __is_indexed(self, path: str) -> bool:
+        return (
+            path != self.__root
+            and commonpath([self.__root, path]) == self.__root
+            and not match(IGNORE_PATHS, path)
+        )
+
+    def update(self, path: str) -> None:
+        """
+        Updates the index after the path was changed (e.g. by a wrapper)
+        """
+        if not self.__is_indexed(path):
+            return
+        self.__updates[path] = None
+
+        # Everything below the path might have been removed or created
+        self.__remove_tree(path)
+        if islink(path):
+            pass
+        elif isdir(path):
+            self.__walk(path)
+        elif isfile(path):
+            self.__add_file(path)
+
+        # The emptiness of the parent might have changed
+        parent = dirname(path)
+        if self.__is_indexed(parent) and isdir(parent) and not islink(parent):
+            self.__discard(parent)
+            self.__add_directory(parent, len(listdir(parent)) == 0)
+
+    def __valid(self, path: str, file_type: FileType, empty: bool) -> bool:
+        if islink(path):
+            return False
+        if file_type == FileType.FILE:
+            return isfile(path)
+        return isdir(path) and (not empty or len(listdir(path)) == 0)
+
+    def __sample(
+        self, candidates: Candidates, file_type: FileType, empty: bool
+    ) -> Optional[str]:
+        while len(candidates) > 0:
+            path = candidates.sample()
+            if self.__valid(path, file_type, empty):
+                return path
+            # The entry is outdated, move it to the right candidates
+            self.update(path)
+            candidates.discard(path)
+        return None
+
+    def sample(
+        self, existing: bool, file_type: FileType, deletable: bool, empty: bool
+    ) -> str:
+        # empty ==> file_type == FileType.DIRECTORY
+        assert not empty or file_type == FileType.DIRECTORY
+
+        if existing:
+            if file_type == FileType.FILE:
+                candidates = self.__files
+            else:
+                candidates = self.__dirs[(deletable, empty)]
+            path = self.__sample(candidates, file_type, empty)
+        else:
+            # File/folder should not exist, give a random name
+            parent = self.__sample(self.__parents, FileType.DIRECTORY, False)
+            path = join(parent, random_name(randrange(5, 15, 1))) if parent else None
+
+        if path is None:
+            raise NoPathError(existing, file_type, deletable, empty, 1)
+        return path
+
+
+# Indexes are built once per process and root
+indexes: Dict[str, PathIndex] = {}
+
+
+def get_path_index(root: str = "/") -> PathIndex:
+    if root not in indexes:
+        indexes[root] = PathIndex(root)
+    return indexes[root]
+
+
+def update_path_indexes(path: str) -> None:
+    """
+    Updates all indexes that were built so far after the path changed
+    """
+    for index in indexes.values():
+        index.update(path)
+
+
+class PathIndexSnapshot:
+    """
+    Entries of the path indexes of a container. Snapshots are taken
+    in the first container of a base image and restored in the later
+    ones, so the filesystem is walked only once per base image. For
+    intermediate images, the snapshot of the base image is combined
+    with the paths that were updated before the image was committed.
+    """
+
+    def __init__(
+        self,
+        entries: Dict[str, IndexEntries],
+        updates: Dict[str, List[str]] = {},
+    ) -> None:
+        self.__entries = entries
+        self.__updates = updates
+
+    @staticmethod
+    def take() -> Optional["PathIndexSnapshot"]:
+        """
+        Returns None if no index was built yet
+        """
+        if len(indexes) == 0:
+            return None
+        return PathIndexSnapshot(
+            {root: index.entries() for root, index in indexes.items()}
+        )
+
+    @staticmethod
+    def take_updates() -> Dict[str, List[str]]:
+        return {root: index.updates for root, index in indexes.items()}
+
+    def with_updates(self, updates: Dict[str, List[str]]) -> "PathIndexSnapshot":
+        return PathIndexSnapshot(self.__entries, updates)
+
+    def restore(self) -> None:
+        for root, entries in self.__entries.items():
+            if root in indexes:
+                continue
+            index = PathIndex(root, entries)
+            # The paths are checked against the filesystem of this container
+            for path in self.__updates.get(root, []):
+                index.update(path)
+            indexes[root] = index
@@ -0,0 +1,162 @@
+import importlib
+import logging
+from glob import glob
+from os import environ
+from os.path import join
+from shutil import which
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DATA_DIR = "/var/lib/postgresql/data"
+
+# Catalog queries are prepared once per connection
+PREPARED_QUERIES = {
+    "list_databases": "SELECT datname FROM pg_database",
+}
+
+# Line 6 of postmaster.pid holds the first listen address,
+# line 8 the status of the postmaster (see pg_ctl -w)
+PID_LISTEN_ADDRESS = 5
+PID_STATUS = 7
+STATUS_READY = "ready"
+
+READY_TIMEOUT = 60
+READY_MIN_DELAY = 0.05
+READY_MAX_DELAY = 1
+
+
+def is_installed() -> bool:
+    return (
+        which("postgres") is not None
+        or len(glob("/usr/lib/postgresql/*/bin/postgres")) > 0
+    )
+
+
+def read_postmaster_status() -> Optional[List[str]]:
+    path = join(environ.get("PGDATA", DEFAULT_DATA_DIR), "postmaster.pid")
+    try:
+        with open(path, "r") as f:
+            return f.read().splitlines()
+    except OSError:
+        return None
+
+
+def is_ready() -> bool:
+    """
+    Whether the postmaster reports that it accepts connections. The server
+    that the docker entrypoint runs during the initialization does not
+    listen on TCP and is therefore not considered ready.
+    """
+    lines = read_postmaster_status()
+    return (
+        lines is not None
+        and len(lines) > PID_STATUS
+        and lines[PID_STATUS].strip() == STATUS_READY
+        and lines[PID_LISTEN_ADDRESS].strip() != ""
+    )
+
+
+class ConnectionPool:
+    """
+    Keeps one open connection per connection string. The pool lives
+    in the agent, which runs as long as the container, so that values
+    and wrappers do not open a new connection for every query.
+    """
+
+    def __init__(self) -> None:
+        self.__logger = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.__connections: Dict[str, Any] = {}
+        self.__ready = False
+
+    def wait_until_ready(self, timeout: float = READY_TIMEOUT) -> bool:
+        """
+        Waits until postgres signals its readiness. Returns False
+        right away if postgres is not installed in the container.
+        """
+        if self.__ready:
+            return True
+        if not is_installed():
+            return False
+
+        deadline = monotonic() + timeout
+        delay = READY_MIN_DELAY
+        while not is_ready():
+            if monotonic() + delay > deadline:
+                self.__logger.warning("Postgres did not become ready in time")
+                return False
+            sleep(delay)
+            delay = min(delay * 2, READY_MAX_DELAY)
+        self.__ready = True
+        return True
+
+    def __connect(self, uri: str) -> Any:
+        pg = importlib.import_module("psycopg2")
+        connection = pg.connect(uri)
+        # No transaction stays open between the queries, which
+        # would otherwise block the tools when they drop databases
+        connection.autocommit = True
+        with connection.cursor() as cur:
+            for name, query in PREPARED_QUERIES.items():
+                cur.execute(f"PREPARE {name} AS {query}")
+        self.__connections[uri] = connection
+        return connection
+
+    def __get(self, uri: str) -> Any:
+        connection = self.__connections.get(uri)
+        if connection is None or connection.closed:
+            connection = self.__connect(uri)
+        return connection
+
+    def __discard(self, uri: str) -> None:
+        connection = self.__connections.pop(uri, None)
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def execute(self, uri: str, name: str) -> List[tuple]:
+        """
+        Executes the prepared query with the given name and returns all rows.
+        A broken connection, e.g. after a restart of postgres, is
+        replaced once.
+        """
+        pg = importlib.import_module("psycopg2")
+        with self.__lock:
+            for attempt in range(2):
+                try:
+                    with self.__get(uri).cursor() as cur:
+                        cur.execute(f"EXECUTE {name}")
+                        return cur.fetchall()
+                except (pg.OperationalError, pg.InterfaceError):
+                    self.__discard(uri)
+                    if attempt > 0:
+                        raise
+        return []
+
+    def can_connect(self, uri: str) -> bool:
+        with self.__lock:
+            try:
+                self.__get(uri)
+                return True
+            except Exception:
+                self.__discard(uri)
+                return False
+
+    def close_all(self) -> None:
+        with self.__lock:
+            for uri in list(self.__connections.keys()):
+                self.__discard(uri)
+
+
+pool = ConnectionPool()
+
+
+def get_connection_pool() -> ConnectionPool:
+    return pool
+
+
+def list_databases(uri: str) -> List[str]:
+    return [row[0] for row in pool.execute(uri, "list_databases")]
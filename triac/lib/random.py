@@ -1,7 +1,8 @@
 import random
-from random import choice
+from random import choice, choices
 from typing import Any, Dict, List
 
+from triac.lib.coverage import Coverage, get_arm
 from triac.lib.docker.types.base_images import BaseImages
 from triac.lib.docker.types.container import Container
 from triac.types.wrapper import Definition, State, Wrapper
@@ -14,8 +15,9 @@ def probability_bound(prob: float) -> float:
 
 
 class Fuzzer:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, coverage: Coverage = None) -> None:
+        # Without coverage, all choices are uniformly random
+        self.__coverage = coverage
 
     @staticmethod
     def fuzz_dict(d: Dict[str, List[Any]]) -> Dict[str, Any]:
@@ -26,24 +28,46 @@ class Fuzzer:
 
     @staticmethod
     def fuzz_state(d: Definition, container: Container) -> State:
-        res = {}
-        for key, typ in d.items():
-            res[key] = container.execute_method(typ, "generate", [])
-        return res
+        return container.generate_state(d)
 
     @staticmethod
     def fuzz_base_image() -> BaseImages:
         return choice([val for val in BaseImages])
 
-    @staticmethod
-    @staticmethod
-    def fuzz_wrapper(current: Wrapper, options: List[type[Wrapper]]) -> Wrapper:
+    def fuzz_wrapper(self, current: Wrapper, options: List[type[Wrapper]]) -> Wrapper:
         """
         Randomly chooses the next wrapper to be executed.
+        With coverage, wrappers that rarely ran after the current
+        one or still find new behaviour are chosen more often.
         """
-        to_choose = options[:]
+        previous = current.__name__ if current != None else None
+        weights = [
+            (
+                self.__coverage.wrapper_weight(previous, option.__name__)
+                if self.__coverage is not None
+                else 1
+            )
+            for option in options
+        ]
         # Choose the same twice as likely as a new one
-        if current != None:
-            to_choose.append(current)
+        if current in options:
+            weights[options.index(current)] *= 2
+
+        return choices(options, weights)[0]
+
+    def choose_state(
+        self, wrapper: Wrapper, current: Wrapper, candidates: List[State]
+    ) -> State:
+        """
+        Chooses one of the generated candidate states. With coverage,
+        states whose value categories are rarely executed are preferred.
+        """
+        if self.__coverage is None:
+            return choice(candidates)
 
-        return choice(to_choose)
+        previous = current.__name__ if current != None else None
+        weights = [
+            self.__coverage.arm_weight(get_arm(wrapper.__name__, previous, state))
+            for state in candidates
+        ]
+        return choices(candidates, weights)[0]
@@ -1,4 +1,24 @@
 import importlib
+import re
+import subprocess
+from posixpath import basename
+from typing import Dict, List, Optional, Tuple
+
+# Properties of a unit that make up its status
+STATUS_PROPERTIES = [
+    "UnitFileState",
+    "UnitFilePreset",
+    "ActiveState",
+    "ConditionResult",
+    "ActiveEnterTimestampMonotonic",
+    "ActiveExitTimestampMonotonic",
+    "InactiveEnterTimestampMonotonic",
+    "InactiveExitTimestampMonotonic",
+    "ConditionTimestampMonotonic",
+]
+
+# Changes below these paths can change the units or their status
+SYSTEMD_PATHS = "^/(etc|run|lib|usr/lib|usr/local/lib)/systemd(/|$)"
 
 
 class ServiceStatus:
@@ -86,30 +106,114 @@ class ServiceStatusFetcher:
 
     @staticmethod
     def fetch(name: str) -> ServiceStatus:
-        systemd = importlib.import_module("pystemd.systemd1")
-        service = systemd.Unit(name, _autoload=True)
-
-        # Fetch data
-        enabled = service.Unit.UnitFileState.decode("utf-8")
-        enabled_preset = service.Unit.UnitFilePreset.decode("utf-8")
-        active = service.Unit.ActiveState.decode("utf-8")
-        condition_res = service.Unit.ConditionResult
-
-        # Timestamps
-        active_entered_tst = service.Unit.ActiveEnterTimestampMonotonic
-        active_exit_tst = service.Unit.ActiveExitTimestampMonotonic
-        inactive_entered_tst = service.Unit.InactiveEnterTimestampMonotonic
-        inactive_exit_tst = service.Unit.InactiveExitTimestampMonotonic
-        condition_tst = service.Unit.ConditionTimestampMonotonic
-
-        return ServiceStatus(
-            enabled,
-            enabled_preset,
-            active,
-            condition_res,
-            active_entered_tst,
-            active_exit_tst,
-            inactive_entered_tst,
-            inactive_exit_tst,
-            condition_tst,
+        return ServiceStatusFetcher.fetch_all([name])[name]
+
+    @staticmethod
+    def fetch_all(names: List[str]) -> Dict[str, ServiceStatus]:
+        """
+        Fetches the status of all units with a single systemctl
+        call instead of loading every unit over D-Bus one by one
+        """
+        if len(names) == 0:
+            return {}
+
+        result = subprocess.run(
+            ["systemctl", "show", f"--property={','.join(STATUS_PROPERTIES)}", "--"]
+            + names,
+            capture_output=True,
+            text=True,
+            check=True,
         )
+
+        # One block of properties per unit, in the order of the names
+        blocks = result.stdout.strip("\n").split("\n\n")
+        if len(blocks) != len(names):
+            raise Exception(
+                f"Expected the status of {len(names)} units, got {len(blocks)}"
+            )
+
+        statuses = {}
+        for name, block in zip(names, blocks):
+            properties = dict(
+                [line.split("=", 1) for line in block.splitlines() if "=" in line]
+            )
+            statuses[name] = ServiceStatus(
+                properties.get("UnitFileState", ""),
+                properties.get("UnitFilePreset", ""),
+                properties.get("ActiveState", ""),
+                properties.get("ConditionResult", "no") == "yes",
+                int(properties.get("ActiveEnterTimestampMonotonic") or 0),
+                int(properties.get("ActiveExitTimestampMonotonic") or 0),
+                int(properties.get("InactiveEnterTimestampMonotonic") or 0),
+                int(properties.get("InactiveExitTimestampMonotonic") or 0),
+                int(properties.get("ConditionTimestampMonotonic") or 0),
+            )
+        return statuses
+
+
+class UnitCatalogue:
+    """
+    The unit files of the container and the status of its services.
+    The catalogue lives in the agent, which runs as long as the
+    container, so it is built once per container and afterwards only
+    rebuilt when a wrapper touched systemd.
+    """
+
+    def __init__(self) -> None:
+        self.__unit_files: Optional[List[Tuple[str, str]]] = None
+        self.__statuses: Dict[str, ServiceStatus] = {}
+
+    def __build(self) -> None:
+        # Dynamically load pystemd
+        systemd = importlib.import_module("pystemd.systemd1")
+        manager = systemd.Manager()
+        manager.load()
+        self.__unit_files = [
+            (basename(elem[0].decode("utf-8")), elem[1].decode("utf-8"))
+            for elem in manager.Manager.ListUnitFiles()
+        ]
+
+        # Fetch the status of all services in bulk. Template
+        # services (with @) cannot be addressed by their name
+        services = [
+            name
+            for name, _ in self.__unit_files
+            if name.endswith(".service") and "@" not in name
+        ]
+        self.__statuses = ServiceStatusFetcher.fetch_all(services)
+
+    @property
+    def unit_files(self) -> List[Tuple[str, str]]:
+        """
+        Names and unit file states of all units
+        """
+        if self.__unit_files is None:
+            self.__build()
+        return self.__unit_files
+
+    def status(self, name: str) -> ServiceStatus:
+        if self.__unit_files is None:
+            self.__build()
+        if name not in self.__statuses:
+            self.__statuses[name] = ServiceStatusFetcher.fetch(name)
+        return self.__statuses[name]
+
+    def invalidate(self) -> None:
+        self.__unit_files = None
+        self.__statuses = {}
+
+
+catalogue = UnitCatalogue()
+
+
+def get_unit_catalogue() -> UnitCatalogue:
+    return catalogue
+
+
+def invalidate_unit_catalogue(path: str = None) -> None:
+    """
+    Invalidates the catalogue after systemd was touched. If a path
+    is given, only changes of systemd configuration invalidate it.
+    """
+    if path is None or re.match(SYSTEMD_PATHS, path):
+        catalogue.invalidate()
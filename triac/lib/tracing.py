@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+# Number of recent spans per phase that the percentiles are computed from
+WINDOW = 1000
+
+# Attributes that are added to every span, e.g. the round and the wrapper
+attributes: ContextVar[Dict[str, Any]] = ContextVar("attributes", default={})
+
+# Receives the phase, duration and attributes of every finished span
+Listener = Callable[[str, float, Dict[str, Any]], None]
+
+
+class TraceFormat(Enum):
+    JSONL = "jsonl"
+    CHROME = "chrome"
+
+
+def percentile(sorted_durations: List[float], p: float) -> float:
+    # Nearest rank
+    index = max(int(round(p * len(sorted_durations) + 0.5)) - 1, 0)
+    return sorted_durations[min(index, len(sorted_durations) - 1)]
+
+
+class PhaseStats:
+    def __init__(self) -> None:
+        self.__count = 0
+        self.__max = 0.0
+        self.__recent: Deque[float] = deque(maxlen=WINDOW)
+
+    def add(self, duration: float) -> None:
+        self.__count += 1
+        self.__max = max(self.__max, duration)
+        self.__recent.append(duration)
+
+    def summary(self) -> Tuple[int, float, float, float]:
+        """
+        Number of spans, p50 and p95 of the recent spans
+        and the maximum of all spans, in seconds
+        """
+        recent = sorted(self.__recent)
+        return (
+            self.__count,
+            percentile(recent, 0.5),
+            percentile(recent, 0.95),
+            self.__max,
+        )
+
+
+class Tracer:
+    """
+    Records how long the phases of the execution take, e.g. building
+    the base image or running a tool. Spans carry the attributes of the
+    context they were recorded in, like the wrapper and the base image.
+    They are aggregated per phase and can be written to a file as
+    JSON lines or in the Chrome trace format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.__phases: Dict[str, PhaseStats] = {}
+        self.__file: Optional[TextIO] = None
+        self.__format = TraceFormat.JSONL
+        self.__written = 0
+        self.__threads: Dict[int, str] = {}
+        self.__listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener) -> None:
+        with self.__lock:
+            self.__listeners.append(listener)
+
+    def export(self, path: str, format: TraceFormat = TraceFormat.JSONL) -> None:
+        """
+        Writes all following spans to the file
+        """
+        with self.__lock:
+            self.__file = open(path, "w")
+            self.__format = format
+            self.__written = 0
+            self.__threads = {}
+            if format == TraceFormat.CHROME:
+                self.__file.write("[\n")
+
+    def reset(self) -> None:
+        """
+        Forgets the statistics of all phases
+        """
+        with self.__lock:
+            self.__phases = {}
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is None:
+                return
+            if self.__format == TraceFormat.CHROME:
+                self.__file.write("\n]\n")
+            self.__file.close()
+            self.__file = None
+
+    @contextmanager
+    def context(self, **values: Any) -> Iterator[None]:
+        """
+        Adds the values to the attributes of all spans within the context
+        """
+        token = attributes.set({**attributes.get(), **values})
+        try:
+            yield
+        finally:
+            attributes.reset(token)
+
+    @contextmanager
+    def span(self, phase: str, **values: Any) -> Iterator[None]:
+        start = time.time()
+        counter = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - counter
+            span_attributes = {**attributes.get(), **values}
+            if error is not None:
+                span_attributes["error"] = error
+            self.__record(phase, start, duration, span_attributes)
+
+    def __record(
+        self, phase: str, start: float, duration: float, values: Dict[str, Any]
+    ) -> None:
+        thread = threading.current_thread()
+        with self.__lock:
+            listeners = list(self.__listeners)
+        for listener in listeners:
+            listener(phase, duration, values)
+
+        with self.__lock:
+            self.__phases.setdefault(phase, PhaseStats()).add(duration)
+            if self.__file is None:
+                return
+
+            if self.__format == TraceFormat.JSONL:
+                line = {
+                    "phase": phase,
+                    "start": round(start, 6),
+                    "duration": round(duration, 6),
+                    "thread": thread.name,
+                    **values,
+                }
+                self.__file.write(json.dumps(line, default=str) + "\n")
+                return
+
+            events = []
+            if thread.native_id not in self.__threads:
+                # Names the track of the thread
+                self.__threads[thread.native_id] = thread.name
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": os.getpid(),
+                        "tid": thread.native_id,
+                        "args": {"name": thread.name},
+                    }
+                )
+            events.append(
+                {
+                    "name": phase,
+                    "cat": "triac",
+                    "ph": "X",
+                    "ts": int(start * 1e6),
+                    "dur": int(duration * 1e6),
+                    "pid": os.getpid(),
+                    "tid": thread.native_id,
+                    "args": values,
+                }
+            )
+            for event in events:
+                separator = ",\n" if self.__written > 0 else ""
+                self.__file.write(separator + json.dumps(event, default=str))
+                self.__written += 1
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """
+        Phase, number of spans, p50, p95 and maximum duration
+        in seconds for every phase, sorted by the phase
+        """
+        with self.__lock:
+            return [
+                (phase, *stats.summary())
+                for phase, stats in sorted(self.__phases.items())
+            ]
+
+
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return tracer
@@ -0,0 +1,266 @@
+import json
+import logging
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from os.path import isdir, join
+from threading import Event, Lock
+from typing import Any, Dict, List, Optional
+
+import click
+from deepdiff import DeepDiff
+
+from triac.__main__ import (
+    cleanup_images,
+    get_execution_for_wrappers,
+    replay_headless,
+)
+from triac.lib.docker.client import DockerClient
+from triac.lib.docker.const import get_base_image_identifiers
+from triac.lib.docker.reaper import reaper
+from triac.lib.errors import get_path_to_errors
+from triac.lib.logs import LogFormat, configure_headless_logging, get_file_handler
+from triac.types.errors import ExecutionShouldStopRequestedError
+from triac.types.replay import ReplayStatus
+from triac.types.wrapper import State
+from triac.types.wrappers import load
+
+# Replays many error files without user interaction and reports
+# for every file whether the error still reproduces, e.g. to re-check
+# all errors after upgrading Ansible or pyinfra.
+# Invoke from the root of the repository via: python3 -m triac.recheck
+
+
+def configure_logging(
+    log_level: str,
+    jobs: int,
+    log_format: LogFormat,
+    max_bytes: int,
+    backups: int,
+    interval: float,
+):
+    # Everything goes to the log file, only problems to the console.
+    # stdout is reserved for the report
+    file_handler = get_file_handler(
+        log_level, jobs, log_format, max_bytes, backups, interval
+    )
+    configure_headless_logging(log_level, "WARNING", file_handler)
+
+
+def find_replay_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if isdir(path):
+            files += sorted(glob(join(path, "**", "*.triac"), recursive=True))
+        else:
+            files.append(path)
+    return files
+
+
+def differing_fields(target: State, actual: State) -> List[str]:
+    return sorted([str(key) for key in DeepDiff(target, actual).affected_root_keys])
+
+
+def recheck_file(
+    docker: DockerClient, file: str, stop_event: Event
+) -> Optional[Dict[str, Any]]:
+    """
+    Replays the file and returns its report,
+    or None if the execution was stopped
+    """
+    logger = logging.getLogger(__name__)
+    report: Dict[str, Any] = {"file": file}
+    try:
+        to_replay = load(file)
+    except Exception as e:
+        report["status"] = ReplayStatus.CRASHED.value
+        report["message"] = f"Could not parse the replay file: {e}"
+        return report
+
+    # Every file is replayed in its own execution, as the files
+    # can use different modes. All share the docker client,
+    # which builds every base image only once
+    execution = get_execution_for_wrappers(to_replay, True, "DEBUG", "DEBUG")
+    execution.load_list_of_wrapper_classes()
+    execution.bind_worker(0, docker.host)
+
+    logger.info(f"***** Replaying {file} on image {to_replay.base_image.name} *****")
+    try:
+        result = replay_headless(docker, execution, to_replay.target_states, stop_event)
+    except ExecutionShouldStopRequestedError:
+        return None
+
+    report["status"] = result.status.value
+    report["base_image"] = to_replay.base_image.name
+    report["mode"] = to_replay.unit or to_replay.differential
+    report["wrappers"] = to_replay.count
+    report["executed"] = result.executed
+    report["duration"] = round(result.duration, 2)
+    if result.error is not None:
+        report["fingerprint"] = result.fingerprint
+        report["fields"] = differing_fields(result.error.target, result.error.actual)
+        report["disagreeing"] = [target.name for target in result.error.disagreeing]
+    if to_replay.has_error:
+        report["expected_fields"] = differing_fields(
+            to_replay.error_target, to_replay.error_actual
+        )
+    if result.message is not None:
+        report["message"] = result.message
+    logger.info(f"{file}: {result.status.value}")
+    return report
+
+
+@click.command()
+@click.argument(
+    "paths",
+    nargs=-1,
+    type=click.Path(exists=True, readable=True),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    help="The number of files to replay concurrently",
+    type=click.IntRange(1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--output",
+    "-o",
+    help="File to write the report to, one JSON object per replayed file",
+    type=click.File("w"),
+    default="-",
+    show_default=True,
+)
+@click.option(
+    "--keep-base-images",
+    "-K",
+    help="Whether the base images that where build during the execution should be kept",
+    is_flag=True,
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "--log-level",
+    help="The log level to use for the generated log file",
+    default="DEBUG",
+    show_default=True,
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]),
+)
+@click.option(
+    "--log-format",
+    help="Format of the log file. 'json' writes one JSON object per line",
+    type=click.Choice([format.value for format in LogFormat]),
+    default=LogFormat.TEXT.value,
+    show_default=True,
+)
+@click.option(
+    "--log-max-size",
+    help="Size in MB after which the log file is rotated and compressed, 0 disables the rotation by size",
+    type=click.IntRange(0),
+    default=100,
+    show_default=True,
+)
+@click.option(
+    "--log-rotate-interval",
+    help="Hours after which the log file is rotated and compressed, 0 disables the rotation by time",
+    type=click.FloatRange(0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--log-backups",
+    help="Number of rotated log files that are kept",
+    type=click.IntRange(0),
+    default=5,
+    show_default=True,
+)
+def recheck(
+    paths,
+    jobs,
+    output,
+    keep_base_images,
+    log_level,
+    log_format,
+    log_max_size,
+    log_rotate_interval,
+    log_backups,
+):
+    """
+    Replays .triac files without user interaction and reports whether
+    their errors still reproduce. PATHS can be files or folders, which
+    are searched for .triac files. Defaults to the errors folder.
+    """
+    configure_logging(
+        log_level,
+        jobs,
+        LogFormat(log_format),
+        log_max_size * 1024 * 1024,
+        log_backups,
+        log_rotate_interval * 3600,
+    )
+    logger = logging.getLogger(__name__)
+    files = find_replay_files(list(paths) if len(paths) > 0 else [get_path_to_errors()])
+    logger.info(f"Replaying {len(files)} files with {jobs} jobs")
+
+    # Capture STRG+C (interrupts)
+    stop_event = Event()
+
+    def interrupt_handler(*args):
+        stop_event.set()
+        logger.error("Cancellation requested, stopping the current replays....")
+
+    signal.signal(signal.SIGINT, interrupt_handler)
+
+    try:
+        docker = DockerClient()
+    except Exception as e:
+        logger.error("Could not initialize docker client:")
+        logger.exception(e)
+        sys.exit(1)
+
+    # Reports are written as soon as a file is done
+    output_lock = Lock()
+    counts = {status: 0 for status in ReplayStatus}
+
+    def replay(file: str):
+        if stop_event.is_set():
+            return
+        report = recheck_file(docker, file, stop_event)
+        if report is None:
+            return
+        with output_lock:
+            counts[ReplayStatus(report["status"])] += 1
+            output.write(json.dumps(report) + "\n")
+            output.flush()
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=jobs, thread_name_prefix="recheck"
+        ) as executor:
+            for _ in executor.map(replay, files):
+                pass
+    finally:
+        to_remove = filter(
+            lambda elem: elem not in get_base_image_identifiers()
+            or not keep_base_images,
+            docker.built_images,
+        )
+        cleanup_images(docker, logger, to_remove)
+        reaper.drain()
+
+    summary = ", ".join(
+        [
+            f"{count} {status.value.replace('_', ' ')}"
+            for status, count in counts.items()
+        ]
+    )
+    print(
+        f"Replayed {sum(counts.values())} of {len(files)} files: {summary}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    recheck()
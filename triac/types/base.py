@@ -18,6 +18,13 @@ class BaseValue(ABC, Generic[T]):
     def transform(self, target: Target) -> str:
         pass
 
+    def category(self) -> str:
+        """
+        Coarse class of the value that is used to measure the coverage.
+        Values of the same category are expected to behave alike.
+        """
+        return type(self).__name__
+
 
 class BaseType(ABC, Generic[T]):
     def __init__(self) -> None:
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from triac.types.base import BaseValue
 from triac.types.target import Target
 from triac.types.wrapper import State, Wrapper
@@ -21,10 +23,11 @@ class WrappersExhaustedError(Exception):
 
 
 class StateMismatchError(Exception):
-    def __init__(self, target: State, actual: State):
+    def __init__(self, target: State, actual: State, disagreeing: List[Target] = []):
         super().__init__(f"Found a state mismatch between target and actual state")
         self.__target = target
         self.__actual = actual
+        self.__disagreeing = disagreeing
 
     @property
     def target(self):
@@ -34,6 +37,24 @@ class StateMismatchError(Exception):
     def actual(self):
         return self.__actual
 
+    @property
+    def disagreeing(self) -> List[Target]:
+        """
+        The tools of a differential test that did not reach the expected state
+        """
+        return self.__disagreeing
+
+
+class StateGenerationError(Exception):
+    def __init__(self, errors: Dict[str, str]):
+        fields = ", ".join([f"{key} ({error})" for key, error in errors.items()])
+        super().__init__(f"Could not generate the following fields: {fields}")
+        self.__errors = errors
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return self.__errors
+
 
 class ExecutionShouldStopRequestedError(Exception):
     def __init__(self):
@@ -4,23 +4,44 @@ from datetime import datetime
 from enum import Enum
 from os import getcwd
 from os.path import join
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Set, Tuple
+
 from humps import pascalize
-from typing import Any, List, Set, Tuple
 
+from triac.lib.coverage import Arm, Coverage, get_arm
 from triac.lib.docker.types.base_images import BaseImages
 from triac.lib.docker.types.container import Container
 from triac.lib.random import Fuzzer
+from triac.lib.tracing import tracer
 from triac.types.errors import WrappersExhaustedError
 from triac.types.target import Target
+from triac.types.worker import Worker, WorkerStatus
 from triac.types.wrapper import State, Wrapper
 from triac.types.wrappers import Identifier, Wrappers
 
+# Default number of states that are generated per wrapper when the
+# fuzzing is guided by the coverage, the least covered one is used.
+# Every candidate is generated in full, so each one adds to the cost
+CANDIDATE_STATES = 2
+
 
 class ExecutionMode(Enum):
     UNIT = "unit"
     DIFFERENTIAL = "differential"
 
 
+class ExecutionEvent(Enum):
+    ROUND_STARTED = "round_started"
+    WRAPPER_ADDED = "wrapper_added"
+    ERROR_FOUND = "error_found"
+    WORKER_CHANGED = "worker_changed"
+
+
+# Listeners are called by the thread that changed the execution
+Listener = Callable[[ExecutionEvent], None]
+
+
 class Execution:
     def __init__(
         self,
@@ -34,9 +55,20 @@ class Execution:
         slow_mode: bool,
         unit: str,
         differential: str,
+        jobs: int = 1,
+        docker_hosts: List[str] = [],
+        reuse_containers: bool = False,
+        warm_pool: int = 0,
+        exemplars: int = 3,
+        coverage_guided: bool = True,
+        candidate_states: int = CANDIDATE_STATES,
         replay_wrappers: Wrappers = None,
     ) -> None:
-        self.__fuzzer = Fuzzer()
+        # The coverage is always measured, but only guides the fuzzer if enabled
+        self.__coverage = Coverage()
+        self.__coverage_guided = coverage_guided
+        self.__candidate_states = candidate_states if coverage_guided else 1
+        self.__fuzzer = Fuzzer(self.__coverage if coverage_guided else None)
         self.__user_preferred_base_image = user_preferred_base_image
         self.__keep_base_images = keep_base_images
         self.__total_rounds = total_rounds
@@ -49,24 +81,36 @@ class Execution:
         self.__unit = Target[unit] if unit != None else None
         self.__raw_differential = differential
         self.__formatted_diff_target = differential
-        diff_target = self.__parse_differential(differential)
-        self.__first_differential = diff_target[0]
-        self.__second_differential = diff_target[1]
+        self.__differential_targets = self.__parse_differential(differential)
         self.__replay_wrappers = replay_wrappers
+        self.__reuse_containers = reuse_containers
+        self.__warm_pool = warm_pool
+        self.__exemplars = exemplars
+        self.__buckets = {}
+        self.__container_pools = []
+        self.__docker_clients = []
+        self.__base_image_builds = 0
+        self.__base_image_cache_hits = 0
         self.__start_time = datetime.now()
         self.__used_docker_images = set()
-        self.__used_intermediate_docker_images = set()
         self.__round = 0
         self.__errors = 0
-        self.__wrappers = Wrappers(None, unit, differential, [])
+        self.__wrappers_executed = 0
+        self.__jobs = jobs
+        self.__docker_hosts = docker_hosts
+        self.__lock = Lock()
+        self.__local = local()
+        self.__listeners: List[Listener] = []
+        self.__workers = [
+            Worker(id, Wrappers(None, unit, differential, [])) for id in range(jobs)
+        ]
 
-    def __parse_differential(self, differential) -> tuple[Target, Target]:
+    def __parse_differential(self, differential) -> List[Target]:
         if differential == None:
-            return (None, None)
+            return []
 
         # Parse
-        split = differential.split(":")
-        return (Target[split[0]], Target[split[1]])
+        return [Target[target] for target in differential.split(":")]
 
     def load_list_of_wrapper_classes(self) -> List[type[Wrapper]]:
         logger = logging.getLogger(__name__)
@@ -100,26 +144,97 @@ class Execution:
         logger.info(f"Loaded {len(self.__available_wrappers )} wrappers for fuzzing")
         return self.__available_wrappers
 
-    def wrappers_left_in_round(self) -> bool:
-        return self.__wrappers.count < self.__wrappers_per_round
+    def add_listener(self, listener: Listener) -> None:
+        """
+        Registers a listener that is notified about changes
+        of the execution, e.g. to redraw the UI
+        """
+        with self.__lock:
+            self.__listeners.append(listener)
+
+    def __notify(self, event: ExecutionEvent) -> None:
+        with self.__lock:
+            listeners = list(self.__listeners)
+        for listener in listeners:
+            listener(event)
+
+    def bind_worker(self, id: int, host: str = "local") -> Worker:
+        """
+        Binds the calling thread to the worker with the given id
+        that executes its rounds on the given docker host.
+        All round specific methods and properties refer to the
+        bound worker afterwards.
+        """
+        worker = self.__workers[id]
+        worker.host = host
+        self.__local.worker = worker
+        self.__notify(ExecutionEvent.WORKER_CHANGED)
+        return worker
+
+    def __current_worker(self) -> Worker:
+        # Threads that are not bound to a worker (e.g. the UI)
+        # see the first worker
+        return getattr(self.__local, "worker", self.__workers[0])
 
-    def add_wrapper_to_round(self, wrapper: Wrapper, container: Container) -> State:
-        return self.__wrappers.append(wrapper, container)
+    def wrappers_left_in_round(self) -> bool:
+        return self.__current_worker().wrappers.count < self.__wrappers_per_round
 
     def add_wrapper_and_state_to_round(self, wrapper: Wrapper, state: State):
-        self.__wrappers.append_with_state(wrapper, state)
+        self.__current_worker().wrappers.append_with_state(wrapper, state)
+        with self.__lock:
+            self.__wrappers_executed += 1
+        self.__notify(ExecutionEvent.WRAPPER_ADDED)
 
     def rounds_left(self) -> bool:
         return self.round < self.total_rounds
 
-    def start_new_round(self):
-        assert self.rounds_left() == True
+    def start_new_round(self) -> bool:
+        """
+        Claims the next round for the current worker.
+        Returns False if all rounds have already been claimed.
+        """
+        with self.__lock:
+            if not self.rounds_left():
+                return False
+            self.__round += 1
+            round = self.__round
 
         new_base = self.get_next_base_image()
-        self.__wrappers = Wrappers(
-            new_base, self.__raw_unit, self.__raw_differential, []
+        self.__current_worker().start_round(
+            round,
+            Wrappers(
+                new_base,
+                self.__raw_unit,
+                self.__raw_differential,
+                [],
+                self.__reuse_containers,
+            ),
         )
-        self.__round += 1
+        self.__notify(ExecutionEvent.ROUND_STARTED)
+        return True
+
+    def start_replay_round(self) -> None:
+        """
+        Starts a new round of the current worker that replays
+        wrappers. Unlike fuzzing rounds, replay rounds are not
+        limited by the total number of rounds.
+        """
+        with self.__lock:
+            self.__round += 1
+            self.__total_rounds = max(self.__total_rounds, self.__round)
+            round = self.__round
+
+        self.__current_worker().start_round(
+            round,
+            Wrappers(
+                self.get_next_base_image(),
+                self.__raw_unit,
+                self.__raw_differential,
+                [],
+                self.__reuse_containers,
+            ),
+        )
+        self.__notify(ExecutionEvent.ROUND_STARTED)
 
     def get_next_base_image(self) -> BaseImages:
         # Choose user specification or new random image
@@ -128,6 +243,15 @@ class Execution:
         else:
             return self.__fuzzer.fuzz_base_image()
 
+    @property
+    def base_images(self) -> List[BaseImages]:
+        """
+        The base images the rounds may be executed on
+        """
+        if self.__user_preferred_base_image != None:
+            return [BaseImages[self.__user_preferred_base_image]]
+        return [val for val in BaseImages]
+
     def get_wrapper_by_name(self, name: str) -> Wrapper:
         found = [
             elem
@@ -139,8 +263,12 @@ class Execution:
         else:
             return None
 
-    def get_next_wrapper(self, container: Container) -> Wrapper:
-        last = self.__wrappers.get_last_wrapper()
+    def get_next_wrapper(self, container: Container) -> Tuple[Wrapper, State]:
+        """
+        Randomly chooses the next wrapper that can execute in the container
+        and generates its target state. Returns both.
+        """
+        last = self.__current_worker().wrappers.get_last_wrapper()
         available = self.__available_wrappers
 
         # Filter available wrappers according to mode
@@ -152,13 +280,11 @@ class Execution:
                 )
             ]
         else:
-            first = self.first_differential_target
-            second = self.second_differential_target
+            targets = self.differential_targets
             available = [
                 elem
                 for elem in filter(
-                    lambda w: first in w.supported_targets()
-                    and second in w.supported_targets(),
+                    lambda w: all([t in w.supported_targets() for t in targets]),
                     available,
                 )
             ]
@@ -176,32 +302,73 @@ class Execution:
             logger.debug(f"Checking if {wrapper} can execute")
 
             # See if wrapper can be executed in the environment
-            capable = container.execute_method(wrapper, "can_execute")
+            # and generate the target states in the same round trip
+            with tracer.span("generate_states", wrapper=wrapper.__name__):
+                candidates = container.generate_states(
+                    wrapper.definition(),
+                    wrapper,
+                    self.__candidate_states,
+                )
 
-            if capable == True:
+            if candidates is not None:
                 logger.debug(f"Found {wrapper} which can run in the environment")
-                return wrapper
+                return (wrapper, self.__fuzzer.choose_state(wrapper, last, candidates))
             else:
                 logger.debug(f"{wrapper} cannot run. Trying next")
                 available.remove(wrapper)
                 if wrapper == last:
                     last = None
 
+    def get_coverage_arm(self, wrapper: Wrapper, state: State) -> Arm:
+        """
+        The combination that is executed by the last wrapper of the round
+        """
+        target_states = self.__current_worker().wrappers.target_states
+        previous = target_states[-2][0].name if len(target_states) > 1 else None
+        return get_arm(wrapper.__name__, previous, state)
+
     def add_image_to_used(self, img: str) -> None:
-        self.__used_docker_images.add(img)
+        with self.__lock:
+            self.__used_docker_images.add(img)
 
     def add_intermediate_image_to_used(self, img: str) -> None:
-        self.__used_intermediate_docker_images.add(img)
+        self.__current_worker().used_intermediate_images.add(img)
 
     def set_error_for_round(self, target: State, actual: State):
-        self.__errors += 1
-        self.__wrappers.set_error_state(target, actual)
+        with self.__lock:
+            self.__errors += 1
+        self.__current_worker().wrappers.set_error_state(target, actual)
+        self.__notify(ExecutionEvent.ERROR_FOUND)
+
+    def add_bucket_hit(self, fingerprint: str) -> None:
+        with self.__lock:
+            self.__buckets[fingerprint] = self.__buckets.get(fingerprint, 0) + 1
+        self.__notify(ExecutionEvent.ERROR_FOUND)
 
     def reset_intermediate_images(self):
-        self.__used_intermediate_docker_images.clear()
+        self.__current_worker().used_intermediate_images.clear()
+
+    def add_container_pool(self, pool: Any) -> None:
+        with self.__lock:
+            self.__container_pools.append(pool)
+
+    def add_docker_client(self, docker: Any) -> None:
+        with self.__lock:
+            self.__docker_clients.append(docker)
+
+    def add_base_image_lookup(self, built: bool) -> None:
+        with self.__lock:
+            if built:
+                self.__base_image_builds += 1
+            else:
+                self.__base_image_cache_hits += 1
+
+    def set_worker_status(self, status: WorkerStatus) -> None:
+        self.__current_worker().status = status
+        self.__notify(ExecutionEvent.WORKER_CHANGED)
 
-    def encode_wrappers_for_round(self) -> str:
-        return self.__wrappers.encode()
+    def encode_wrappers_for_round(self) -> bytes:
+        return self.__current_worker().wrappers.encode()
 
     @property
     def mode(self) -> ExecutionMode:
@@ -209,6 +376,71 @@ class Execution:
             return ExecutionMode.UNIT
         return ExecutionMode.DIFFERENTIAL
 
+    @property
+    def reuse_containers(self) -> bool:
+        """
+        Whether all wrappers of a round are executed in the same
+        live container instead of committing the container to an
+        image and starting a new one after every wrapper.
+        Only unit tests reuse containers, differential tests
+        need the snapshot to start the container of the second tool.
+        """
+        return self.__reuse_containers and self.mode == ExecutionMode.UNIT
+
+    @property
+    def warm_pool(self) -> int:
+        """
+        Number of booted containers to keep ahead of demand per base image
+        """
+        return self.__warm_pool
+
+    @property
+    def exemplars(self) -> int:
+        """
+        Number of errors that are stored per bucket of equal errors
+        """
+        return self.__exemplars
+
+    @property
+    def coverage(self) -> Coverage:
+        return self.__coverage
+
+    @property
+    def coverage_guided(self) -> bool:
+        return self.__coverage_guided
+
+    @property
+    def buckets(self) -> Dict[str, int]:
+        """
+        Number of errors found during this execution per bucket
+        """
+        with self.__lock:
+            return dict(self.__buckets)
+
+    @property
+    def container_pools(self) -> List[Any]:
+        with self.__lock:
+            return list(self.__container_pools)
+
+    @property
+    def docker_clients(self) -> List[Any]:
+        with self.__lock:
+            return list(self.__docker_clients)
+
+    @property
+    def base_image_builds(self) -> int:
+        """
+        Number of base images that had to be built
+        """
+        return self.__base_image_builds
+
+    @property
+    def base_image_cache_hits(self) -> int:
+        """
+        Number of rounds whose base image was already built
+        """
+        return self.__base_image_cache_hits
+
     @property
     def replay_wrappers(self) -> Wrappers:
         return self.__replay_wrappers
@@ -218,17 +450,13 @@ class Execution:
         return self.__unit
 
     @property
-    def first_differential_target(self) -> Target:
-        return self.__first_differential
+    def differential_targets(self) -> List[Target]:
+        return self.__differential_targets
 
     @property
     def formatted_diff_target(self) -> str:
         return self.__formatted_diff_target
 
-    @property
-    def second_differential_target(self) -> Target:
-        return self.__second_differential
-
     @property
     def continue_on_error(self) -> bool:
         return self.__continue_on_error
@@ -239,7 +467,7 @@ class Execution:
 
     @property
     def base_image(self) -> BaseImages:
-        return self.__wrappers.base_image
+        return self.__current_worker().wrappers.base_image
 
     @property
     def keep_base_images(self) -> bool:
@@ -247,7 +475,7 @@ class Execution:
 
     @property
     def target_states(self) -> List[Tuple[Identifier, State]]:
-        return self.__wrappers.target_states
+        return self.__current_worker().wrappers.target_states
 
     @property
     def total_rounds(self) -> int:
@@ -263,15 +491,41 @@ class Execution:
 
     @property
     def num_wrappers_in_round(self) -> int:
-        return self.__wrappers.count
+        return self.__current_worker().wrappers.count
 
     @property
     def used_docker_images(self) -> Set[str]:
-        return self.__used_docker_images
+        with self.__lock:
+            return set(self.__used_docker_images)
 
     @property
     def used_intermediate_images(self) -> Set[str]:
-        return self.__used_intermediate_docker_images
+        return self.__current_worker().used_intermediate_images
+
+    @property
+    def jobs(self) -> int:
+        return self.__jobs
+
+    @property
+    def workers(self) -> List[Worker]:
+        return self.__workers
+
+    @property
+    def docker_hosts(self) -> List[str]:
+        return self.__docker_hosts
+
+    @property
+    def worker_round(self) -> int:
+        return self.__current_worker().round
+
+    @property
+    def wrappers_executed(self) -> int:
+        return self.__wrappers_executed
+
+    @property
+    def wrappers_per_hour(self) -> float:
+        hours = self.elapsed_time.total_seconds() / 3600
+        return self.__wrappers_executed / hours if hours > 0 else 0
 
     @property
     def log_level(self) -> str:
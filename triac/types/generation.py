@@ -0,0 +1,76 @@
+from typing import Dict, List
+
+from triac.types.wrapper import Definition, State, Wrapper
+
+
+class GenerationResult:
+    def __init__(
+        self, capable: bool, states: List[State], errors: Dict[str, str]
+    ) -> None:
+        self.__capable = capable
+        self.__states = states
+        self.__errors = errors
+
+    @property
+    def capable(self) -> bool:
+        """
+        Whether the wrapper can execute in the environment.
+        If this is False, no state has been generated.
+        """
+        return self.__capable
+
+    @property
+    def state(self) -> State:
+        return self.__states[0] if len(self.__states) > 0 else {}
+
+    @property
+    def states(self) -> List[State]:
+        """
+        All generated candidate states
+        """
+        return self.__states
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        """
+        Maps the keys of the definition that could not
+        be generated to the error that was raised
+        """
+        return self.__errors
+
+
+class StateGenerator:
+    """
+    Generates a whole state for a definition in one go.
+    Instances are shipped to the container and executed there,
+    so that a state only costs a single round trip.
+    """
+
+    def __init__(
+        self, definition: Definition, wrapper: Wrapper = None, count: int = 1
+    ) -> None:
+        self.__definition = definition
+        self.__wrapper = wrapper
+        self.__count = count
+
+    def generate(self) -> GenerationResult:
+        # Check if the wrapper can run in the environment first
+        if self.__wrapper is not None and self.__wrapper.can_execute() != True:
+            return GenerationResult(False, [], {})
+
+        states = []
+        errors = {}
+        for _ in range(self.__count):
+            state = {}
+            for key, typ in self.__definition.items():
+                try:
+                    state[key] = typ.generate()
+                except Exception as e:
+                    errors[key] = f"{type(e).__name__}: {e}"
+            states.append(state)
+
+            # Further candidates would fail the same way
+            if len(errors) > 0:
+                break
+
+        return GenerationResult(True, states, errors)
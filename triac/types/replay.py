@@ -0,0 +1,65 @@
+from enum import Enum
+from typing import Optional
+
+from triac.types.errors import StateMismatchError
+
+
+class ReplayStatus(Enum):
+    REPRODUCED = "reproduced"
+    NOT_REPRODUCED = "not_reproduced"
+    CRASHED = "crashed"
+
+
+class ReplayResult:
+    def __init__(
+        self,
+        status: ReplayStatus,
+        executed: int,
+        duration: float,
+        error: StateMismatchError = None,
+        fingerprint: str = None,
+        message: str = None,
+    ) -> None:
+        self.__status = status
+        self.__executed = executed
+        self.__duration = duration
+        self.__error = error
+        self.__fingerprint = fingerprint
+        self.__message = message
+
+    @property
+    def status(self) -> ReplayStatus:
+        return self.__status
+
+    @property
+    def executed(self) -> int:
+        """
+        Number of wrappers that were executed, including
+        the one that caused the mismatch or crash
+        """
+        return self.__executed
+
+    @property
+    def duration(self) -> float:
+        """
+        Duration of the replay in seconds
+        """
+        return self.__duration
+
+    @property
+    def error(self) -> Optional[StateMismatchError]:
+        return self.__error
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """
+        Fingerprint of the mismatch, if the replay ended with one
+        """
+        return self.__fingerprint
+
+    @property
+    def message(self) -> Optional[str]:
+        """
+        The unexpected error that stopped a crashed replay
+        """
+        return self.__message
@@ -0,0 +1,61 @@
+from enum import Enum
+from typing import Set
+
+from triac.types.wrappers import Wrappers
+
+
+class WorkerStatus(Enum):
+    IDLE = "idle"
+    RUNNING = "running"
+    FINISHED = "finished"
+
+
+class Worker:
+    """
+    Holds the state of one fuzzing worker. Every worker executes
+    its own rounds with its own containers and intermediate images.
+    """
+
+    def __init__(self, id: int, wrappers: Wrappers) -> None:
+        self.__id = id
+        self.__round = 0
+        self.__wrappers = wrappers
+        self.__used_intermediate_docker_images = set()
+        self.__status = WorkerStatus.IDLE
+        self.__host = "local"
+
+    @property
+    def id(self) -> int:
+        return self.__id
+
+    @property
+    def round(self) -> int:
+        return self.__round
+
+    @property
+    def wrappers(self) -> Wrappers:
+        return self.__wrappers
+
+    @property
+    def used_intermediate_images(self) -> Set[str]:
+        return self.__used_intermediate_docker_images
+
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    @host.setter
+    def host(self, host: str) -> None:
+        self.__host = host
+
+    @property
+    def status(self) -> WorkerStatus:
+        return self.__status
+
+    @status.setter
+    def status(self, status: WorkerStatus) -> None:
+        self.__status = status
+
+    def start_round(self, round: int, wrappers: Wrappers) -> None:
+        self.__round = round
+        self.__wrappers = wrappers
@@ -1,8 +1,8 @@
 from typing import List, Tuple, cast
 
+from triac.lib import encoding
 from triac.lib.docker.types.base_images import BaseImages
 from triac.lib.docker.types.container import Container
-from triac.lib.encoding import decode, encode
 from triac.lib.random import Fuzzer
 from triac.types.wrapper import State, Wrapper
 
@@ -26,19 +26,21 @@ class Wrappers:
         unit: str,
         differential: str,
         data: List[Tuple[Identifier, State]],
+        reuse_containers: bool = False,
     ) -> None:
         self.__base_image = base_image
         self.__unit = unit
         self.__differential = differential
         self.__data = data
+        self.__reuse_containers = reuse_containers
         self.__last_wrapper = None
         self.__has_error = False
         self.__error_target = {}
         self.__error_actual = {}
         pass
 
-    def encode(self) -> str:
-        return encode(self)
+    def encode(self) -> bytes:
+        return encoding.dumps(self)
 
     @property
     def unit(self) -> str:
@@ -48,6 +50,12 @@ class Wrappers:
     def differential(self) -> str:
         return self.__differential
 
+    @property
+    def reuse_containers(self) -> bool:
+        # Files that were written before containers could be
+        # reused always executed every wrapper in a new container
+        return getattr(self, "_Wrappers__reuse_containers", False)
+
     @property
     def count(self) -> int:
         return len(self.__data)
@@ -56,6 +64,21 @@ class Wrappers:
     def target_states(self) -> List[Tuple[Identifier, State]]:
         return self.__data
 
+    @property
+    def has_error(self) -> bool:
+        """
+        Whether the round ended with a state mismatch
+        """
+        return self.__has_error
+
+    @property
+    def error_target(self) -> State:
+        return self.__error_target
+
+    @property
+    def error_actual(self) -> State:
+        return self.__error_actual
+
     def get_last_wrapper(self) -> Wrapper:
         return self.__last_wrapper
 
@@ -83,5 +106,5 @@ class Wrappers:
 
 
 def load(path: str) -> Wrappers:
-    with open(path, "r") as file:
-        return cast(Wrappers, decode(file.read()))
+    with open(path, "rb") as file:
+        return cast(Wrappers, encoding.load(file))
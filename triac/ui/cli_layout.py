@@ -1,85 +1,89 @@
 import logging
+import threading
 import time
 from asyncio import Event
-from typing import Optional, Union
+from typing import Dict, List, Set, Tuple
 
 from art import text2art
 from rich import box
 from rich.align import Align
-from rich.console import Console
-from rich.containers import Lines
+from rich.highlighter import ReprHighlighter
 from rich.layout import Layout
 from rich.live import Live
 from rich.panel import Panel
-from rich.pretty import Pretty
+from rich.pretty import pretty_repr
 from rich.table import Table
 from rich.text import Text
 
-from triac.types.execution import Execution, ExecutionMode
-from triac.ui.log_filter import build_log_filter
+from triac.lib.logs import get_file_handler, get_log_filter
+from triac.lib.tracing import tracer
+from triac.types.execution import Execution, ExecutionEvent, ExecutionMode
+from triac.ui.log_buffer import LogBuffer
 from triac.ui.log_handler import UILoggingHandler
 
+# The UI is redrawn when the execution or the log changes,
+# but at least every second for the runtime
+# and at most every MIN_REFRESH_INTERVAL seconds
+MAX_REFRESH_INTERVAL = 1
+MIN_REFRESH_INTERVAL = 0.1
 
-class VerticalOverflowText(Text):
-    """
-    Custom text element that shows the text tail when the text is overflowed
-    """
-
-    def wrap(
-        self,
-        console: "Console",
-        width: int,
-        *,
-        justify: Optional["JustifyMethod"] = None,
-        overflow: Optional["OverflowMethod"] = None,
-        tab_size: int = 8,
-        no_wrap: Optional[bool] = None,
-    ) -> Lines:
-        # Call sub wrapped
-        # When we pass along the parameters this
-        # Crashes sometimes. And it seems to be working
-        # fine without passing them along so.
-        wrapped = super().wrap(console, width)
-
-        # If there are too many lines, show the tail
-        if console.height < len(wrapped):
-            return [Text("...")] + wrapped[len(wrapped) - console.height - 1 :]
-        else:
-            return wrapped
+# Panels that show data of the execution event
+DIRTY_PANELS = {
+    ExecutionEvent.ROUND_STARTED: {"stats", "wrappers"},
+    ExecutionEvent.WRAPPER_ADDED: {"stats", "wrappers"},
+    ExecutionEvent.ERROR_FOUND: {"stats"},
+    ExecutionEvent.WORKER_CHANGED: {"stats", "wrappers"},
+}
 
 
 class CLILayout:
 
-    def __init__(self, state: Execution):
+    def __init__(self, state: Execution, file_handler: logging.Handler = None):
         self.__state = state
 
+        # Redraws are triggered by changes of the execution or the log
+        self.__changed = threading.Event()
+        self.__dirty_lock = threading.Lock()
+        self.__dirty: Set[str] = {"stats", "status", "wrappers"}
+        state.add_listener(self.__on_execution_event)
+
         # Fixed UI elements
         self.__logo = Panel(Align.center(text2art("TRIaC"), vertical="middle"))
-        self.__log_output = VerticalOverflowText()
+        self.__log_output = LogBuffer(on_change=self.__changed.set)
+
+        # What is currently shown, to skip panels that did not change
+        self.__stats_rows: List[Tuple[str, str]] = []
+        self.__timing_rows: List[Tuple[str, ...]] = []
+        self.__status_key: Tuple[bool, bool] = None
+        self.__log_version = -1
+
+        # Pretty printed target states of the current round
+        self.__pretty_round = None
+        self.__pretty_states: Dict[int, Tuple[Text, Text]] = {}
+        self.__highlighter = ReprHighlighter()
 
         # Setup logging
-        self.__configure_logging(state)
+        self.__configure_logging(
+            state, file_handler or get_file_handler(state.log_level, state.jobs)
+        )
+
+    def __on_execution_event(self, event: ExecutionEvent) -> None:
+        with self.__dirty_lock:
+            self.__dirty.update(DIRTY_PANELS[event])
+        self.__changed.set()
 
-    def __configure_logging(self, state: Execution):
-        # Enable log capturing
-        log_filter = build_log_filter(False, [__name__.split(".")[0], "__main__"])
+    def __take_dirty(self) -> Set[str]:
+        with self.__dirty_lock:
+            dirty = self.__dirty
+            self.__dirty = set()
+            return dirty
 
+    def __configure_logging(self, state: Execution, file_handler: logging.Handler):
         # UI Logger
         ui_handler = UILoggingHandler(self.__log_output)
-        ui_handler.setFormatter(logging.Formatter(fmt="%(message)s\n"))
+        ui_handler.setFormatter(logging.Formatter(fmt="%(message)s"))
         ui_handler.setLevel(state.ui_log_level)
-        ui_handler.addFilter(log_filter)
-
-        # File Handler
-        file_handler = logging.FileHandler("triac.log")
-        file_handler.setLevel(state.log_level)
-        file_handler.setFormatter(
-            logging.Formatter(
-                fmt="%(asctime)s - %(name)s :: %(levelname)-8s :: %(message)s",
-                datefmt="[%Y-%m-%d %H:%M:%S]",
-            )
-        )
-        file_handler.addFilter(log_filter)
+        ui_handler.addFilter(get_log_filter())
 
         # Configure the two loggers
         logging.basicConfig(
@@ -92,60 +96,121 @@ class CLILayout:
         minutes, seconds = divmod(remainder, 60)
         return "{:02}h{:02}m{:02}s".format(hours, minutes, seconds)
 
-    def generate_cli_layout(
-        self, execution_finished: bool, execution_canceled: bool
-    ) -> Layout:
-        # Statistics
-
-        # First table
-        stats_table_1 = Table(show_header=False, show_lines=False, box=None)
-        stats_table_1.add_column("name")
-        stats_table_1.add_column("value")
-
-        stats_table_1.add_row("Runtime", self.format_timedelta())
-        stats_table_1.add_row(
-            "Wrapper",
-            f"{self.__state.num_wrappers_in_round}/{self.__state.wrappers_per_round}",
-        )
-        stats_table_1.add_row(
-            "Round", f"{self.__state.round}/{self.__state.total_rounds}"
-        )
-        stats_table_1.add_row("Mode", f"{self.__state.mode.name}")
-
-        stats_table_2 = Table(show_header=False, show_lines=False, box=None)
-        stats_table_2.add_column("name")
-        stats_table_2.add_column("value")
-        stats_table_2.add_row(
-            Text("Errors", style="bold red"),
-            Text(str(self.__state.errors), style="bold red"),
-        )
-        stats_table_2.add_row("Log Level", str(self.__state.ui_log_level))
-        stats_table_2.add_row(
-            "Base Image",
+    def format_pool_stats(self) -> str:
+        pools = self.__state.container_pools
+        idle = sum([pool.idle for pool in pools])
+        hits = sum([pool.hits for pool in pools])
+        misses = sum([pool.misses for pool in pools])
+        return f"{idle} ready, {hits} hits, {misses} misses"
+
+    def format_bucket_stats(self) -> str:
+        buckets = self.__state.buckets
+        duplicates = sum(buckets.values()) - len(buckets)
+        return f"{len(buckets)} ({duplicates} duplicates)"
+
+    def format_coverage_stats(self) -> str:
+        coverage = self.__state.coverage
+        return f"{coverage.behaviours} ({coverage.behaviours_per_hour:.1f}/h)"
+
+    def get_stats_rows(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        rows_1 = [("Runtime", self.format_timedelta())]
+        if self.__state.jobs > 1:
+            rows_1.append(("Wrappers", str(self.__state.wrappers_executed)))
+        else:
+            rows_1.append(
+                (
+                    "Wrapper",
+                    f"{self.__state.num_wrappers_in_round}/{self.__state.wrappers_per_round}",
+                )
+            )
+        rows_1.append(("Round", f"{self.__state.round}/{self.__state.total_rounds}"))
+        rows_1.append(("Mode", f"{self.__state.mode.name}"))
+        if self.__state.warm_pool > 0:
+            rows_1.append(("Pool", self.format_pool_stats()))
+
+        rows_2 = [
+            ("Errors", str(self.__state.errors)),
+            ("Buckets", self.format_bucket_stats()),
+            ("Behaviours", self.format_coverage_stats()),
+            ("Log Level", str(self.__state.ui_log_level)),
+        ]
+        if self.__state.jobs > 1:
+            rows_2.append(("Jobs", str(self.__state.jobs)))
+        else:
+            rows_2.append(
+                (
+                    "Base Image",
+                    (
+                        ""
+                        if self.__state.base_image is None
+                        else str(self.__state.base_image.name)
+                    ),
+                )
+            )
+        rows_2.append(
             (
-                ""
-                if self.__state.base_image is None
-                else str(self.__state.base_image.name)
-            ),
+                "Target",
+                (
+                    self.__state.unit_target.name
+                    if self.__state.mode == ExecutionMode.UNIT
+                    else self.__state.formatted_diff_target
+                ),
+            )
         )
-        stats_table_2.add_row(
-            "Target",
+        return (rows_1, rows_2)
+
+    def format_duration(self, seconds: float) -> str:
+        if seconds < 1:
+            return f"{seconds * 1000:.0f}ms"
+        return f"{seconds:.1f}s"
+
+    def get_timing_rows(self) -> List[Tuple[str, ...]]:
+        return [
             (
-                self.__state.unit_target.name
-                if self.__state.mode == ExecutionMode.UNIT
-                else self.__state.formatted_diff_target
-            ),
-        )
-        # Second table
+                phase,
+                str(count),
+                self.format_duration(p50),
+                self.format_duration(p95),
+                self.format_duration(maximum),
+            )
+            for phase, count, p50, p95, maximum in tracer.summary()
+        ]
+
+    def generate_timings_panel(self, rows: List[Tuple[str, ...]]) -> Panel:
+        table = Table(show_header=True, show_lines=False, expand=True, box=None)
+        table.add_column("Phase")
+        for column in ["Count", "p50", "p95", "Max"]:
+            table.add_column(column, justify="right")
+        for row in rows:
+            table.add_row(*row)
+        return Panel(table, title="Timings")
+
+    def generate_stats_table(self, rows: List[Tuple[str, str]]) -> Table:
+        table = Table(show_header=False, show_lines=False, box=None)
+        table.add_column("name")
+        table.add_column("value")
+        for name, value in rows:
+            if name == "Errors":
+                table.add_row(
+                    Text(name, style="bold red"), Text(value, style="bold red")
+                )
+            else:
+                table.add_row(name, value)
+        return table
+
+    def generate_stats_panel(
+        self, rows_1: List[Tuple[str, str]], rows_2: List[Tuple[str, str]]
+    ) -> Panel:
         statistics = Layout()
         statistics.split_row(
-            Layout(Align.center(stats_table_1, vertical="middle")),
-            Layout(Align.center(stats_table_2, vertical="middle")),
+            Layout(Align.center(self.generate_stats_table(rows_1), vertical="middle")),
+            Layout(Align.center(self.generate_stats_table(rows_2), vertical="middle")),
         )
+        return Panel(statistics, title="Statistics")
 
-        stats = Panel(statistics, title="Statistics")
-
-        # Status
+    def generate_status_panel(
+        self, execution_finished: bool, execution_canceled: bool
+    ) -> Panel:
         if execution_canceled:
             status_text = Text("CANCELED", style="bold yellow")
         elif execution_finished:
@@ -153,31 +218,15 @@ class CLILayout:
         else:
             status_text = Text("RUNNING", style="bold dark_orange")
 
-        status = Panel(
+        return Panel(
             Align.center(status_text, vertical="middle"),
             title="Status",
         )
 
-        # Wrappers
-        wrappers_table = Table(
-            show_header=True, show_lines=True, expand=True, box=box.MINIMAL
-        )
-        wrappers_table.add_column(
-            "#", width=2, max_width=2, min_width=2, justify="left", no_wrap=True
-        )
-        wrappers_table.add_column("Name", width=6, max_width=6, min_width=6)
-        wrappers_table.add_column("Target state")
-
-        states = self.__state.target_states
-        for i, wrapper in enumerate(reversed(states)):
-            wrappers_table.add_row(
-                f"{len(states) - i}",
-                Pretty(wrapper[0]),
-                Pretty(wrapper[1], expand_all=True),
-            )
-
-        wrappers = Panel(wrappers_table)
-
+    def generate_cli_layout(self) -> Layout:
+        """
+        Generates the layout once, the panels are filled by update_cli_layout
+        """
         # Execution log
         exec_log = Panel(self.__log_output, title="Execution log")
 
@@ -185,43 +234,154 @@ class CLILayout:
         layout = Layout()
         layout.split_row(
             Layout(name="left"),
-            Layout(exec_log, name="right"),
+            Layout(name="right"),
         )
 
         # Left
         layout["left"].split_column(
             Layout(self.__logo, name="logo"),
-            Layout(stats, name="stats"),
-            Layout(status, name="status"),
-            Layout(wrappers, name="wrappers"),
+            Layout(name="stats"),
+            Layout(name="status"),
+            Layout(name="wrappers"),
         )
 
         layout["logo"].size = 8
-        layout["stats"].size = 6
         layout["status"].size = 3
 
         # Right
         # layout["right"].ratio = 2
+        layout["right"].split_column(
+            Layout(name="timings", visible=False),
+            Layout(exec_log, name="log"),
+        )
 
         return layout
 
+    def update_cli_layout(
+        self, layout: Layout, execution_finished: bool, execution_canceled: bool
+    ) -> bool:
+        """
+        Rebuilds the panels whose data changed.
+        Returns whether the layout has to be redrawn.
+        """
+        dirty = self.__take_dirty()
+        changed = False
+
+        # The statistics are compared, as the runtime changes without events
+        rows_1, rows_2 = self.get_stats_rows()
+        if rows_1 + rows_2 != self.__stats_rows:
+            self.__stats_rows = rows_1 + rows_2
+            layout["stats"].update(self.generate_stats_panel(rows_1, rows_2))
+            layout["stats"].size = max(len(rows_1), len(rows_2)) + 2
+            changed = True
+
+        # Timings are shown as soon as the first phase finished
+        timing_rows = self.get_timing_rows()
+        if timing_rows != self.__timing_rows:
+            self.__timing_rows = timing_rows
+            layout["timings"].update(self.generate_timings_panel(timing_rows))
+            layout["timings"].size = len(timing_rows) + 3
+            layout["timings"].visible = True
+            changed = True
+
+        status_key = (execution_finished, execution_canceled)
+        if status_key != self.__status_key:
+            self.__status_key = status_key
+            layout["status"].update(
+                self.generate_status_panel(execution_finished, execution_canceled)
+            )
+            changed = True
+
+        # Wrappers or workers
+        if "wrappers" in dirty:
+            if self.__state.jobs > 1:
+                layout["wrappers"].update(self.generate_workers_panel())
+            else:
+                layout["wrappers"].update(self.generate_wrappers_panel())
+            changed = True
+
+        # The log renders itself, it only needs a redraw
+        if self.__log_output.version != self.__log_version:
+            self.__log_version = self.__log_output.version
+            changed = True
+
+        return changed
+
+    def get_pretty_state(self, i: int, wrapper: Tuple) -> Tuple[Text, Text]:
+        """
+        Pretty prints the target states of a round only once
+        """
+        if self.__pretty_round != self.__state.worker_round:
+            self.__pretty_round = self.__state.worker_round
+            self.__pretty_states = {}
+        if i not in self.__pretty_states:
+            self.__pretty_states[i] = (
+                self.__highlighter(pretty_repr(wrapper[0])),
+                self.__highlighter(pretty_repr(wrapper[1], expand_all=True)),
+            )
+        return self.__pretty_states[i]
+
+    def generate_wrappers_panel(self) -> Panel:
+        wrappers_table = Table(
+            show_header=True, show_lines=True, expand=True, box=box.MINIMAL
+        )
+        wrappers_table.add_column(
+            "#", width=2, max_width=2, min_width=2, justify="left", no_wrap=True
+        )
+        wrappers_table.add_column("Name", width=6, max_width=6, min_width=6)
+        wrappers_table.add_column("Target state")
+
+        states = list(self.__state.target_states)
+        for i in reversed(range(len(states))):
+            name, state = self.get_pretty_state(i, states[i])
+            wrappers_table.add_row(f"{i + 1}", name, state)
+
+        return Panel(wrappers_table)
+
+    def generate_workers_panel(self) -> Panel:
+        workers_table = Table(
+            show_header=True, show_lines=False, expand=True, box=box.MINIMAL
+        )
+        workers_table.add_column("#", justify="left", no_wrap=True)
+        workers_table.add_column("Host")
+        workers_table.add_column("Round")
+        workers_table.add_column("Wrapper")
+        workers_table.add_column("Base Image")
+        workers_table.add_column("Status")
+
+        for worker in self.__state.workers:
+            wrappers = worker.wrappers
+            workers_table.add_row(
+                str(worker.id),
+                worker.host,
+                str(worker.round),
+                f"{wrappers.count}/{self.__state.wrappers_per_round}",
+                "" if wrappers.base_image is None else wrappers.base_image.name,
+                worker.status.value,
+            )
+
+        return Panel(
+            workers_table,
+            title=f"Workers ({self.__state.wrappers_per_hour:.0f} wrappers/h)",
+        )
+
     def render_ui(self, stop_event: Event, canceled_event: Event):
-        # Generate the fixed parts
-        with Live(
-            self.generate_cli_layout(stop_event.is_set(), canceled_event.is_set()),
-            auto_refresh=False,
-        ) as live:
+        layout = self.generate_cli_layout()
+        self.update_cli_layout(layout, stop_event.is_set(), canceled_event.is_set())
+        with Live(layout, auto_refresh=False) as live:
             while True:
-                # Refresh the UI layout
-                live.update(
-                    self.generate_cli_layout(
-                        stop_event.is_set(), canceled_event.is_set()
-                    ),
-                    refresh=True,
-                )
+                # Only redraw if something changed
+                if self.update_cli_layout(
+                    layout, stop_event.is_set(), canceled_event.is_set()
+                ):
+                    live.refresh()
 
                 # Stop if cancellation is requested
                 if stop_event.is_set():
                     break
 
-                time.sleep(0.5)
+                # Wait for the next change, bursts of
+                # changes are collected into one redraw
+                self.__changed.wait(MAX_REFRESH_INTERVAL)
+                self.__changed.clear()
+                time.sleep(MIN_REFRESH_INTERVAL)
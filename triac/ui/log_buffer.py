@@ -0,0 +1,59 @@
+from collections import deque
+from threading import Lock
+from typing import Callable, Deque, List, Optional
+
+from rich.console import Console, ConsoleOptions, RenderResult
+from rich.text import Text
+
+# Number of log records that are kept for the UI
+MAX_LINES = 1000
+
+
+class LogBuffer:
+    """
+    Keeps the last records of the log and renders the tail that fits
+    into the available height. Older records are dropped, so memory
+    and rendering time do not grow with the runtime of the execution.
+    """
+
+    def __init__(
+        self, max_lines: int = MAX_LINES, on_change: Callable[[], None] = None
+    ) -> None:
+        self.__lines: Deque[Text] = deque(maxlen=max_lines)
+        self.__lock = Lock()
+        self.__version = 0
+        self.__on_change = on_change
+
+    def append(self, text: str, style: Optional[str] = None) -> None:
+        with self.__lock:
+            self.__lines.append(Text(text, style=style or ""))
+            self.__version += 1
+        if self.__on_change is not None:
+            self.__on_change()
+
+    @property
+    def version(self) -> int:
+        """
+        Increases with every appended record
+        """
+        return self.__version
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        height = options.height or console.height
+        with self.__lock:
+            lines = list(self.__lines)
+
+        # Only wrap the records from the end until the height is filled
+        tail: List[Text] = []
+        for line in reversed(lines):
+            tail += reversed(line.wrap(console, options.max_width))
+            if len(tail) >= height:
+                break
+        tail.reverse()
+
+        # If there are too many lines, show the tail
+        if len(tail) > height:
+            tail = [Text("...")] + tail[len(tail) - height + 1 :]
+        yield Text("\n").join(tail)
@@ -2,12 +2,11 @@ import logging
 import logging.config
 from logging import LogRecord
 
-from rich.pretty import Pretty
-from rich.text import Text
+from triac.ui.log_buffer import LogBuffer
 
 
 class UILoggingHandler(logging.Handler):
-    def __init__(self, console_out: Text):
+    def __init__(self, console_out: LogBuffer):
         logging.Handler.__init__(self)
         self.__console = console_out
 
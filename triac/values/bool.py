@@ -20,6 +20,9 @@ class BoolValue(BaseValue):
     def __repr__(self):
         return str(self.val)
 
+    def category(self) -> str:
+        return str(self.val)
+
 
 class BoolType(BaseType):
     def __init__(self) -> None:
@@ -43,6 +43,9 @@ class PathStateValue(BaseValue):
         else:
             return f"[{self.__state.value}] {self.val.__repr__()}"
 
+    def category(self) -> str:
+        return self.__state.value
+
     def transform(self, target: Target) -> str:
         return self.val.transform(target)
 
@@ -1,9 +1,19 @@
 from logging import Logger
+
 from triac.types.base import BaseType, BaseValue
 from triac.types.errors import UnsupportedTargetValueError
 from triac.types.target import Target
-from triac.values.postgres_db_state import PostgresDbState, PostgresDbStateValue, PostgresDbStateType
-from triac.values.postgres_db_name import PostgresDbNameValue, PostgresDbNameType, find_databases
+from triac.values.postgres_db_name import (
+    PostgresDbNameType,
+    PostgresDbNameValue,
+    find_databases,
+)
+from triac.values.postgres_db_state import (
+    PostgresDbState,
+    PostgresDbStateType,
+    PostgresDbStateValue,
+)
+
 
 class PostgresDbValue(BaseValue):
     def __init__(self, state: PostgresDbStateValue, db: PostgresDbNameValue) -> None:
@@ -13,6 +23,9 @@ class PostgresDbValue(BaseValue):
     def __repr__(self):
         return f"[state] {self.state} [db] {self.val.__repr__()}"
 
+    def category(self) -> str:
+        return self.state.val.name
+
     def transform(self, target: Target) -> str:
         if target == Target.ANSIBLE:
             return f"""name: {self.val.transform(target)}
@@ -28,5 +41,7 @@ class PostgresDbType(BaseType):
     def generate(self) -> PostgresDbValue:
         can_delete = len(find_databases()) > 0
         state = PostgresDbStateType(can_delete=can_delete).generate()
-        name = PostgresDbNameType(existing=state.val != PostgresDbState.PRESENT).generate()
+        name = PostgresDbNameType(
+            existing=state.val != PostgresDbState.PRESENT
+        ).generate()
         return PostgresDbValue(state, name)
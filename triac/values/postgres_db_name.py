@@ -1,7 +1,9 @@
 from random import choice, randrange
-from typing import List
-from string import ascii_letters, digits
 from re import match
+from string import ascii_letters, digits
+from typing import List
+
+from triac.lib.postgres import list_databases
 from triac.types.base import BaseType, BaseValue
 from triac.types.errors import UnsupportedTargetValueError
 from triac.types.target import Target
@@ -23,19 +25,20 @@ class PostgresDbNameValue(BaseValue):
         else:
             raise UnsupportedTargetValueError(target, self)
 
-IGNORE_DBS="^template.*$|^postgres$"
+
+IGNORE_DBS = "^template.*$|^postgres$"
+
 
 def find_databases() -> List[str]:
-    pg = __import__("psycopg2")
-    cur = pg.connect(DEFAULT_CHECK_URI).cursor()
-    cur.execute("SELECT datname FROM pg_database")
-    raw = [row[0] for row in cur.fetchall()]
+    raw = list_databases(DEFAULT_CHECK_URI)
     dbs = [db for db in raw if not match(IGNORE_DBS, db)]
     return dbs
 
+
 def random_name(size: int, chars=ascii_letters + digits):
     return "".join(choice(chars) for _ in range(size))
 
+
 class PostgresDbNameType(BaseType):
     def __init__(self, existing: bool = True) -> None:
         super().__init__()
@@ -45,5 +48,5 @@ class PostgresDbNameType(BaseType):
         dbs = find_databases()
         if not self.existing:
             l = randrange(5, 15, 1)
-            dbs += [random_name(l) for _ in range(len(dbs)+1)]
+            dbs += [random_name(l) for _ in range(len(dbs) + 1)]
         return PostgresDbNameValue(choice(dbs))
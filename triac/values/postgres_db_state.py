@@ -1,5 +1,6 @@
 from enum import Enum
 from random import choice
+
 from triac.types.base import BaseType, BaseValue
 from triac.types.errors import UnsupportedTargetValueError
 from triac.types.target import Target
@@ -33,5 +34,9 @@ class PostgresDbStateType(BaseType):
 
     def generate(self) -> PostgresDbStateValue:
         return PostgresDbStateValue(
-            choice([PostgresDbState.PRESENT, PostgresDbState.ABSENT] if self.can_delete else [PostgresDbState.PRESENT])
+            choice(
+                [PostgresDbState.PRESENT, PostgresDbState.ABSENT]
+                if self.can_delete
+                else [PostgresDbState.PRESENT]
+            )
         )
@@ -1,7 +1,8 @@
+from random import choice
+
 from triac.types.base import BaseType, BaseValue
 from triac.types.errors import UnsupportedTargetValueError
 from triac.types.target import Target
-from random import choice
 
 
 class PostgresConnectionParameters:
@@ -1,9 +1,6 @@
-import importlib
-from posixpath import basename
 from random import choice
-from typing import List
 
-from triac.lib.service import ServiceStatus, ServiceStatusFetcher
+from triac.lib.service import ServiceStatus, get_unit_catalogue
 from triac.types.base import BaseType, BaseValue
 from triac.types.errors import UnsupportedTargetValueError
 from triac.types.target import Target
@@ -40,26 +37,21 @@ class ServiceNameValue(BaseValue[str]):
     def __repr__(self):
         return super().__repr__()
 
+    def category(self) -> str:
+        # The status of the service before (or after) the wrapper executed
+        if self.__status is None:
+            return "unknown"
+        return f"{self.__status.active}/{self.__status.enabled}"
+
 
 class ServiceNameType(BaseType):
     def __init__(self):
         super().__init__()
 
-    def __get_units_with_status(self, systemd) -> List[tuple[str, str]]:
-        # Fetch all units managed by systemd
-        manager = systemd.Manager()
-        manager.load()
-        all = [
-            (basename(elem[0].decode("utf-8")), elem[1].decode("utf-8"))
-            for elem in manager.Manager.ListUnitFiles()
-        ]
-        # Filter out those that should be ignored
-        return [elem for elem in filter(lambda x: x[0] not in ignore_list, all)]
-
     def generate(self) -> ServiceNameValue:
-        # Dynamically load pystemd
-        systemd = importlib.import_module("pystemd.systemd1")
-        units = self.__get_units_with_status(systemd)
+        # The unit files are cached for the container
+        catalogue = get_unit_catalogue()
+        units = [elem for elem in catalogue.unit_files if elem[0] not in ignore_list]
 
         # Filter the units to only contain services
         # without parameters (those without @, otherwise it is unclear how those services should be addressed)
@@ -67,8 +59,10 @@ class ServiceNameType(BaseType):
         services = [
             elem
             for elem in filter(
-                lambda x: x[0].endswith(".service") and "@" not in x[0] and "getty" not in x[0],
-                units
+                lambda x: x[0].endswith(".service")
+                and "@" not in x[0]
+                and "getty" not in x[0],
+                units,
             )
         ]
 
@@ -78,5 +72,5 @@ class ServiceNameType(BaseType):
 
         # Choose a name and fetch the current status
         service_name = choice(to_choose)[0]
-        status = ServiceStatusFetcher.fetch(service_name)
+        status = catalogue.status(service_name)
         return ServiceNameValue(service_name, status)
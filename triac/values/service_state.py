@@ -33,6 +33,9 @@ class ServiceStateValue(BaseValue[ServiceState]):
     def __repr__(self):
         return self.val.name
 
+    def category(self) -> str:
+        return self.val.name
+
 
 class ServiceStateType(BaseType):
     def __init__(self):
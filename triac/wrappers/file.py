@@ -5,6 +5,8 @@ from os.path import isdir, isfile, islink
 from pwd import getpwuid
 from typing import List, cast
 
+from triac.lib.path_index import update_path_indexes
+from triac.lib.service import invalidate_unit_catalogue
 from triac.types.errors import UnsupportedTargetWrapperError
 from triac.types.target import Target
 from triac.types.wrapper import Definition, State, Wrapper
@@ -33,6 +35,7 @@ ANSIBLE_TEMPLATE_LINK = """ansible.builtin.file:
   mode: {mode}
 """
 
+
 class File(Wrapper):
     def __init__(self) -> None:
         super().__init__()
@@ -79,6 +82,9 @@ class File(Wrapper):
     def verify(exp: State) -> State:
         path_val = cast(PathStateValue, exp["path"])
         path = path_val.val.val
+        # The wrapper might have created or removed the path
+        update_path_indexes(path)
+        invalidate_unit_catalogue(path)
         state = {}
         try:
             ps = PathState.FILE
@@ -1,19 +1,22 @@
+import importlib
 from copy import deepcopy
 from grp import getgrgid
-from time import sleep
-import importlib
 from os import lstat, readlink
 from os.path import isdir, islink
 from pwd import getpwuid
 from typing import List, cast
 
+from triac.lib.postgres import get_connection_pool, list_databases
 from triac.types.errors import UnsupportedTargetWrapperError
 from triac.types.target import Target
 from triac.types.wrapper import Definition, State, Wrapper
-from triac.values.postgres_uri import PostgresConnectionParameters, PostgresURIType
 from triac.values.postgres_db import PostgresDbType, PostgresDbValue
-from triac.values.postgres_db_state import PostgresDbStateValue, PostgresDbState
-from triac.values.postgres_uri import DEFAULT_CHECK_URI
+from triac.values.postgres_db_state import PostgresDbState, PostgresDbStateValue
+from triac.values.postgres_uri import (
+    DEFAULT_CHECK_URI,
+    PostgresConnectionParameters,
+    PostgresURIType,
+)
 
 ANSIBLE_TEMPLATE = """community.postgresql.postgresql_db:
   {uri}
@@ -43,14 +46,8 @@ class PostgresDb(Wrapper):
 
     @staticmethod
     def can_execute() -> bool:
-        for i in range(600):
-            try:
-                sleep(0.1)
-                __import__("psycopg2").connect(DEFAULT_CHECK_URI)
-                return True
-            except:
-                continue
-        return False
+        pool = get_connection_pool()
+        return pool.wait_until_ready() and pool.can_connect(DEFAULT_CHECK_URI)
 
     @staticmethod
     def supported_targets() -> List[Target]:
@@ -66,9 +63,7 @@ class PostgresDb(Wrapper):
         db = cast(PostgresDbValue, exp["db"])
         name = db.val.val
         params = cast(PostgresConnectionParameters, exp["uri"].val)
-        cur = __import__("psycopg2").connect(params.uri).cursor()
-        cur.execute("SELECT datname FROM pg_database")
-        dbs =  list([row[0] for row in cur.fetchall()])
+        dbs = list_databases(params.uri)
         if name in dbs:
             db.state = PostgresDbStateValue(PostgresDbState.PRESENT)
         else:
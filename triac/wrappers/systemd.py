@@ -8,7 +8,11 @@ from os.path import isdir, islink
 from pwd import getpwuid
 from typing import List, cast
 
-from triac.lib.service import ServiceStatus, ServiceStatusFetcher
+from triac.lib.service import (
+    ServiceStatus,
+    ServiceStatusFetcher,
+    invalidate_unit_catalogue,
+)
 from triac.types.errors import UnsupportedTargetWrapperError
 from triac.types.target import Target
 from triac.types.wrapper import Definition, State, Wrapper
@@ -185,8 +189,11 @@ class Systemd(Wrapper):
         service_name: ServiceNameValue = exp["name"]
         target_state: ServiceStateValue = exp["state"]
 
-        # Fetch new service status
+        # Fetch new service status, bypassing the catalogue. The wrapper
+        # might have changed other units as well (e.g. dependencies),
+        # so the whole catalogue is outdated
         reached_status = ServiceStatusFetcher.fetch(service_name.val)
+        invalidate_unit_catalogue()
 
         # Determine new properties
         enabled = Systemd.determine_enabled(reached_status)